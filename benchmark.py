@@ -0,0 +1,364 @@
+"""Load-testing and latency benchmark for the quiz and flashcard flows
+
+Builds a synthetic question bank, flashcard deck and user list in a
+throwaway directory, then scripts realistic student sessions against the
+app: login, /quiz/start, N x (/quiz/question + /check_answer + /quiz/next)
+(or N x /api/quiz/answer with --api) and a run of /flashcards/study/card
+ratings. Reports p50/p95/p99 latency
+per step, overall throughput and bytes written to disk per request, so a
+storage or caching change can be compared against the JSON baseline.
+
+Examples:
+    python benchmark.py
+    python benchmark.py --users 50 --questions 5000 --flashcards 2000
+    python benchmark.py --backend sqlite --concurrency 8
+    python benchmark.py --server --concurrency 8 --output results.json
+    python benchmark.py --api  # one JSON round trip per answered question
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+QUESTION_ID_RE = re.compile(rb'name="question_id" value="(\d+)"')
+CARD_ID_RE = re.compile(rb'name="card_id" value="(\d+)"')
+
+SERVICES = ['S3', 'EC2', 'Lambda', 'DynamoDB', 'SQS', 'SNS', 'ECS', 'RDS', 'IAM', 'CloudWatch']
+CATEGORIES = ['Storage', 'Compute', 'Databases', 'Messaging', 'Security', 'Monitoring']
+
+# ======================= SYNTHETIC DATA =======================
+
+def make_question(question_id, rng):
+    """A question shaped like the real bank: markdown text, four or six options, some multi-select"""
+    options = rng.sample(SERVICES, 6 if question_id % 5 == 0 else 4)
+    question = {
+        'id': question_id,
+        'question': f'Question {question_id}: which service fits **scenario {rng.randint(1, 10 ** 6)}**?\n\n'
+                    + ' '.join(rng.choice(SERVICES) for _ in range(60)),
+        'options': options,
+        'correct_answer': options[0],
+        'explanation': f'**{options[0]}** is correct.\n\n' + ' '.join(rng.choice(SERVICES) for _ in range(120))
+    }
+    if len(options) == 6:
+        question['question_type'] = 'multiple'
+        question['correct_answers'] = options[:3]
+    return question
+
+def make_flashcard(card_id, rng):
+    service = rng.choice(SERVICES)
+    return {
+        'id': card_id,
+        'front': f'What is **{service}** used for? (card {card_id})',
+        'back': ' '.join(rng.choice(SERVICES) for _ in range(40)),
+        'category': rng.choice(CATEGORIES),
+        'difficulty': rng.choice(['easy', 'medium', 'hard']),
+        'tags': ['aws', service.lower()],
+        'created_date': '2025-05-28T12:00:00',
+        'created_by': 'admin'
+    }
+
+def build_dataset(directory, questions, flashcards, users, seed):
+    """Write the JSON data files the app reads at import time; returns (question bank by id, user list)"""
+    rng = random.Random(seed)
+    bank = [make_question(i, rng) for i in range(1, questions + 1)]
+    deck = [make_flashcard(i, rng) for i in range(1, flashcards + 1)]
+    accounts = {f'student{i}': f'password{i}' for i in range(1, users + 1)}
+    
+    for filename, data in [('questions.json', bank), ('flashcards.json', deck), ('users.json', accounts),
+                           ('progress.json', {}), ('flashcard_progress.json', {})]:
+        with open(os.path.join(directory, filename), 'w') as f:
+            json.dump(data, f, indent=2)
+    
+    return {question['id']: question for question in bank}, list(accounts.items())
+
+def load_app(directory, backend):
+    """Import main.py against the synthetic data directory"""
+    os.chdir(directory)
+    os.environ['STORAGE_BACKEND'] = 'json'
+    sys.path.insert(0, APP_DIR)
+    
+    if backend == 'sqlite':
+        os.environ['STORAGE_BACKEND'] = 'sqlite'
+        os.environ['SQLITE_PATH'] = os.path.join(directory, 'study_app.db')
+    
+    import main
+    if backend == 'sqlite':
+        main.import_json_to_sqlite(main.app.config['SQLITE_PATH'])
+        # Let the cached collections notice the imported version before any student starts
+        time.sleep(max(main.question_bank.check_interval, main.flashcard_deck.check_interval))
+        main.question_bank.all()
+        main.flashcard_deck.all()
+    return main
+
+# ======================= MEASUREMENT =======================
+
+def bytes_written():
+    """Bytes this process has passed to write() so far (Linux /proc/self/io), or None"""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+class Recorder:
+    """Latency and bytes-written samples per step, shared by all simulated users"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+    
+    def timed(self, step, call):
+        before = bytes_written()
+        start = time.perf_counter()
+        result = call()
+        elapsed = time.perf_counter() - start
+        after = bytes_written()
+        written = after - before if before is not None and after is not None else None
+        with self._lock:
+            self.samples.setdefault(step, []).append((elapsed, written))
+        return result
+
+# ======================= CLIENTS =======================
+
+class TestClientSession:
+    """One student's browser, backed by Flask's test client (no sockets)"""
+    
+    def __init__(self, app):
+        self.client = app.test_client()
+    
+    def get(self, path):
+        response = self.client.get(path)
+        return response.status_code, response.data
+    
+    def post(self, path, data):
+        response = self.client.post(path, data=data)
+        return response.status_code, response.data
+    
+    def post_json(self, path, payload):
+        response = self.client.post(path, json=payload)
+        return response.status_code, response.data
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+class HttpSession:
+    """One student's browser talking HTTP to the local WSGI server"""
+    
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+    
+    def _open(self, request):
+        try:
+            with self.opener.open(request) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            # Redirects surface here because _NoRedirect declines to follow them
+            return e.code, e.read()
+    
+    def get(self, path):
+        return self._open(urllib.request.Request(self.base_url + path))
+    
+    def post(self, path, data):
+        body = urllib.parse.urlencode(data, doseq=True).encode()
+        return self._open(urllib.request.Request(self.base_url + path, data=body))
+    
+    def post_json(self, path, payload):
+        return self._open(urllib.request.Request(
+            self.base_url + path, data=json.dumps(payload).encode(), headers={'Content-Type': 'application/json'}))
+
+def start_server(app):
+    """Serve the app on an ephemeral localhost port in a background thread"""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+    
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+# ======================= SCENARIO =======================
+
+def run_student(browser, username, password, bank, args, recorder, seed):
+    """Log in, take quizzes and rate flashcards the way a student would"""
+    rng = random.Random(seed)
+    
+    status, _ = recorder.timed('login', lambda: browser.post('/login', {'username': username, 'password': password}))
+    if status != 302:
+        raise RuntimeError(f'login failed for {username} (HTTP {status})')
+    
+    def choose_answer(question):
+        if rng.random() < args.accuracy:
+            return question.get('correct_answers', [question['correct_answer']])
+        return [rng.choice(question['options'])]
+    
+    for _ in range(args.quizzes if args.api else 0):
+        status, body = recorder.timed('api_quiz_start', lambda: browser.post_json('/api/quiz/start', {'prefetch': 3}))
+        state = json.loads(body) if status == 200 else {'complete': True}
+        for _ in range(args.answers):
+            if state.get('complete') or not state.get('questions'):
+                break  # Quiz finished
+            payload = {'question_id': state['questions'][0]['id'],
+                       'answers': choose_answer(bank[state['questions'][0]['id']]), 'prefetch': 3}
+            status, body = recorder.timed('api_quiz_answer', lambda: browser.post_json('/api/quiz/answer', payload))
+            state = json.loads(body) if status == 200 else {'complete': True}
+    
+    for _ in range(0 if args.api else args.quizzes):
+        recorder.timed('quiz_start', lambda: browser.get('/quiz/start'))
+        for _ in range(args.answers):
+            status, body = recorder.timed('quiz_question', lambda: browser.get('/quiz/question'))
+            match = QUESTION_ID_RE.search(body) if status == 200 else None
+            if not match:
+                break  # Quiz finished
+            
+            question = bank[int(match.group(1))]
+            form = {'question_id': str(question['id']), 'answer': choose_answer(question)}
+            recorder.timed('check_answer', lambda: browser.post('/check_answer', form))
+            recorder.timed('quiz_next', lambda: browser.post('/quiz/next', {}))
+    
+    for _ in range(args.ratings):
+        status, body = recorder.timed('flashcard_card', lambda: browser.get('/flashcards/study/card'))
+        match = CARD_ID_RE.search(body) if status == 200 else None
+        if not match:
+            break
+        
+        form = {'action': 'rate', 'card_id': match.group(1).decode(),
+                'difficulty': rng.choice(['hard', 'medium', 'easy'])}
+        recorder.timed('flashcard_rate', lambda: browser.post('/flashcards/study/card', form))
+
+# ======================= REPORT =======================
+
+def summarize(recorder, wall_time, exact_bytes):
+    steps = {}
+    total_requests = 0
+    for step, samples in recorder.samples.items():
+        latencies = sorted(elapsed for elapsed, _ in samples)
+        written = [w for _, w in samples if w is not None]
+        total_requests += len(samples)
+        steps[step] = {
+            'requests': len(samples),
+            'mean_ms': sum(latencies) / len(latencies) * 1000,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'max_ms': latencies[-1] * 1000,
+            'bytes_per_request': sum(written) / len(written) if exact_bytes and written else None
+        }
+    return {
+        'requests': total_requests,
+        'wall_seconds': wall_time,
+        'throughput_rps': total_requests / wall_time if wall_time else 0.0,
+        'steps': steps
+    }
+
+def print_report(results, args, total_written):
+    print(f"backend={args.backend} mode={'server' if args.server else 'test-client'} "
+          f"users={args.users} questions={args.questions} flashcards={args.flashcards} "
+          f"concurrency={args.concurrency}")
+    print(f"{'step':<16}{'requests':>9}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'max ms':>10}{'bytes/req':>12}")
+    for step, row in results['steps'].items():
+        written = f"{row['bytes_per_request']:.0f}" if row['bytes_per_request'] is not None else '-'
+        print(f"{step:<16}{row['requests']:>9}{row['mean_ms']:>10.2f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+              f"{row['p99_ms']:>10.2f}{row['max_ms']:>10.2f}{written:>12}")
+    print(f"total: {results['requests']} requests in {results['wall_seconds']:.2f}s "
+          f"({results['throughput_rps']:.1f} req/s)")
+    if total_written is not None and not args.server:
+        print(f"bytes written: {total_written} total, {total_written / max(results['requests'], 1):.0f} per request")
+    elif args.server:
+        print('bytes written: not measured in --server mode (socket writes would be counted)')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--backend', choices=['json', 'sqlite'], default=os.environ.get('STORAGE_BACKEND', 'json'))
+    parser.add_argument('--users', type=int, default=10, help='simulated students')
+    parser.add_argument('--questions', type=int, default=500, help='size of the synthetic question bank')
+    parser.add_argument('--flashcards', type=int, default=300, help='size of the synthetic flashcard deck')
+    parser.add_argument('--quizzes', type=int, default=2, help='quiz sessions per student')
+    parser.add_argument('--answers', type=int, default=20, help='questions answered per quiz session')
+    parser.add_argument('--ratings', type=int, default=20, help='flashcard ratings per student')
+    parser.add_argument('--accuracy', type=float, default=0.7, help='chance a student answers correctly')
+    parser.add_argument('--concurrency', type=int, default=1, help='students running at the same time')
+    parser.add_argument('--server', action='store_true', help='go through a local threaded WSGI server')
+    parser.add_argument('--api', action='store_true', help='answer through the JSON quiz API instead of the pages')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--keep', action='store_true', help='keep the data directory afterwards')
+    parser.add_argument('--output', help='also write the results as JSON to this file')
+    args = parser.parse_args(argv)
+    
+    output = os.path.abspath(args.output) if args.output else None
+    directory = tempfile.mkdtemp(prefix='study-app-bench-')
+    try:
+        bank, accounts = build_dataset(directory, args.questions, args.flashcards, args.users, args.seed)
+        app_module = load_app(directory, args.backend)
+        
+        server = None
+        if args.server:
+            server, base_url = start_server(app_module.app)
+            make_browser = lambda: HttpSession(base_url)
+        else:
+            make_browser = lambda: TestClientSession(app_module.app)
+        
+        recorder = Recorder()
+        written_before = bytes_written()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = [pool.submit(run_student, make_browser(), username, password, bank, args, recorder,
+                                   args.seed * 100003 + i)
+                       for i, (username, password) in enumerate(accounts)]
+            for future in futures:
+                future.result()
+        wall_time = time.perf_counter() - start
+        written_after = bytes_written()
+        
+        if server is not None:
+            server.shutdown()
+        
+        # Per-step byte counts are only attributable when requests don't overlap
+        exact_bytes = not args.server and args.concurrency == 1
+        results = summarize(recorder, wall_time, exact_bytes)
+        total_written = written_after - written_before if written_before is not None else None
+        results['bytes_written'] = total_written if not args.server else None
+        results['config'] = vars(args)
+        
+        print_report(results, args, total_written)
+        if output:
+            with open(output, 'w') as f:
+                json.dump(results, f, indent=2)
+    finally:
+        os.chdir(APP_DIR)
+        if args.keep:
+            print(f'data kept in {directory}')
+        else:
+            shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
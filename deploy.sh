@@ -51,7 +51,7 @@ COPY requirements.txt .
 RUN pip install --no-cache-dir -r requirements.txt
 
 # Copy the application code and assets
-COPY main.py .
+COPY main.py wsgi.py gunicorn.conf.py ./
 COPY questions.json .
 COPY users.json .
 COPY progress.json .
@@ -63,8 +63,9 @@ COPY static/ ./static/
 # Expose the port the app runs on
 EXPOSE 5019
 
-# Command to run the application
-CMD ["python", "main.py"]
+# Run under gunicorn: data is loaded once in the master, then shared by the forked workers
+# (tune with WEB_CONCURRENCY and GUNICORN_THREADS)
+CMD ["gunicorn", "-c", "gunicorn.conf.py"]
 EOF
 echo -e "${GREEN}✓ Created Dockerfile${NC}"
 
@@ -84,8 +85,11 @@ services:
       - ./questions.json:/app/questions.json
       - ./users.json:/app/users.json
       - ./progress.json:/app/progress.json
+      - ./progress.log:/app/progress.log
       - ./flashcards.json:/app/flashcards.json
       - ./flashcard_progress.json:/app/flashcard_progress.json
+      - ./flashcard_progress:/app/flashcard_progress
+      - ./exam_attempts:/app/exam_attempts
     restart: unless-stopped
 EOF
 echo -e "${GREEN}✓ Created docker-compose.yml${NC}"
@@ -111,12 +115,14 @@ cat > requirements.txt << 'EOF'
 Flask==2.3.3
 Markdown==3.5.1
 Flask-Session==0.5.0
+gunicorn==22.0.0
+numpy==2.0.2
 EOF
 echo -e "${GREEN}✓ Updated requirements.txt with all dependencies${NC}"
 
 # Ensure directories exist
-mkdir -p templates static
-echo -e "${GREEN}✓ Ensured templates and static directories exist${NC}"
+mkdir -p templates static flashcard_progress exam_attempts
+echo -e "${GREEN}✓ Ensured templates, static, flashcard_progress and exam_attempts directories exist${NC}"
 
 # Check for users.json and create if missing
 if [ ! -f users.json ]; then
@@ -148,6 +154,14 @@ else
     echo -e "${GREEN}✓ progress.json already exists${NC}"
 fi
 
+# Check for progress.log (append-only answer log) and create if missing
+if [ ! -f progress.log ]; then
+    touch progress.log
+    echo -e "${GREEN}✓ Created empty progress.log${NC}"
+else
+    echo -e "${GREEN}✓ progress.log already exists${NC}"
+fi
+
 # Check for questions.json and create if missing
 if [ ! -f questions.json ]; then
     echo -e "${YELLOW}Creating default questions.json file...${NC}"
@@ -0,0 +1,39 @@
+"""Gunicorn settings for production: gunicorn -c gunicorn.conf.py
+
+Tune with environment variables:
+    WEB_CONCURRENCY   worker processes (default: 2 per CPU, at most 8)
+    GUNICORN_THREADS  threads per worker (default 4)
+    BIND              listen address (default 0.0.0.0:5019)
+
+Data changes need no restart: workers notice a changed questions.json,
+flashcards.json or database version within a second and reload it. Send
+SIGHUP to the master to gracefully replace the workers; the master
+refreshes its preloaded data first, so the new workers fork from it.
+"""
+
+import multiprocessing
+import os
+
+wsgi_app = 'wsgi:application'
+bind = os.environ.get('BIND', '0.0.0.0:5019')
+
+# Load the app (and all data) once in the master, then fork
+preload_app = True
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2, 8)))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+def on_reload(server):
+    """On SIGHUP, refresh the preloaded data before the replacement workers fork"""
+    import gc
+    import main
+    
+    main.warm_caches()
+    gc.freeze()
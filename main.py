@@ -1,13 +1,49 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_from_directory
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_from_directory, g
+from flask import has_request_context, before_render_template, template_rendered
 import random  
 import json
 import os
+import re
+import errno
+import shutil
+import tempfile
+import bisect
+import csv
+import hashlib
+import heapq
+import io
+import itertools
+import math
+import mmap
+import secrets
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+import click
 import markdown
 import datetime
 from datetime import datetime, timedelta
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from functools import wraps
+from types import MappingProxyType
+from urllib.parse import quote, unquote
 from werkzeug.middleware.proxy_fix import ProxyFix
 
+try:
+    import fcntl
+except ImportError:  # Windows: no inter-process locking, single worker only
+    fcntl = None
+
+try:
+    import numpy as np
+except ImportError:  # Item analysis report is unavailable without NumPy
+    np = None
+
 app = Flask(__name__)
 app.secret_key = 'your_secret_key_change_this_in_production'  # Change this in production!
 
@@ -18,10 +54,184 @@ app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_port=1)
 app.config['SESSION_TYPE'] = 'filesystem'
 app.config['PREFERRED_URL_SCHEME'] = 'https'
 
+# Configure storage: 'json' (flat files, default) or 'sqlite'
+app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'json')
+app.config['SQLITE_PATH'] = os.environ.get('SQLITE_PATH', 'study_app.db')
+app.config['DUPLICATE_THRESHOLD'] = float(os.environ.get('DUPLICATE_THRESHOLD', '0.6'))  # Jaccard similarity that counts as a near-duplicate
+app.config['QUESTION_INDEX_PATH'] = os.environ.get('QUESTION_INDEX_PATH', 'question_index.json')  # Persisted search index
+app.config['QUESTION_SNAPSHOT_PATH'] = os.environ.get('QUESTION_SNAPSHOT_PATH', 'questions.snapshot')  # JSON backend, compiled from questions.json
+app.config['FLASHCARD_PROGRESS_DIR'] = os.environ.get('FLASHCARD_PROGRESS_DIR', 'flashcard_progress')  # JSON backend, one file per user
+app.config['EXAM_ATTEMPTS_DIR'] = os.environ.get('EXAM_ATTEMPTS_DIR', 'exam_attempts')  # JSON backend, one log per user
+
+# Exam simulation: question count, time limit and pass mark of a practice exam
+app.config['EXAM_QUESTIONS'] = int(os.environ.get('EXAM_QUESTIONS', 65))
+app.config['EXAM_MINUTES'] = int(os.environ.get('EXAM_MINUTES', 130))
+app.config['EXAM_PASS_PERCENT'] = float(os.environ.get('EXAM_PASS_PERCENT', 72))
+
+# Users whose flashcard priority heap (one entry per card) each worker keeps in memory
+app.config['FLASHCARD_SCHEDULER_USERS'] = int(os.environ.get('FLASHCARD_SCHEDULER_USERS', 256))
+
+# Bulk import: questions per committed batch, and the most one import may add to the JSON backend
+# (which keeps the whole bank in one file and in memory; use SQLite for larger imports)
+app.config['IMPORT_BATCH_SIZE'] = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))
+app.config['JSON_IMPORT_LIMIT'] = int(os.environ.get('JSON_IMPORT_LIMIT', 20000))
+
+# Background threads that regrade stored answers after an answer key is edited
+app.config['REGRADE_WORKERS'] = int(os.environ.get('REGRADE_WORKERS', 2))
+
+# Quiz state (shuffled question order, position) is kept server-side; the cookie only holds its id
+app.config['QUIZ_SESSION_DIR'] = os.environ.get('QUIZ_SESSION_DIR', 'quiz_sessions')
+app.config['QUIZ_SESSION_TTL'] = int(os.environ.get('QUIZ_SESSION_TTL', 12 * 60 * 60))  # seconds
+
+# Per-request timing breakdown in a Server-Timing response header (visible in browser dev tools)
+app.config['SERVER_TIMING'] = os.environ.get('SERVER_TIMING', '0') == '1'
+
 # Create templates and static directories if they don't exist
 os.makedirs('templates', exist_ok=True)
 os.makedirs('static', exist_ok=True)
 
+# ======================= METRICS =======================
+
+class Metrics:
+    """Process-wide counters, summaries and histograms, exported in Prometheus text format
+    
+    Each worker process keeps its own values. An update is a dict lookup and
+    an add under one lock, cheap enough to leave on in production.
+    """
+    
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families = OrderedDict()
+    
+    def define(self, name, kind, help_text, buckets=None):
+        """Declare a 'counter', 'summary' or 'histogram' before it is updated"""
+        self._families[name] = {
+            'kind': kind,
+            'help': help_text,
+            'buckets': tuple(buckets or self.DEFAULT_BUCKETS) if kind == 'histogram' else (),
+            'series': {}
+        }
+    
+    def inc(self, name, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._families[name]['series']
+            series[key] = series.get(key, 0) + amount
+    
+    def observe(self, name, value, **labels):
+        family = self._families[name]
+        buckets = family['buckets']
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            entry = family['series'].get(key)
+            if entry is None:
+                # [count, sum, per-bucket counts...]; buckets are made cumulative on export
+                entry = family['series'][key] = [0, 0.0] + [0] * len(buckets)
+            entry[0] += 1
+            entry[1] += value
+            if buckets:
+                position = bisect.bisect_left(buckets, value)
+                if position < len(buckets):
+                    entry[2 + position] += 1
+    
+    @contextmanager
+    def timer(self, name, phase=None, **labels):
+        """Time a block into a summary/histogram and, in a request, into its Server-Timing phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(name, elapsed, **labels)
+            if phase:
+                add_server_timing(phase, elapsed)
+    
+    @staticmethod
+    def _labels(key, extra=()):
+        pairs = list(key) + list(extra)
+        if not pairs:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+    
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, family in self._families.items():
+                lines.append(f"# HELP {name} {family['help']}")
+                lines.append(f"# TYPE {name} {family['kind']}")
+                for key, value in sorted(family['series'].items()):
+                    if family['kind'] == 'counter':
+                        lines.append(f'{name}{self._labels(key)} {value}')
+                        continue
+                    
+                    if family['kind'] == 'histogram':
+                        cumulative = 0
+                        for bound, count in zip(family['buckets'], value[2:]):
+                            cumulative += count
+                            lines.append(f"{name}_bucket{self._labels(key, [('le', bound)])} {cumulative}")
+                        lines.append(f"{name}_bucket{self._labels(key, [('le', '+Inf')])} {value[0]}")
+                    lines.append(f'{name}_count{self._labels(key)} {value[0]}')
+                    lines.append(f'{name}_sum{self._labels(key)} {value[1]}')
+        return '\n'.join(lines) + '\n'
+
+def add_server_timing(phase, seconds):
+    """Accumulate time spent in a phase for the current request's Server-Timing header"""
+    if has_request_context():
+        timings = g.setdefault('server_timing', {})
+        timings[phase] = timings.get(phase, 0.0) + seconds
+
+def metric_file_label(filename):
+    """Label for a data file: its name, or its directory for per-user/per-quiz files"""
+    directory = os.path.dirname(filename)
+    return os.path.basename(directory) if directory else os.path.basename(filename)
+
+metrics = Metrics()
+metrics.define('study_app_http_request_duration_seconds', 'histogram', 'Wall time per request by endpoint')
+metrics.define('study_app_json_load_seconds', 'summary', 'Time reading and parsing JSON data files')
+metrics.define('study_app_json_read_bytes_total', 'counter', 'Bytes read from JSON data files')
+metrics.define('study_app_json_save_seconds', 'summary', 'Time serializing and durably writing JSON data files')
+metrics.define('study_app_written_bytes_total', 'counter', 'Bytes written to data files (JSON snapshots and the progress log)')
+metrics.define('study_app_markdown_render_seconds', 'summary', 'Time converting Markdown to HTML on render cache misses')
+metrics.define('study_app_markdown_cache_total', 'counter', 'Markdown render cache lookups by result')
+metrics.define('study_app_template_render_seconds', 'summary', 'Time rendering Jinja templates')
+
+@before_render_template.connect_via(app)
+def _template_render_started(sender, template, context, **extra):
+    g.setdefault('template_starts', []).append(time.perf_counter())
+
+@template_rendered.connect_via(app)
+def _template_render_finished(sender, template, context, **extra):
+    starts = g.get('template_starts')
+    if starts:
+        elapsed = time.perf_counter() - starts.pop()
+        metrics.observe('study_app_template_render_seconds', elapsed, template=template.name)
+        add_server_timing('template', elapsed)
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_request_metrics(response):
+    started = g.get('request_started')
+    if started is None:
+        return response
+    
+    elapsed = time.perf_counter() - started
+    metrics.observe('study_app_http_request_duration_seconds', elapsed,
+                    endpoint=request.endpoint or 'unmatched', method=request.method, status=response.status_code)
+    
+    if app.config['SERVER_TIMING']:
+        timings = g.get('server_timing', {})
+        entries = [f'{phase};dur={seconds * 1000:.2f}' for phase, seconds in timings.items()]
+        entries.append(f'total;dur={elapsed * 1000:.2f}')
+        response.headers['Server-Timing'] = ', '.join(entries)
+    return response
+
 # ======================= SIMPLE DATA HELPER =======================
 
 class SimpleDataHelper:
@@ -30,49 +240,2534 @@ class SimpleDataHelper:
     @staticmethod
     def load_json(filename, default=None):
         """Load any JSON file"""
+        label = metric_file_label(filename)
+        with metrics.timer('study_app_json_load_seconds', phase='json_load', file=label):
+            try:
+                with open(filename, 'rb') as f:
+                    raw = f.read()
+            except FileNotFoundError:
+                return default if default is not None else {}
+            metrics.inc('study_app_json_read_bytes_total', len(raw), file=label)
+            return json.loads(raw)
+    
+    @staticmethod
+    def save_json(filename, data, compact=False):
+        """Save any JSON file atomically (temp file + fsync + rename)
+        
+        Readers in other workers see either the old or the new file, never a
+        truncated one. compact=True drops indentation for machine-only files.
+        """
+        label = metric_file_label(filename)
+        directory = os.path.dirname(os.path.abspath(filename))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(filename)}.', suffix='.tmp')
+        try:
+            with metrics.timer('study_app_json_save_seconds', phase='json_save', file=label), os.fdopen(fd, 'w') as f:
+                if compact:
+                    # dumps() takes the C encoder; dump() to a file always runs the pure-Python one
+                    f.write(json.dumps(data, separators=(',', ':')))
+                else:
+                    json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+                metrics.inc('study_app_written_bytes_total', os.fstat(f.fileno()).st_size, file=label)
+            
+            try:
+                os.chmod(tmp_path, os.stat(filename).st_mode & 0o777)
+            except FileNotFoundError:
+                os.chmod(tmp_path, 0o644)
+            
+            try:
+                os.replace(tmp_path, filename)
+            except OSError as e:
+                # Single-file bind mounts (docker-compose volumes) can't be renamed over
+                if e.errno != errno.EBUSY:
+                    raise
+                shutil.copyfile(tmp_path, filename)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    @staticmethod
+    @contextmanager
+    def file_lock(filename):
+        """Hold an exclusive inter-process lock around a read-modify-write of filename"""
+        with open(f'{filename}.lock', 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    @staticmethod
+    def file_signature(filename):
+        """Return (mtime, size) for change detection, or None if the file is missing"""
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+# ======================= CACHED COLLECTIONS =======================
+
+class CachedCollection:
+    """Id-keyed documents shared by all requests, reloaded only when storage changes"""
+    
+    def __init__(self, load, save, version, check_interval=1.0):
+        self._load_documents = load
+        self._save_documents = save
+        self._storage_version = version
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature = None
+        self._last_check = 0.0
+        self._items = ()
+        self._by_id = {}
+    
+    def _refresh(self):
+        """Reload if the storage version changed (checked at most once per interval)"""
+        now = time.monotonic()
+        if self._signature is not None and now - self._last_check < self.check_interval:
+            return
+        
+        with self._lock:
+            self._last_check = now
+            signature = self._storage_version()
+            if signature != self._signature or signature is None:
+                self._load(self._load_documents(), signature)
+    
+    def _load(self, documents, signature):
+        # Each document is exposed read-only so routes can't mutate the shared copy
+        frozen = tuple(MappingProxyType(dict(doc)) for doc in documents)
+        self._items = frozen
+        self._by_id = {doc['id']: doc for doc in frozen}
+        self._build_indexes(frozen)
+        self._signature = signature
+    
+    def _build_indexes(self, documents):
+        """Hook for subclasses to derive extra indexes from a freshly loaded version"""
+    
+    def all(self):
+        """Return all documents in stored order as read-only mappings"""
+        self._refresh()
+        return self._items
+    
+    def get(self, doc_id):
+        """Return one document by id (read-only), or None"""
+        self._refresh()
+        return self._by_id.get(doc_id)
+    
+    def ids(self):
+        """Return all ids in stored order"""
+        return [doc['id'] for doc in self.all()]
+    
+    @property
+    def version(self):
+        """Storage version the cached documents were loaded from"""
+        self._refresh()
+        return self._signature
+    
+    def __len__(self):
+        return len(self.all())
+    
+    def replace(self, documents, changed_ids=None, added=()):
+        """Persist the documents and swap in the stored result
+        
+        With changed_ids only those documents are written (merged with the
+        stored list), so concurrent edits from other workers are kept.
+        Documents in added are new and get their ids from storage.
+        """
+        with self._lock:
+            persisted = self._save_documents(documents, changed_ids, added)
+            self._load(persisted, self._storage_version())
+            self._last_check = time.monotonic()
+    
+    def add(self, documents):
+        """Store new documents, setting each one's 'id' to the id storage assigned"""
+        self.replace([], changed_ids=(), added=documents)
+
+class QuestionBank(CachedCollection):
+    """Parsed question bank with id, type, tag, sort-order and full-text indexes
+    
+    With a backend that compiles a QuestionSnapshot, questions stay in the
+    memory-mapped snapshot and are decoded one at a time on lookup; the
+    indexes are built from the snapshot's precomputed summary. The
+    keyword-filter text and the duplicate index are built on first use.
+    """
+    
+    SORT_KEYS = ('id', 'question', 'type')
+    
+    def __init__(self, storage, check_interval=1.0, search_index=None, duplicate_index=None):
+        load = getattr(storage, 'load_question_snapshot', storage.load_questions)
+        super().__init__(load, storage.save_questions, storage.questions_version, check_interval)
+        self.search_index = search_index
+        self.duplicate_index = duplicate_index
+        self._ids = []
+        self._sorted_ids = []
+        self._orders = {}
+        self._by_type = {}
+        self._by_tag = {}
+        self._search_text = None
+        self._content_hashes = {}
+        self._duplicates_synced = None
+    
+    @staticmethod
+    def summarize(questions):
+        """What the indexes need from a question list, without the question text (stored in snapshots)"""
+        by_type = {}
+        by_tag = {}
+        for question in questions:
+            by_type.setdefault(question.get('question_type', 'single'), []).append(question['id'])
+            for tag in question.get('tags') or []:
+                by_tag.setdefault(tag, []).append(question['id'])
+        return {
+            'ids': [question['id'] for question in questions],
+            'types': by_type,
+            'tags': by_tag,
+            'question_order': [question['id'] for question in sorted(
+                questions, key=lambda question: ((question.get('question') or '').lower(), question['id']))],
+            'search_hashes': [QuestionSearchIndex.content_hash(question) for question in questions]
+        }
+    
+    def _load(self, documents, signature):
+        if not isinstance(documents, QuestionSnapshot):
+            super()._load(documents, signature)
+            return
+        self._items = documents.values()
+        self._by_id = documents
+        self._index(documents.summary)
+        self._signature = signature
+    
+    def _build_indexes(self, questions):
+        self._index(self.summarize(questions))
+    
+    def _index(self, summary):
+        self._ids = summary['ids']
+        self._sorted_ids = sorted(self._ids)
+        self._by_type = {question_type: set(ids) for question_type, ids in summary['types'].items()}
+        self._by_tag = {tag: set(ids) for tag, ids in summary['tags'].items()}
+        self._search_text = None
+        self._content_hashes = dict(zip(self._ids, summary['search_hashes']))
+        
+        types = {question_id: question_type for question_type, ids in summary['types'].items() for question_id in ids}
+        self._orders = {
+            'id': self._sorted_ids,
+            'question': summary['question_order'],
+            'type': sorted(self._sorted_ids, key=types.__getitem__)
+        }
+        
+        if self.search_index is not None:
+            self.search_index.sync(self._content_hashes, self._by_id.__getitem__)
+    
+    def _keyword_text(self):
+        """{question id: lowercased question text} for keyword filtering, built on first use per version"""
+        search_text = self._search_text
+        if search_text is None:
+            search_text = self._search_text = {question['id']: (question.get('question') or '').lower()
+                                               for question in self._items}
+        return search_text
+    
+    def _sync_duplicates(self):
+        # Same content hashes as the search index: after a save only the changed questions are re-shingled
+        hashes = self._content_hashes
+        if self._duplicates_synced is not hashes:
+            self.duplicate_index.sync(hashes, self._by_id.__getitem__)
+            self._duplicates_synced = hashes
+    
+    def ids(self):
+        """Return all ids in stored order"""
+        self._refresh()
+        return list(self._ids)
+    
+    def content_hashes(self):
+        """Return {question id: hash of its text, options and explanation} for spotting edited questions"""
+        self._refresh()
+        return dict(self._content_hashes)
+    
+    def tag_counts(self):
+        """Return {tag: number of questions}, sorted by tag"""
+        self._refresh()
+        return {tag: len(self._by_tag[tag]) for tag in sorted(self._by_tag)}
+    
+    def id_set(self, tag=''):
+        """Return the set of question ids, optionally only those carrying a tag"""
+        self._refresh()
+        return frozenset(self._by_tag.get(tag, ())) if tag else frozenset(self._by_id)
+    
+    def tags_by_id(self):
+        """Return {question id: tags} for tagged questions"""
+        self._refresh()
+        tags = {}
+        for tag, question_ids in self._by_tag.items():
+            for question_id in question_ids:
+                tags.setdefault(question_id, []).append(tag)
+        return tags
+    
+    def near_duplicates(self, question, threshold=None):
+        """Return [(question, similarity)] of stored questions that look like this one"""
+        self._refresh()
+        if self.duplicate_index is None:
+            return []
+        self._sync_duplicates()
+        matches = self.duplicate_index.similar(question, threshold, exclude_id=question.get('id'))
+        return [(self._by_id[question_id], similarity) for question_id, similarity in matches if question_id in self._by_id]
+    
+    def duplicate_clusters(self, threshold=None):
+        """Return near-duplicate clusters over the whole bank: [{'questions': [...], 'pairs': [(id, id, similarity)]}]"""
+        self._refresh()
+        if self.duplicate_index is None:
+            return []
+        self._sync_duplicates()
+        return [{'questions': [self._by_id[question_id] for question_id in cluster['ids'] if question_id in self._by_id],
+                 'pairs': cluster['pairs']}
+                for cluster in self.duplicate_index.clusters(threshold)]
+    
+    def search(self, query, offset=0, limit=20):
+        """Return ([(question, score)], total matches) ranked by BM25 relevance"""
+        self._refresh()
+        if self.search_index is None:
+            return [], 0
+        ranked, total = self.search_index.search(query, offset, limit)
+        return [(self._by_id[question_id], score) for question_id, score in ranked if question_id in self._by_id], total
+    
+    def page(self, query='', question_type='', min_id=None, max_id=None, sort='id', descending=False,
+             offset=0, limit=25):
+        """Return (questions, total matches) for one page of the filtered, sorted bank
+        
+        Unfiltered pages are a slice of a precomputed order; filters narrow
+        the candidates through the type index and a bisect over sorted ids
+        before the keyword substring check.
+        """
+        self._refresh()
+        order = self._orders.get(sort, self._sorted_ids)
+        if descending:
+            order = order[::-1]
+        
+        candidates = None
+        if question_type:
+            candidates = self._by_type.get(question_type, set())
+        if min_id is not None or max_id is not None:
+            low = bisect.bisect_left(self._sorted_ids, min_id) if min_id is not None else 0
+            high = bisect.bisect_right(self._sorted_ids, max_id) if max_id is not None else len(self._sorted_ids)
+            in_range = self._sorted_ids[low:high]
+            candidates = set(in_range) if candidates is None else candidates.intersection(in_range)
+        
+        query = query.lower()
+        if query:
+            search_text = self._keyword_text()
+            pool = search_text if candidates is None else candidates
+            candidates = {question_id for question_id in pool if query in search_text[question_id]}
+        
+        if candidates is None:
+            matches = order
+        else:
+            matches = [question_id for question_id in order if question_id in candidates]
+        
+        return [self._by_id[question_id] for question_id in matches[offset:offset + limit]], len(matches)
+
+class FlashcardDeck(CachedCollection):
+    """Flashcards with category, tag and trigram indexes, rebuilt once per stored version
+    
+    Text search keeps the old semantics (case-insensitive substring of front
+    or back): trigram postings narrow the candidates, which are then
+    confirmed with a plain substring check.
+    """
+    
+    def __init__(self, storage, check_interval=1.0):
+        super().__init__(storage.load_flashcards, storage.save_flashcards, storage.flashcards_version, check_interval)
+        self._position = {}
+        self._by_category = {}
+        self._by_tag = {}
+        self._trigrams = {}
+        self._search_text = {}
+        self._category_counts = {}
+    
+    @staticmethod
+    def _trigrams_of(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+    
+    def _build_indexes(self, cards):
+        self._position = {card['id']: i for i, card in enumerate(cards)}
+        self._by_category = {}
+        self._by_tag = {}
+        self._trigrams = {}
+        self._search_text = {}
+        self._category_counts = {}
+        
+        for card in cards:
+            card_id = card['id']
+            self._by_category.setdefault(card.get('category'), set()).add(card_id)
+            category = card.get('category', 'General')
+            self._category_counts[category] = self._category_counts.get(category, 0) + 1
+            for tag in card.get('tags') or []:
+                self._by_tag.setdefault(tag.lower(), set()).add(card_id)
+            
+            front = (card.get('front') or '').lower()
+            back = (card.get('back') or '').lower()
+            self._search_text[card_id] = (front, back)
+            for gram in self._trigrams_of(front) | self._trigrams_of(back):
+                self._trigrams.setdefault(gram, set()).add(card_id)
+    
+    def categories(self):
+        """Return the sorted non-empty categories"""
+        self._refresh()
+        return sorted(category for category in self._by_category if category)
+    
+    def category_counts(self):
+        """Return {category: number of cards} in order of first appearance in the deck"""
+        self._refresh()
+        return self._category_counts
+    
+    def search(self, query='', category='', tag=''):
+        """Return cards matching all given filters, in deck order"""
+        self._refresh()
+        candidates = None
+        
+        if category:
+            candidates = set(self._by_category.get(category, ()))
+        if tag:
+            tagged = self._by_tag.get(tag.lower(), set())
+            candidates = tagged if candidates is None else candidates & tagged
+        
+        query = query.lower()
+        if len(query) >= 3:
+            # Intersect the rarest postings first so the candidate set shrinks fast
+            postings = sorted((self._trigrams.get(gram, set()) for gram in self._trigrams_of(query)), key=len)
+            for posting in postings:
+                candidates = set(posting) if candidates is None else candidates & posting
+                if not candidates:
+                    break
+        
+        if candidates is None:
+            candidates = self._by_id.keys()
+        
+        if query:
+            candidates = [card_id for card_id in candidates
+                          if query in self._search_text[card_id][0] or query in self._search_text[card_id][1]]
+        
+        return [self._by_id[card_id] for card_id in sorted(candidates, key=self._position.__getitem__)]
+
+# ======================= QUESTION SNAPSHOT =======================
+
+class QuestionSnapshot(Mapping):
+    """Read-only {question id: question} over a compiled, memory-mapped snapshot of the question bank
+    
+    Layout: a header (magic, the mtime/size of the questions.json it was
+    compiled from, question count, summary length), the summary JSON that
+    QuestionBank builds its indexes from, an id-sorted table of
+    (id, offset, length) and one compact JSON record per question. A lookup
+    binary-searches the table and decodes a single record, so the bank
+    costs the same to open at any size and the pages are shared by every
+    worker through the OS page cache. Decoded questions are kept in a
+    small LRU.
+    """
+    
+    MAGIC = b'QBSNAP01'
+    HEADER = struct.Struct('<8sqqQQ')
+    ENTRY = struct.Struct('<qQI')
+    
+    def __init__(self, path, cache_size=256):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, mtime, size, count, summary_length = self.HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC:
+            raise ValueError(f'{path} is not a question snapshot')
+        self.source_signature = (mtime, size)
+        self.summary = json.loads(self._mmap[self.HEADER.size:self.HEADER.size + summary_length])
+        self._count = count
+        self._table = self.HEADER.size + summary_length
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+    
+    @classmethod
+    def open(cls, path, source_signature):
+        """Open the snapshot at path if it was compiled from this version of the source, else None"""
+        try:
+            snapshot = cls(path)
+        except (OSError, ValueError, struct.error):
+            return None
+        return snapshot if snapshot.source_signature == tuple(source_signature) else None
+    
+    @classmethod
+    def compile(cls, path, questions, source_signature):
+        """Atomically write a snapshot of a question list and open it"""
+        summary = json.dumps(QuestionBank.summarize(questions), separators=(',', ':')).encode('utf-8')
+        records = sorted(((question['id'], json.dumps(question, separators=(',', ':')).encode('utf-8'))
+                          for question in questions), key=lambda record: record[0])
+        offset = cls.HEADER.size + len(summary) + cls.ENTRY.size * len(records)
+        table = bytearray()
+        for question_id, data in records:
+            table += cls.ENTRY.pack(question_id, offset, len(data))
+            offset += len(data)
+        
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                        prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(cls.HEADER.pack(cls.MAGIC, source_signature[0], source_signature[1], len(records), len(summary)))
+                f.write(summary)
+                f.write(table)
+                f.writelines(data for _, data in records)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp creates the file 0600; keep the mode of the snapshot being replaced, like save_json
+            try:
+                os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+            except FileNotFoundError:
+                os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        metrics.inc('study_app_written_bytes_total', offset, file=metric_file_label(path))
+        return cls(path)
+    
+    def _find(self, question_id):
+        """Binary search of the id table; returns (offset, length) or None"""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            entry_id, offset, length = self.ENTRY.unpack_from(self._mmap, self._table + middle * self.ENTRY.size)
+            if entry_id < question_id:
+                low = middle + 1
+            elif entry_id > question_id:
+                high = middle
+            else:
+                return offset, length
+        return None
+    
+    def __getitem__(self, question_id):
+        with self._lock:
+            question = self._cache.get(question_id)
+            if question is not None:
+                self._cache.move_to_end(question_id)
+                return question
+        
+        location = self._find(question_id) if isinstance(question_id, int) else None
+        if location is None:
+            raise KeyError(question_id)
+        offset, length = location
+        question = MappingProxyType(json.loads(self._mmap[offset:offset + length]))
+        
+        with self._lock:
+            self._cache[question_id] = question
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return question
+    
+    def __contains__(self, question_id):
+        return isinstance(question_id, int) and self._find(question_id) is not None
+    
+    def __iter__(self):
+        """Ids in stored order"""
+        return iter(self.summary['ids'])
+    
+    def __len__(self):
+        return self._count
+
+# ======================= QUESTION SEARCH =======================
+
+SEARCH_STOPWORDS = frozenset(
+    'a an and are as at be by can for from how in into is it of on or that the this to was what when '
+    'which while who why will with you your'.split()
+)
+SEARCH_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+def search_terms(text):
+    """Lowercase word tokens with stopwords dropped and a light suffix-stripping stem"""
+    terms = []
+    for token in SEARCH_TOKEN_RE.findall((text or '').lower()):
+        if token in SEARCH_STOPWORDS:
+            continue
+        if len(token) > 4 and token.endswith('ies'):
+            token = token[:-3] + 'y'
+        elif len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        for suffix in ('ing', 'ed'):
+            if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                token = token[:-len(suffix)]
+                break
+        if len(token) > 4 and token.endswith('e'):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+class QuestionSearchIndex:
+    """BM25-ranked inverted index over question, option and explanation text
+    
+    The index follows the question bank: on every reload only questions
+    whose searchable text changed (by content hash) are re-tokenized. The
+    per-question term counts are persisted at startup so a restart only
+    re-indexes what changed since the file was written.
+    """
+    
+    FIELD_WEIGHTS = (('question', 2.0), ('options', 1.5), ('explanation', 1.0))
+    K1 = 1.2
+    B = 0.75
+    
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._docs = {}       # question id -> {'h': content hash, 'tf': {term: weighted count}}
+        self._postings = {}   # term -> {question id: weighted count}
+        self._lengths = {}    # question id -> weighted length
+        self._total_length = 0.0
+    
+    @staticmethod
+    def content_hash(question):
+        fields = [question.get('question'), list(question.get('options') or []), question.get('explanation')]
+        return hashlib.sha1(json.dumps(fields).encode('utf-8')).hexdigest()[:16]
+    
+    def _term_counts(self, question):
+        counts = {}
+        for field, weight in self.FIELD_WEIGHTS:
+            value = question.get(field)
+            text = ' '.join(value) if isinstance(value, (list, tuple)) else value
+            for term in search_terms(text):
+                counts[term] = counts.get(term, 0.0) + weight
+        return counts
+    
+    def _add(self, question_id, content_hash, counts):
+        self._docs[question_id] = {'h': content_hash, 'tf': counts}
+        for term, count in counts.items():
+            self._postings.setdefault(term, {})[question_id] = count
+        length = sum(counts.values())
+        self._lengths[question_id] = length
+        self._total_length += length
+    
+    def _remove(self, question_id):
+        doc = self._docs.pop(question_id, None)
+        if doc is None:
+            return
+        for term in doc['tf']:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(question_id, None)
+                if not posting:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(question_id, 0.0)
+    
+    def _load_persisted(self):
+        self._loaded = True
+        if not self.path:
+            return
+        stored = SimpleDataHelper.load_json(self.path, {})
+        for question_id, doc in stored.get('docs', {}).items():
+            self._add(int(question_id), doc['h'], doc['tf'])
+    
+    def sync(self, hashes, load):
+        """Bring the index in line with {question id: content hash}, loading and re-indexing only changed questions"""
+        with self._lock:
+            first_sync = not self._loaded
+            if first_sync:
+                self._load_persisted()
+            
+            changed = 0
+            for question_id, content_hash in hashes.items():
+                doc = self._docs.get(question_id)
+                if doc is None or doc['h'] != content_hash:
+                    self._remove(question_id)
+                    self._add(question_id, content_hash, self._term_counts(load(question_id)))
+                    changed += 1
+            
+            for question_id in [question_id for question_id in self._docs if question_id not in hashes]:
+                self._remove(question_id)
+                changed += 1
+            
+            if first_sync and changed and self.path:
+                SimpleDataHelper.save_json(self.path, {'docs': self._docs}, compact=True)
+    
+    def search(self, query, offset=0, limit=20):
+        """Return ([(question id, score)] best first, total matches) for a free-text query"""
+        terms = set(search_terms(query))
+        with self._lock:
+            count = len(self._docs)
+            if not terms or not count:
+                return [], 0
+            average_length = self._total_length / count or 1.0
+            
+            scores = {}
+            for term in terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+                for question_id, tf in posting.items():
+                    norm = self.K1 * (1 - self.B + self.B * self._lengths[question_id] / average_length)
+                    scores[question_id] = scores.get(question_id, 0.0) + idf * tf * (self.K1 + 1) / (tf + norm)
+        
+        best = heapq.nlargest(offset + limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return best[offset:], len(scores)
+
+# ======================= NEAR-DUPLICATE DETECTION =======================
+
+class QuestionDuplicateIndex:
+    """MinHash/LSH index over question and option text for near-duplicate lookups
+    
+    Each question is reduced to character 5-shingles of its normalized
+    words (a few hundred per question, so nearly every bin is filled). A
+    one-permutation MinHash (one crc32 per shingle, split into 64 bins)
+    gives its signature, and
+    banded LSH buckets map signature slices to question ids. A lookup only
+    compares the few questions sharing a bucket, verified by exact Jaccard
+    similarity of the shingle sets.
+    """
+    
+    BINS = 64
+    BANDS = 16
+    VALUE_BITS = 26  # crc32 = 6 bin bits + 26 value bits
+    
+    def __init__(self, threshold=0.6):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._hashes = {}    # question id -> content hash
+        self._shingles = {}  # question id -> frozenset of shingle hashes
+        self._bands = {}     # question id -> band keys
+        self._buckets = {}   # band key -> set of question ids
+    
+    @staticmethod
+    def _text(question):
+        options = ' '.join(sorted(question.get('options') or []))
+        return f"{question.get('question') or ''} | {options}"
+    
+    @staticmethod
+    def shingles(text):
+        text = ' '.join(SEARCH_TOKEN_RE.findall(text.lower())).encode('utf-8')
+        size = min(5, len(text))
+        return frozenset(zlib.crc32(text[i:i + size]) for i in range(len(text) - size + 1)) if text else frozenset()
+    
+    def signature(self, shingles):
+        """One-permutation MinHash: minimum value per bin, empty bins borrowed from the next filled one"""
+        mask = (1 << self.VALUE_BITS) - 1
+        signature = [None] * self.BINS
+        for shingle in shingles:
+            bin_number, value = shingle >> self.VALUE_BITS, shingle & mask
+            if signature[bin_number] is None or value < signature[bin_number]:
+                signature[bin_number] = value
+        if not shingles:
+            return signature
+        
+        for bin_number in range(self.BINS):
+            distance = 1
+            while signature[bin_number] is None:
+                borrowed = signature[(bin_number + distance) % self.BINS]
+                if borrowed is not None and borrowed <= mask:
+                    signature[bin_number] = borrowed + (distance << self.VALUE_BITS)
+                distance += 1
+        return signature
+    
+    def _band_keys(self, shingles):
+        signature = self.signature(shingles)
+        rows = self.BINS // self.BANDS
+        return [(band, tuple(signature[band * rows:(band + 1) * rows])) for band in range(self.BANDS)]
+    
+    def _add(self, question_id, content_hash, shingles):
+        bands = self._band_keys(shingles)
+        self._hashes[question_id] = content_hash
+        self._shingles[question_id] = shingles
+        self._bands[question_id] = bands
+        for key in bands:
+            self._buckets.setdefault(key, set()).add(question_id)
+    
+    def _remove(self, question_id):
+        self._hashes.pop(question_id, None)
+        self._shingles.pop(question_id, None)
+        for key in self._bands.pop(question_id, ()):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(question_id)
+                if not bucket:
+                    del self._buckets[key]
+    
+    @staticmethod
+    def jaccard(first, second):
+        if not first or not second:
+            return 0.0
+        return len(first & second) / len(first | second)
+    
+    def sync(self, hashes, load):
+        """Bring the index in line with {question id: content hash}, loading and re-shingling only changed questions"""
+        with self._lock:
+            for question_id, content_hash in hashes.items():
+                if self._hashes.get(question_id) != content_hash:
+                    self._remove(question_id)
+                    self._add(question_id, content_hash, self.shingles(self._text(load(question_id))))
+            for question_id in [question_id for question_id in self._hashes if question_id not in hashes]:
+                self._remove(question_id)
+    
+    def similar(self, question, threshold=None, exclude_id=None):
+        """Return [(question id, similarity)] of indexed questions close to this one, most similar first"""
+        threshold = self.threshold if threshold is None else threshold
+        shingles = self.shingles(self._text(question))
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(shingles):
+                candidates.update(self._buckets.get(key, ()))
+            candidates.discard(exclude_id)
+            matches = [(question_id, self.jaccard(shingles, self._shingles[question_id])) for question_id in candidates]
+        return sorted([match for match in matches if match[1] >= threshold], key=lambda match: -match[1])
+    
+    def clusters(self, threshold=None):
+        """Group the whole bank into near-duplicate clusters from LSH candidate pairs
+        
+        Returns [{'ids': sorted ids, 'pairs': [(id, id, similarity)]}], largest first.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            candidate_pairs = set()
+            for bucket in self._buckets.values():
+                if len(bucket) > 1:
+                    candidate_pairs.update(itertools.combinations(sorted(bucket), 2))
+            pairs = []
+            for first, second in candidate_pairs:
+                similarity = self.jaccard(self._shingles[first], self._shingles[second])
+                if similarity >= threshold:
+                    pairs.append((first, second, similarity))
+        
+        # Union-find over the verified pairs
+        parent = {}
+        def root(question_id):
+            while parent.setdefault(question_id, question_id) != question_id:
+                parent[question_id] = parent[parent[question_id]]
+                question_id = parent[question_id]
+            return question_id
+        for first, second, _ in pairs:
+            parent[root(first)] = root(second)
+        
+        groups = {}
+        for pair in sorted(pairs, key=lambda pair: -pair[2]):
+            groups.setdefault(root(pair[0]), {'ids': set(), 'pairs': []})
+            group = groups[root(pair[0])]
+            group['ids'].update(pair[:2])
+            group['pairs'].append(pair)
+        clusters = [{'ids': sorted(group['ids']), 'pairs': group['pairs']} for group in groups.values()]
+        return sorted(clusters, key=lambda cluster: (-len(cluster['ids']), cluster['ids'][0]))
+
+# ======================= SPACED REPETITION =======================
+
+# SM-2 recall quality for each self-rating: "hard" counts as a lapse
+REVIEW_QUALITY = {'hard': 2, 'medium': 4, 'easy': 5}
+DEFAULT_EASE_FACTOR = 2.5
+MIN_EASE_FACTOR = 1.3
+MAX_INTERVAL_DAYS = 36500  # intervals grow geometrically; cap them well inside the date range
+
+def apply_review(card_stats, difficulty, reviewed_on):
+    """Update ease factor, interval and due date in card_stats (SM-2)"""
+    quality = REVIEW_QUALITY.get(difficulty, 4)
+    ease_factor = card_stats.get('ease_factor', DEFAULT_EASE_FACTOR)
+    repetitions = card_stats.get('repetitions', 0)
+    interval = card_stats.get('interval', 0)
+    
+    if quality < 3:
+        repetitions = 0
+        interval = 1
+    else:
+        repetitions += 1
+        if repetitions == 1:
+            interval = 1
+        elif repetitions == 2:
+            interval = 6
+        else:
+            interval = min(MAX_INTERVAL_DAYS, max(1, round(interval * ease_factor)))
+    
+    ease_factor += 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+    
+    card_stats['ease_factor'] = round(max(MIN_EASE_FACTOR, ease_factor), 2)
+    card_stats['repetitions'] = repetitions
+    card_stats['interval'] = interval
+    card_stats['due_date'] = (reviewed_on + timedelta(days=interval)).strftime('%Y-%m-%d')
+    return card_stats
+
+def card_due_date(card_stats):
+    """Due date (YYYY-MM-DD) of a studied card; cards from before scheduling are due the day after their last study"""
+    if card_stats.get('due_date'):
+        return card_stats['due_date']
+    if card_stats.get('last_studied'):
+        last_studied = datetime.strptime(card_stats['last_studied'][:10], '%Y-%m-%d')
+        return (last_studied + timedelta(days=1)).strftime('%Y-%m-%d')
+    return None
+
+# ======================= FLASHCARD PROGRESS FORMAT =======================
+
+# Stored flashcard progress is compact: ratings are 2-bit codes in a fixed-size
+# ring packed into one int, other fields use one-letter keys, and the studied-today
+# set is stamped with its date so it resets itself the next day.
+RATING_CODES = {'hard': 1, 'medium': 2, 'easy': 3}
+RATING_NAMES = {code: name for name, code in RATING_CODES.items()}
+RATINGS_KEPT = 10
+CARD_STATS_KEYS = {
+    'times_studied': 'n',
+    'last_studied': 'l',
+    'ease_factor': 'e',
+    'repetitions': 'p',
+    'interval': 'i',
+    'due_date': 'd'
+}
+
+def pack_card_stats(card_stats):
+    """Compact stored form of one card's stats"""
+    packed = {}
+    ring = 0
+    for field, value in card_stats.items():
+        if field == 'difficulty_ratings':
+            for rating in value[-RATINGS_KEPT:]:
+                ring = (ring << 2) | RATING_CODES.get(rating, 2)
+        elif value is not None:
+            packed[CARD_STATS_KEYS.get(field, field)] = value
+    if ring:
+        packed['r'] = ring
+    return packed
+
+def unpack_card_stats(packed):
+    """Expand stored card stats (compact or the old verbose form) to the working dict"""
+    if 'difficulty_ratings' in packed or 'times_studied' in packed:
+        return packed
+    
+    fields = {key: field for field, key in CARD_STATS_KEYS.items()}
+    card_stats = {'times_studied': 0, 'difficulty_ratings': [], 'last_studied': None}
+    for key, value in packed.items():
+        if key != 'r':
+            card_stats[fields.get(key, key)] = value
+    
+    ring = packed.get('r', 0)
+    ratings = []
+    while ring:
+        ratings.append(RATING_NAMES[ring & 3])
+        ring >>= 2
+    ratings.reverse()  # The newest rating sits in the low bits
+    card_stats['difficulty_ratings'] = ratings
+    return card_stats
+
+def pack_studied_today(card_ids):
+    return {'date': datetime.now().strftime('%Y-%m-%d'), 'cards': sorted(card_ids)}
+
+def unpack_studied_today(packed):
+    """Set of card ids studied today; a set stamped with an earlier date (or an undated old list) is empty"""
+    if isinstance(packed, dict) and packed.get('date') == datetime.now().strftime('%Y-%m-%d'):
+        return set(packed.get('cards', []))
+    return set()
+
+# ======================= FLASHCARD SCHEDULER =======================
+
+class FlashcardScheduler:
+    """Per-user max-heap of flashcard priorities, updated as cards are rated
+    
+    Each card is queued with its priority plus random jitter. Rating a card
+    (or serving it) re-queues just that card, so picking the next card costs
+    O(log n) instead of scoring and sorting the whole deck. Superseded heap
+    entries are marked dead and skipped (lazy deletion). Heaps and due
+    indexes are kept for the max_users most recently active users only
+    (and dropped at logout); anyone else's is rebuilt on their next card.
+    """
+    
+    def __init__(self, deck, max_users=256):
+        self.deck = deck
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._queues = OrderedDict()
+        self._due = OrderedDict()
+        self._sequence = itertools.count()
+    
+    @staticmethod
+    def priority(card_stats):
+        """Base priority before jitter: higher for unstudied and hard cards"""
+        times_studied = card_stats.get('times_studied', 0)
+        recent_ratings = card_stats.get('difficulty_ratings', [])[-3:]  # Last 3 ratings
+        
+        # Reduce score based on times studied (recently studied = lower priority)
+        score = 100 - times_studied * 10
+        
+        # Increase score for hard cards
+        if recent_ratings:
+            avg_difficulty = sum(1 if d == 'hard' else 2 if d == 'medium' else 3 for d in recent_ratings) / len(recent_ratings)
+            score += (3 - avg_difficulty) * 20  # Hard cards get higher score
+        
+        return score
+    
+    def _push(self, queue, card_id, card_stats):
+        previous = queue['entries'].get(card_id)
+        if previous is not None:
+            previous[2] = None  # Dead entry, skipped when it reaches the top
+        
+        score = self.priority(card_stats) + random.randint(-10, 10)
+        entry = [-score, next(self._sequence), card_id, card_stats.get('times_studied', 0)]
+        queue['entries'][card_id] = entry
+        heapq.heappush(queue['heap'], entry)
+    
+    def _build(self, card_stats):
+        queue = {'version': self.deck.version, 'heap': [], 'entries': {}}
+        for card in self.deck.all():
+            stats = card_stats.get(str(card['id']), {})
+            score = self.priority(stats) + random.randint(-10, 10)
+            entry = [-score, next(self._sequence), card['id'], stats.get('times_studied', 0)]
+            queue['entries'][card['id']] = entry
+            queue['heap'].append(entry)
+        heapq.heapify(queue['heap'])
+        return queue
+    
+    def _remember(self, cache, username, value):
+        """Store a per-user structure as most recently used, evicting the least recently used past max_users"""
+        cache[username] = value
+        cache.move_to_end(username)
+        while len(cache) > self.max_users:
+            cache.popitem(last=False)
+        return value
+    
+    def _queue(self, username, card_stats):
+        queue = self._queues.get(username)
+        if queue is None or queue['version'] != self.deck.version:
+            queue = self._build(card_stats)
+        return self._remember(self._queues, username, queue)
+    
+    def forget(self, username):
+        """Drop a user's heap and due index (e.g. at logout)"""
+        with self._lock:
+            self._queues.pop(username, None)
+            self._due.pop(username, None)
+    
+    def next_card(self, username, card_stats):
+        """Return the highest-priority card for the user, or None for an empty deck"""
+        with self._lock:
+            queue = self._queue(username, card_stats)
+            heap = queue['heap']
+            
+            while heap:
+                entry = heap[0]
+                card_id = entry[2]
+                if card_id is None:
+                    heapq.heappop(heap)
+                    continue
+                
+                stats = card_stats.get(str(card_id), {})
+                if entry[3] != stats.get('times_studied', 0):
+                    # Rated in another worker since it was queued: re-score and look again
+                    self._push(queue, card_id, stats)
+                    continue
+                
+                # Fresh jitter for the served card, as the old full rescoring gave on every pick
+                self._push(queue, card_id, stats)
+                if len(heap) > 2 * len(queue['entries']) + 16:
+                    queue['heap'] = [e for e in heap if e[2] is not None]
+                    heapq.heapify(queue['heap'])
+                return self.deck.get(card_id)
+            
+            return None
+    
+    def record_rating(self, username, card_id, card_stats):
+        """Re-queue one card after the user rated it"""
+        with self._lock:
+            queue = self._queues.get(username)
+            if queue is not None and queue['version'] == self.deck.version:
+                self._push(queue, card_id, card_stats)
+            
+            due_index = self._due.get(username)
+            if due_index is not None:
+                self._move_due(due_index, card_id, card_due_date(card_stats))
+    
+    def _due_index(self, username, card_stats):
+        """Per-user list of (due date, card id) kept sorted, rebuilt daily or when the deck changes"""
+        today = datetime.now().strftime('%Y-%m-%d')
+        version = self.deck.version
+        index = self._due.get(username)
+        if index is None or index['built_on'] != today or index['version'] != version:
+            due_dates = {}
+            for card_id, stats in card_stats.items():
+                due_date = card_due_date(stats)
+                if due_date and self.deck.get(int(card_id)) is not None:
+                    due_dates[int(card_id)] = due_date
+            index = {
+                'built_on': today,
+                'version': version,
+                'due_dates': due_dates,
+                'entries': sorted((due_date, card_id) for card_id, due_date in due_dates.items())
+            }
+        return self._remember(self._due, username, index)
+    
+    @staticmethod
+    def _move_due(index, card_id, due_date):
+        entries = index['entries']
+        previous = index['due_dates'].pop(card_id, None)
+        if previous is not None:
+            position = bisect.bisect_left(entries, (previous, card_id))
+            if position < len(entries) and entries[position] == (previous, card_id):
+                del entries[position]
+        if due_date:
+            index['due_dates'][card_id] = due_date
+            bisect.insort(entries, (due_date, card_id))
+    
+    def due_cards(self, username, card_stats, by_date):
+        """Ids of the user's cards due on or before by_date (YYYY-MM-DD), earliest first"""
+        with self._lock:
+            index = self._due_index(username, card_stats)
+            end = bisect.bisect_right(index['entries'], (by_date, float('inf')))
+            
+            due_ids = []
+            for due_date, card_id in index['entries'][:end]:
+                # Another worker may have rescheduled this card since the index was built
+                current = card_due_date(card_stats.get(str(card_id), {}))
+                if current != due_date:
+                    self._move_due(index, card_id, current)
+                    if not current or current > by_date:
+                        continue
+                due_ids.append(card_id)
+            return due_ids
+
+# ======================= FLASHCARD STATISTICS =======================
+
+class FlashcardStats:
+    """Per-user flashcard aggregates, adjusted on each rating instead of recomputed from the deck
+    
+    A user's totals are tagged with the stored progress revision they
+    reflect. A rating saved by this worker moves one card between the
+    mastered/learning/difficult buckets; if the revision moved on elsewhere
+    (another worker, a session reset) or the deck changed, the totals are
+    rebuilt from the user's card stats on the next read.
+    """
+    
+    def __init__(self, deck):
+        self.deck = deck
+        self._lock = threading.Lock()
+        self._users = {}
+    
+    @staticmethod
+    def bucket(recent_ratings):
+        """Performance bucket for a card's last three ratings"""
+        if not recent_ratings:
+            return 'learning'
+        avg_difficulty = sum(1 if d == 'hard' else 2 if d == 'medium' else 3 for d in recent_ratings) / len(recent_ratings)
+        if avg_difficulty >= 2.5:  # Mostly easy/medium
+            return 'mastered'
+        if avg_difficulty >= 1.5:  # Mixed
+            return 'learning'
+        return 'difficult'  # Mostly hard
+    
+    def _contribution(self, card_id, card_stats):
+        """What one studied card adds to the totals, or None if it is no longer in the deck"""
+        card = self.deck.get(int(card_id))
+        if card is None:
+            return None
+        recent_ratings = card_stats.get('difficulty_ratings', [])[-3:]  # Last 3 ratings
+        return (card.get('category', 'General'), self.bucket(recent_ratings),
+                card_stats.get('times_studied', 0), sum(1 for r in recent_ratings if r == 'hard'))
+    
+    @staticmethod
+    def _add(totals, contribution, sign):
+        category, bucket, times_studied, hard_ratings = contribution
+        totals[bucket] += sign
+        totals['total_studies'] += sign * times_studied
+        totals['hard_ratings'] += sign * hard_ratings
+        category_totals = totals['categories'].setdefault(category, {'studied': 0, 'mastered': 0})
+        category_totals['studied'] += sign
+        if bucket == 'mastered':
+            category_totals['mastered'] += sign
+    
+    def _build(self, card_stats, revision):
+        totals = {
+            'revision': revision,
+            'version': self.deck.version,
+            'mastered': 0,
+            'learning': 0,
+            'difficult': 0,
+            'total_studies': 0,
+            'hard_ratings': 0,
+            'categories': {}
+        }
+        for card_id, stats in card_stats.items():
+            contribution = self._contribution(card_id, stats)
+            if contribution is not None:
+                self._add(totals, contribution, 1)
+        return totals
+    
+    def summary(self, username, card_stats, revision):
+        """Return the user's bucket counts, accuracy rate and per-category totals"""
+        with self._lock:
+            totals = self._users.get(username)
+            if totals is None or totals['revision'] != revision or totals['version'] != self.deck.version:
+                totals = self._users[username] = self._build(card_stats, revision)
+            
+            categories = {}
+            for category, total in self.deck.category_counts().items():
+                user_totals = totals['categories'].get(category, {})
+                categories[category] = {
+                    'total': total,
+                    'studied': user_totals.get('studied', 0),
+                    'mastered': user_totals.get('mastered', 0)
+                }
+            
+            # Calculate accuracy rate (inverse of difficulty)
+            accuracy_rate = 0
+            if totals['total_studies'] > 0:
+                accuracy_rate = max(0, 100 - (totals['hard_ratings'] / totals['total_studies'] * 100))
+            
+            return {
+                'mastered_cards': totals['mastered'],
+                'learning_cards': totals['learning'],
+                'difficult_cards': totals['difficult'],
+                'accuracy_rate': accuracy_rate,
+                'categories': categories
+            }
+    
+    def record_rating(self, username, card_id, previous_stats, card_stats, previous_revision, revision):
+        """Move one card between buckets after a rating saved as revision (read at previous_revision)"""
+        with self._lock:
+            totals = self._users.get(username)
+            if totals is None:
+                return
+            if (totals['revision'] != previous_revision or revision != previous_revision + 1
+                    or totals['version'] != self.deck.version):
+                # Someone else wrote in between: rebuild on the next read
+                del self._users[username]
+                return
+            
+            if previous_stats:
+                previous = self._contribution(card_id, previous_stats)
+                if previous is not None:
+                    self._add(totals, previous, -1)
+            current = self._contribution(card_id, card_stats)
+            if current is not None:
+                self._add(totals, current, 1)
+            totals['revision'] = revision
+
+# ======================= PROGRESS STORE =======================
+
+class ProgressStore:
+    """User progress kept in memory, persisted as a snapshot plus an append-only answer log
+    
+    Answering a question appends one compact line to the log instead of
+    rewriting every user's progress. The log is folded back into the
+    snapshot every `compact_every` lines. Other workers' appends are picked
+    up by replaying the log tail past the last offset we read. Entries keep
+    the options the user chose as a bitmask (see answer_mask) so they can be
+    regraded when an answer key changes.
+    """
+    
+    def __init__(self, snapshot_file, log_file, compact_every=500):
+        self.snapshot_file = snapshot_file
+        self.log_file = log_file
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._users = {}
+        self._summaries = {}
+        self._answers = {}
+        self._loaded = False
+        self._snapshot_signature = None
+        self._log_offset = 0
+        self._log_lines = 0
+    
+    def _sync(self):
+        """Bring the in-memory index up to date with the snapshot and log tail"""
+        snapshot_signature = SimpleDataHelper.file_signature(self.snapshot_file)
+        log_signature = SimpleDataHelper.file_signature(self.log_file)
+        log_size = log_signature[1] if log_signature else 0
+        
+        # Snapshot replaced or log truncated (compaction elsewhere): rebuild from scratch
+        if not self._loaded or snapshot_signature != self._snapshot_signature or log_size < self._log_offset:
+            self._users = SimpleDataHelper.load_json(self.snapshot_file, {})
+            self._rebuild_indexes()
+            self._snapshot_signature = snapshot_signature
+            self._log_offset = 0
+            self._log_lines = 0
+            self._loaded = True
+        
+        if log_size > self._log_offset:
+            self._replay_tail()
+    
+    def _replay_tail(self):
+        with open(self.log_file, 'rb') as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        
+        # Leave a trailing partial line (still being written) for the next sync
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue  # Torn line left by a crash mid-append
+            self._apply(event)
+            self._log_lines += 1
+        self._log_offset += end
+    
+    def _apply(self, event):
+        username = event['u']
+        if event.get('reset'):
+            self._users.pop(username, None)
+            self._summaries.pop(username, None)
+            self._answers.pop(username, None)
+            return
+        
+        entries = self._users.setdefault(username, {})
+        entry = {
+            'completed': True,
+            'correct': event['c'],
+            'score': event['s'],
+            'timestamp': event['t']
+        }
+        if 'm' in event:
+            entry['selected'] = event['m']
+        
+        # Adjust the user's running totals by the difference from any earlier answer
+        summary = self._summaries.setdefault(username, self._empty_summary())
+        previous = entries.get(event['q'])
+        if previous is None:
+            summary['completed'] += 1
+        else:
+            summary['correct'] -= 1 if previous.get('correct') else 0
+            summary['score'] -= previous.get('score', 0.0)
+        summary['correct'] += 1 if entry['correct'] else 0
+        summary['score'] += entry['score']
+        summary['last_answered'] = max(summary['last_answered'] or '', entry['timestamp'])
+        
+        entries[event['q']] = entry
+        self._index_answer(username, event['q'], entry['score'])
+    
+    def _index_answer(self, username, question_id, score):
+        answers = self._answers.setdefault(username, {'scores': {}, 'wrong': set()})
+        question_id = int(question_id)
+        answers['scores'][question_id] = score
+        if score < 1.0:
+            answers['wrong'].add(question_id)
+        else:
+            answers['wrong'].discard(question_id)
+    
+    @staticmethod
+    def _empty_summary():
+        return {'completed': 0, 'correct': 0, 'score': 0.0, 'last_answered': None}
+    
+    def _rebuild_indexes(self):
+        self._summaries = {}
+        self._answers = {}
+        for username, entries in self._users.items():
+            summary = self._summaries[username] = self._empty_summary()
+            for question_id, entry in entries.items():
+                score = entry.get('score', 1.0 if entry.get('correct') else 0.0)
+                summary['completed'] += 1
+                summary['correct'] += 1 if entry.get('correct') else 0
+                summary['score'] += score
+                summary['last_answered'] = max(summary['last_answered'] or '', entry.get('timestamp', ''))
+                self._index_answer(username, question_id, score)
+    
+    def _append(self, *events):
+        lines = ''.join(json.dumps(event, separators=(',', ':')) + '\n' for event in events)
+        with open(self.log_file, 'a') as f:
+            f.write(lines)
+        metrics.inc('study_app_written_bytes_total', len(lines), file=metric_file_label(self.log_file))
+        
+        # Replay our own lines (and anything other workers appended meanwhile)
+        self._sync()
+        if self._log_lines >= self.compact_every:
+            self._compact()
+    
+    def _compact(self):
+        """Fold the log into the snapshot and start a fresh log"""
+        SimpleDataHelper.save_json(self.snapshot_file, self._users, compact=True)
+        open(self.log_file, 'w').close()
+        self._snapshot_signature = SimpleDataHelper.file_signature(self.snapshot_file)
+        self._log_offset = 0
+        self._log_lines = 0
+    
+    def get_user(self, username):
+        """Return a copy of one user's progress dict"""
+        with self._lock:
+            self._sync()
+            return dict(self._users.get(username, {}))
+    
+    def get_summary(self, username):
+        """Return the user's completed/correct counts, score total and last answer time"""
+        with self._lock:
+            self._sync()
+            return dict(self._summaries.get(username) or self._empty_summary())
+    
+    def get_summaries(self):
+        """Return every user's summary (see get_summary), keyed by username"""
+        with self._lock:
+            self._sync()
+            return {username: dict(summary) for username, summary in self._summaries.items()}
+    
+    def get_answer_index(self, username):
+        """Return {'scores': {question id: best-known score}, 'wrong': ids scored below 1.0}"""
+        with self._lock:
+            self._sync()
+            answers = self._answers.get(username) or {'scores': {}, 'wrong': ()}
+            return {'scores': dict(answers['scores']), 'wrong': frozenset(answers['wrong'])}
+    
+    @staticmethod
+    def _event(username, question_id, is_correct, score, timestamp, selected):
+        event = {'u': username, 'q': str(question_id), 'c': is_correct, 's': score, 't': timestamp}
+        if selected is not None:
+            event['m'] = selected
+        return event
+    
+    def record(self, username, question_id, is_correct, score, timestamp, selected=None):
+        """Record one answered question (and the selected-options bitmask, if known) as a single log append"""
+        with self._lock, SimpleDataHelper.file_lock(self.log_file):
+            self._sync()
+            self._append(self._event(username, question_id, is_correct, score, timestamp, selected))
+    
+    def record_many(self, username, results, timestamp):
+        """Record [(question id, is_correct, score, selected)] for one user as a single log write"""
+        if not results:
+            return
+        with self._lock, SimpleDataHelper.file_lock(self.log_file):
+            self._sync()
+            self._append(*(self._event(username, question_id, is_correct, score, timestamp, selected)
+                           for question_id, is_correct, score, selected in results))
+    
+    def regrade(self, question_ids, grader_for):
+        """Re-score every stored answer to the given questions in one pass and one log write
+        
+        grader_for(question id) returns a function mapping a selected-options
+        bitmask to (is_correct, score), or None to leave that question alone.
+        It is called under the write lock, so the newest answer key wins when
+        regrades race. Answers recorded before bitmasks were kept are skipped.
+        Returns {'answers', 'changed', 'skipped'} counts.
+        """
+        counts = {'answers': 0, 'changed': 0, 'skipped': 0}
+        with self._lock, SimpleDataHelper.file_lock(self.log_file):
+            self._sync()
+            graders = {str(question_id): grader_for(question_id) for question_id in question_ids}
+            graders = {question_id: grade for question_id, grade in graders.items() if grade is not None}
+            events = []
+            for username, entries in self._users.items():
+                for question_id, grade in graders.items():
+                    entry = entries.get(question_id)
+                    if entry is None:
+                        continue
+                    counts['answers'] += 1
+                    if entry.get('selected') is None:
+                        counts['skipped'] += 1
+                        continue
+                    is_correct, score = grade(entry['selected'])
+                    if is_correct != entry['correct'] or score != entry['score']:
+                        # Same timestamp, so the answer keeps its place in the user's history
+                        events.append(self._event(username, question_id, is_correct, score,
+                                                  entry['timestamp'], entry['selected']))
+            self._rewrite(events)
+            counts['changed'] = len(events)
+        return counts
+    
+    def remap_selected(self, question_id, remap):
+        """Rewrite the stored selected-options bitmasks of one question with remap(bitmask); returns how many changed
+        
+        Used when a question's options are reordered or removed, so stored
+        bitmasks keep pointing at the same option text. Grades are left alone.
+        """
+        question_id = str(question_id)
+        with self._lock, SimpleDataHelper.file_lock(self.log_file):
+            self._sync()
+            events = []
+            for username, entries in self._users.items():
+                entry = entries.get(question_id)
+                if entry is None or entry.get('selected') is None:
+                    continue
+                selected = remap(entry['selected'])
+                if selected != entry['selected']:
+                    events.append(self._event(username, question_id, entry['correct'], entry['score'],
+                                              entry['timestamp'], selected))
+            self._rewrite(events)
+        return len(events)
+    
+    def _rewrite(self, events):
+        """Persist events that replace existing answers (the caller holds both locks)"""
+        if len(events) >= self.compact_every:
+            # The log would be compacted straight away, so fold the changes into a new snapshot directly
+            for event in events:
+                self._apply(event)
+            self._compact()
+        elif events:
+            self._append(*events)
+    
+    def reset_user(self, username):
+        """Clear a user's progress; returns False if there was nothing to clear"""
+        with self._lock, SimpleDataHelper.file_lock(self.log_file):
+            self._sync()
+            if username not in self._users:
+                return False
+            self._append({'u': username, 'reset': True})
+            return True
+    
+    def load_all(self):
+        """Return a copy of every user's progress"""
+        with self._lock:
+            self._sync()
+            return {username: dict(entries) for username, entries in self._users.items()}
+    
+    def replace_all(self, progress):
+        """Overwrite all progress with a new snapshot"""
+        with self._lock, SimpleDataHelper.file_lock(self.log_file):
+            self._users = {username: dict(entries) for username, entries in progress.items()}
+            self._rebuild_indexes()
+            self._loaded = True
+            self._compact()
+
+# ======================= STORAGE BACKENDS =======================
+
+class JsonStorage:
+    """Flat JSON files in the working directory (the default backend)"""
+    
+    def __init__(self, quiz_session_dir='quiz_sessions', quiz_session_ttl=12 * 60 * 60,
+                 flashcard_progress_dir='flashcard_progress', exam_attempts_dir='exam_attempts',
+                 question_snapshot_path='questions.snapshot'):
+        self.progress = ProgressStore('progress.json', 'progress.log')
+        self.quiz_sessions = FileQuizSessionStore(quiz_session_dir, quiz_session_ttl)
+        self.flashcard_progress_dir = flashcard_progress_dir
+        self.exam_attempts_dir = exam_attempts_dir
+        self.question_snapshot_path = question_snapshot_path
+    
+    def initialize(self, default_questions, default_users):
+        """Create any missing data files"""
+        if not os.path.exists('questions.json'):
+            SimpleDataHelper.save_json('questions.json', default_questions)
+        
+        if not os.path.exists('progress.json'):
+            SimpleDataHelper.save_json('progress.json', {})
+        
+        if not os.path.exists('flashcards.json'):
+            SimpleDataHelper.save_json('flashcards.json', [])
+        
+        self._split_flashcard_progress()
+        
+        if not os.path.exists('users.json'):
+            SimpleDataHelper.save_json('users.json', default_users)
+    
+    def questions_version(self):
+        return SimpleDataHelper.file_signature('questions.json')
+    
+    def load_questions(self):
+        return SimpleDataHelper.load_json('questions.json', [])
+    
+    def load_question_snapshot(self):
+        """Return the compiled snapshot of questions.json, recompiling it first if questions.json changed"""
+        signature = self.questions_version()
+        if signature is None:
+            return []
+        snapshot = QuestionSnapshot.open(self.question_snapshot_path, signature)
+        if snapshot is not None:
+            return snapshot
+        
+        with SimpleDataHelper.file_lock(self.question_snapshot_path):
+            snapshot = QuestionSnapshot.open(self.question_snapshot_path, signature)  # Another worker may have just compiled it
+            if snapshot is None:
+                # Label the snapshot with the signature of exactly the file contents that were read
+                while True:
+                    signature = self.questions_version()
+                    questions = self.load_questions()
+                    if self.questions_version() == signature:
+                        break
+                snapshot = QuestionSnapshot.compile(self.question_snapshot_path, questions, signature)
+        return snapshot
+    
+    def _save_documents(self, filename, documents, changed_ids, added=()):
+        """Write a list of id-keyed documents, merging into the current file when only some changed
+        
+        Documents in added get ids past the highest stored one, picked under the
+        lock so two workers adding at once can't hand out the same id.
+        """
+        with SimpleDataHelper.file_lock(filename):
+            if changed_ids is not None:
+                # Re-read under the lock so another worker's concurrent edits aren't lost
+                by_id = {doc['id']: doc for doc in documents}
+                changed = set(changed_ids)
+                current = SimpleDataHelper.load_json(filename, [])
+                merged = [by_id[doc['id']] if doc['id'] in changed else doc
+                          for doc in current if doc['id'] not in changed or doc['id'] in by_id]
+                present = {doc['id'] for doc in current}
+                merged.extend(by_id[doc_id] for doc_id in changed_ids if doc_id in by_id and doc_id not in present)
+                documents = merged
+            if added:
+                documents = list(documents)
+                next_id = max((doc['id'] for doc in documents), default=0) + 1
+                for doc in added:
+                    doc['id'] = next_id
+                    next_id += 1
+                    documents.append(doc)
+            SimpleDataHelper.save_json(filename, documents)
+        return documents
+    
+    def save_questions(self, questions, changed_ids=None, added=()):
+        self._save_documents('questions.json', questions, changed_ids, added)
+        return self.load_question_snapshot()
+    
+    def load_users(self):
+        return SimpleDataHelper.load_json('users.json', {})
+    
+    def save_users(self, users):
+        SimpleDataHelper.save_json('users.json', users)
+    
+    def flashcards_version(self):
+        return SimpleDataHelper.file_signature('flashcards.json')
+    
+    def load_flashcards(self):
+        return SimpleDataHelper.load_json('flashcards.json', [])
+    
+    def save_flashcards(self, flashcards, changed_ids=None, added=()):
+        return self._save_documents('flashcards.json', flashcards, changed_ids, added)
+    
+    def _split_flashcard_progress(self):
+        """Move users out of the old all-users flashcard_progress.json into per-user files"""
+        os.makedirs(self.flashcard_progress_dir, exist_ok=True)
+        if not os.path.exists('flashcard_progress.json'):
+            return
+        with SimpleDataHelper.file_lock('flashcard_progress.json'):
+            data = SimpleDataHelper.load_json('flashcard_progress.json', {})
+            if not data:
+                return
+            for username, progress_data in data.items():
+                if not os.path.exists(self._flashcard_progress_file(username)):
+                    self.save_flashcard_progress(username, progress_data)
+            # Emptied rather than removed: Docker setups bind-mount this file
+            SimpleDataHelper.save_json('flashcard_progress.json', {})
+    
+    def _flashcard_progress_file(self, username):
+        return os.path.join(self.flashcard_progress_dir, quote(username, safe='') + '.json')
+    
+    def _read_flashcard_progress(self, filename):
+        stored = SimpleDataHelper.load_json(filename, {})
+        return {
+            'card_stats': {card_id: unpack_card_stats(packed)
+                           for card_id, packed in stored.get('card_stats', {}).items()},
+            'studied_today': unpack_studied_today(stored.get('studied_today')),
+            'revision': stored.get('revision', 0)
+        }
+    
+    def load_flashcard_progress(self, username=None):
+        if username:
+            return self._read_flashcard_progress(self._flashcard_progress_file(username))
+        
+        data = {}
+        if os.path.isdir(self.flashcard_progress_dir):
+            for name in os.listdir(self.flashcard_progress_dir):
+                if name.endswith('.json'):
+                    data[unquote(name[:-5])] = self._read_flashcard_progress(
+                        os.path.join(self.flashcard_progress_dir, name))
+        return data
+    
+    def _update_flashcard_progress(self, username, update):
+        """Apply update(stored) to one user's file under its lock, bumping the revision"""
+        filename = self._flashcard_progress_file(username)
+        with SimpleDataHelper.file_lock(filename):
+            stored = SimpleDataHelper.load_json(filename, {})
+            update(stored)
+            stored['revision'] = stored.get('revision', 0) + 1
+            SimpleDataHelper.save_json(filename, stored, compact=True)
+            return stored['revision']
+    
+    def save_flashcard_progress(self, username, progress_data):
+        def update(stored):
+            stored['card_stats'] = {str(card_id): pack_card_stats(stats)
+                                    for card_id, stats in progress_data.get('card_stats', {}).items()}
+            stored['studied_today'] = pack_studied_today(progress_data.get('studied_today', ()))
+        self._update_flashcard_progress(username, update)
+    
+    def update_card_stats(self, username, card_id, update):
+        """Replace one card's stats with update(stored stats) and mark it studied today, under the user's lock
+        
+        Returns (previous stats, new stats, the user's new progress revision).
+        """
+        result = []
+        def apply(stored):
+            card_stats = stored.setdefault('card_stats', {})
+            previous = unpack_card_stats(card_stats[str(card_id)]) if str(card_id) in card_stats else {}
+            updated = update(previous)
+            card_stats[str(card_id)] = pack_card_stats(updated)
+            studied_today = unpack_studied_today(stored.get('studied_today'))
+            studied_today.add(card_id)
+            stored['studied_today'] = pack_studied_today(studied_today)
+            result.extend((previous, updated))
+        revision = self._update_flashcard_progress(username, apply)
+        return result[0], result[1], revision
+    
+    def clear_studied_today(self, username):
+        filename = self._flashcard_progress_file(username)
+        with SimpleDataHelper.file_lock(filename):
+            stored = SimpleDataHelper.load_json(filename, {})
+            if stored.get('studied_today'):
+                stored['studied_today'] = pack_studied_today(())
+                SimpleDataHelper.save_json(filename, stored, compact=True)
+    
+    def _exam_attempts_file(self, username):
+        return os.path.join(self.exam_attempts_dir, quote(username, safe='') + '.jsonl')
+    
+    def exam_attempt_users(self):
+        """Usernames with at least one stored exam attempt"""
+        if not os.path.isdir(self.exam_attempts_dir):
+            return []
+        return [unquote(name[:-len('.jsonl')]) for name in os.listdir(self.exam_attempts_dir) if name.endswith('.jsonl')]
+    
+    def save_exam_attempt(self, username, attempt):
+        """Append one graded exam attempt to the user's attempt log"""
+        os.makedirs(self.exam_attempts_dir, exist_ok=True)
+        filename = self._exam_attempts_file(username)
+        line = json.dumps(attempt, separators=(',', ':')) + '\n'
+        with SimpleDataHelper.file_lock(filename):
+            with open(filename, 'a') as f:
+                f.write(line)
+        metrics.inc('study_app_written_bytes_total', len(line), file=metric_file_label(filename))
+    
+    def load_exam_attempts(self, username):
+        """Return the user's exam attempts, oldest first"""
         try:
-            with open(filename, 'r') as f:
-                return json.load(f)
+            with open(self._exam_attempts_file(username)) as f:
+                lines = f.readlines()
         except FileNotFoundError:
-            return default if default is not None else {}
+            return []
+        attempts = []
+        for line in lines:
+            try:
+                attempts.append(json.loads(line))
+            except ValueError:
+                continue  # Torn line left by a crash mid-append
+        return attempts
+
+class SqliteStorage:
+    """SQLite database in WAL mode; updates touch single rows instead of whole documents"""
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS questions (
+            id INTEGER PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS progress (
+            username TEXT NOT NULL,
+            question_id TEXT NOT NULL,
+            correct INTEGER NOT NULL,
+            score REAL NOT NULL,
+            timestamp TEXT NOT NULL,
+            selected INTEGER,
+            PRIMARY KEY (username, question_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS progress_question ON progress (question_id);
+        CREATE TABLE IF NOT EXISTS flashcards (
+            id INTEGER PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS studied_cards (
+            username TEXT NOT NULL,
+            card_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            PRIMARY KEY (username, card_id)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS card_stats (
+            username TEXT NOT NULL,
+            card_id TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (username, card_id)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS quiz_sessions (
+            id TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            expires REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS quiz_sessions_expires ON quiz_sessions (expires);
+        CREATE TABLE IF NOT EXISTS exam_attempts (
+            username TEXT NOT NULL,
+            id TEXT NOT NULL,
+            submitted TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (username, id)
+        );
+    """
+    
+    def __init__(self, path, quiz_session_ttl=12 * 60 * 60):
+        self.path = path
+        self._local = threading.local()
+        self.progress = SqliteProgressStore(self)
+        self.quiz_sessions = SqliteQuizSessionStore(self, quiz_session_ttl)
+    
+    def connect(self):
+        """Return this thread's connection (reopened after a fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    def _bump_version(self, conn, key):
+        conn.execute(
+            'INSERT INTO meta (key, value) VALUES (?, 1) '
+            'ON CONFLICT(key) DO UPDATE SET value = value + 1',
+            (key,)
+        )
+    
+    def _version(self, key):
+        row = self.connect().execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else 0
+    
+    def _save_documents(self, table, version_key, documents, changed_ids, added=()):
+        conn = self.connect()
+        with conn:
+            if added:
+                # Take the write lock before reading MAX(id) so concurrent inserts get distinct ids
+                conn.execute('BEGIN IMMEDIATE')
+            if changed_ids is None:
+                conn.execute(f'DELETE FROM {table}')
+                conn.executemany(
+                    f'INSERT INTO {table} (id, data) VALUES (?, ?)',
+                    [(doc['id'], json.dumps(doc)) for doc in documents]
+                )
+            else:
+                by_id = {doc['id']: doc for doc in documents}
+                for doc_id in changed_ids:
+                    if doc_id in by_id:
+                        conn.execute(
+                            f'INSERT OR REPLACE INTO {table} (id, data) VALUES (?, ?)',
+                            (doc_id, json.dumps(by_id[doc_id]))
+                        )
+                    else:
+                        conn.execute(f'DELETE FROM {table} WHERE id = ?', (doc_id,))
+            if added:
+                next_id = (conn.execute(f'SELECT MAX(id) FROM {table}').fetchone()[0] or 0) + 1
+                for doc in added:
+                    doc['id'] = next_id
+                    next_id += 1
+                conn.executemany(f'INSERT INTO {table} (id, data) VALUES (?, ?)',
+                                 [(doc['id'], json.dumps(doc)) for doc in added])
+            self._bump_version(conn, version_key)
+    
+    def initialize(self, default_questions, default_users):
+        """Create the schema and seed defaults the first time the database is used"""
+        conn = self.connect()
+        conn.executescript(self.SCHEMA)
+        with conn:
+            first_run = conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('initialized', 1)"
+            ).rowcount == 1
+        if first_run:
+            self.save_questions(default_questions)
+            self.save_users(default_users)
+    
+    def questions_version(self):
+        return self._version('questions_version')
+    
+    def load_questions(self):
+        rows = self.connect().execute('SELECT data FROM questions ORDER BY id')
+        return [json.loads(data) for (data,) in rows]
+    
+    def save_questions(self, questions, changed_ids=None, added=()):
+        self._save_documents('questions', 'questions_version', questions, changed_ids, added)
+        return questions if changed_ids is None and not added else self.load_questions()
+    
+    def load_users(self):
+        return dict(self.connect().execute('SELECT username, password FROM users'))
+    
+    def save_users(self, users):
+        conn = self.connect()
+        with conn:
+            conn.execute('DELETE FROM users')
+            conn.executemany('INSERT INTO users (username, password) VALUES (?, ?)', users.items())
+    
+    def flashcards_version(self):
+        return self._version('flashcards_version')
+    
+    def load_flashcards(self):
+        rows = self.connect().execute('SELECT data FROM flashcards ORDER BY id')
+        return [json.loads(data) for (data,) in rows]
+    
+    def save_flashcards(self, flashcards, changed_ids=None, added=()):
+        self._save_documents('flashcards', 'flashcards_version', flashcards, changed_ids, added)
+        return flashcards if changed_ids is None and not added else self.load_flashcards()
+    
+    def load_flashcard_progress(self, username=None):
+        conn = self.connect()
+        today = datetime.now().strftime('%Y-%m-%d')
+        if username:
+            # Read the revision first: totals tagged with it can only lag the rows, never lead
+            revision = self._version(f'flashcard_progress:{username}')
+            studied = conn.execute(
+                'SELECT username, card_id FROM studied_cards WHERE username = ? AND day = ?', (username, today))
+            stats = conn.execute(
+                'SELECT username, card_id, data FROM card_stats WHERE username = ?', (username,))
+        else:
+            studied = conn.execute('SELECT username, card_id FROM studied_cards WHERE day = ?', (today,))
+            stats = conn.execute('SELECT username, card_id, data FROM card_stats')
+        
+        data = {}
+        for user, card_id in studied:
+            data.setdefault(user, {'card_stats': {}, 'studied_today': set()})['studied_today'].add(card_id)
+        for user, card_id, card_data in stats:
+            progress = data.setdefault(user, {'card_stats': {}, 'studied_today': set()})
+            progress['card_stats'][card_id] = unpack_card_stats(json.loads(card_data))
+        if username:
+            return dict(data.get(username, {'card_stats': {}, 'studied_today': set()}), revision=revision)
+        return data
+    
+    def save_flashcard_progress(self, username, progress_data):
+        today = datetime.now().strftime('%Y-%m-%d')
+        conn = self.connect()
+        with conn:
+            self._bump_version(conn, f'flashcard_progress:{username}')
+            conn.execute('DELETE FROM card_stats WHERE username = ?', (username,))
+            conn.executemany(
+                'INSERT INTO card_stats (username, card_id, data) VALUES (?, ?, ?)',
+                [(username, str(card_id), json.dumps(pack_card_stats(stats), separators=(',', ':')))
+                 for card_id, stats in progress_data.get('card_stats', {}).items()]
+            )
+            conn.execute('DELETE FROM studied_cards WHERE username = ?', (username,))
+            conn.executemany(
+                'INSERT INTO studied_cards (username, card_id, day) VALUES (?, ?, ?)',
+                [(username, card_id, today) for card_id in progress_data.get('studied_today', ())]
+            )
+    
+    def update_card_stats(self, username, card_id, update):
+        key = f'flashcard_progress:{username}'
+        conn = self.connect()
+        with conn:
+            # Take the write lock before reading so concurrent ratings of this user's cards serialize
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT data FROM card_stats WHERE username = ? AND card_id = ?',
+                               (username, str(card_id))).fetchone()
+            previous = unpack_card_stats(json.loads(row[0])) if row else {}
+            card_stats = update(previous)
+            self._bump_version(conn, key)
+            conn.execute(
+                'INSERT OR REPLACE INTO card_stats (username, card_id, data) VALUES (?, ?, ?)',
+                (username, str(card_id), json.dumps(pack_card_stats(card_stats), separators=(',', ':')))
+            )
+            # Only this card's row: the rest of today's set is already stored
+            conn.execute(
+                'INSERT OR REPLACE INTO studied_cards (username, card_id, day) VALUES (?, ?, ?)',
+                (username, card_id, datetime.now().strftime('%Y-%m-%d'))
+            )
+            revision = conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()[0]
+        return previous, card_stats, revision
+    
+    def clear_studied_today(self, username):
+        conn = self.connect()
+        with conn:
+            conn.execute('DELETE FROM studied_cards WHERE username = ?', (username,))
+    
+    def save_exam_attempt(self, username, attempt):
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO exam_attempts (username, id, submitted, data) VALUES (?, ?, ?, ?)',
+                (username, attempt['id'], attempt['submitted'], json.dumps(attempt, separators=(',', ':')))
+            )
+    
+    def load_exam_attempts(self, username):
+        rows = self.connect().execute(
+            'SELECT data FROM exam_attempts WHERE username = ? ORDER BY submitted, rowid', (username,))
+        return [json.loads(data) for (data,) in rows]
+
+class SqliteProgressStore:
+    """ProgressStore interface over the SQLite progress table (one row per answer)"""
+    
+    def __init__(self, storage):
+        self.storage = storage
     
     @staticmethod
-    def save_json(filename, data):
-        """Save any JSON file"""
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2)
+    def _entry(correct, score, timestamp, selected):
+        entry = {'completed': True, 'correct': bool(correct), 'score': score, 'timestamp': timestamp}
+        if selected is not None:
+            entry['selected'] = selected
+        return entry
+    
+    def get_user(self, username):
+        rows = self.storage.connect().execute(
+            'SELECT question_id, correct, score, timestamp, selected FROM progress WHERE username = ?',
+            (username,)
+        )
+        return {question_id: self._entry(correct, score, timestamp, selected)
+                for question_id, correct, score, timestamp, selected in rows}
+    
+    def get_summary(self, username):
+        completed, correct, score, last_answered = self.storage.connect().execute(
+            'SELECT COUNT(*), SUM(correct), SUM(score), MAX(timestamp) FROM progress WHERE username = ?',
+            (username,)
+        ).fetchone()
+        return {'completed': completed, 'correct': correct or 0, 'score': score or 0.0, 'last_answered': last_answered}
+    
+    def get_summaries(self):
+        rows = self.storage.connect().execute(
+            'SELECT username, COUNT(*), SUM(correct), SUM(score), MAX(timestamp) FROM progress GROUP BY username')
+        return {
+            username: {'completed': completed, 'correct': correct or 0, 'score': score or 0.0, 'last_answered': last_answered}
+            for username, completed, correct, score, last_answered in rows
+        }
+    
+    def get_answer_index(self, username):
+        rows = self.storage.connect().execute(
+            'SELECT question_id, score FROM progress WHERE username = ?', (username,)).fetchall()
+        scores = {int(question_id): score for question_id, score in rows}
+        return {'scores': scores, 'wrong': frozenset(question_id for question_id, score in scores.items() if score < 1.0)}
+    
+    def record(self, username, question_id, is_correct, score, timestamp, selected=None):
+        conn = self.storage.connect()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO progress (username, question_id, correct, score, timestamp, selected) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (username, str(question_id), int(is_correct), score, timestamp, selected)
+            )
+    
+    def record_many(self, username, results, timestamp):
+        conn = self.storage.connect()
+        with conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO progress (username, question_id, correct, score, timestamp, selected) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(username, str(question_id), int(is_correct), score, timestamp, selected)
+                 for question_id, is_correct, score, selected in results]
+            )
+    
+    def regrade(self, question_ids, grader_for):
+        conn = self.storage.connect()
+        counts = {'answers': 0, 'changed': 0, 'skipped': 0}
+        with conn:
+            # Take the write lock before reading so no answer lands between the read and the update
+            conn.execute('BEGIN IMMEDIATE')
+            updates = []
+            for question_id in question_ids:
+                grade = grader_for(question_id)
+                if grade is None:
+                    continue
+                rows = conn.execute(
+                    'SELECT username, correct, score, selected FROM progress WHERE question_id = ?', (str(question_id),))
+                for username, correct, score, selected in rows:
+                    counts['answers'] += 1
+                    if selected is None:
+                        counts['skipped'] += 1
+                        continue
+                    is_correct, new_score = grade(selected)
+                    if is_correct != bool(correct) or new_score != score:
+                        updates.append((int(is_correct), new_score, username, str(question_id)))
+            conn.executemany('UPDATE progress SET correct = ?, score = ? WHERE username = ? AND question_id = ?', updates)
+            counts['changed'] = len(updates)
+        return counts
+    
+    def remap_selected(self, question_id, remap):
+        conn = self.storage.connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute('SELECT username, selected FROM progress WHERE question_id = ? AND selected IS NOT NULL',
+                                (str(question_id),)).fetchall()
+            updates = [(remap(selected), username, str(question_id))
+                       for username, selected in rows if remap(selected) != selected]
+            conn.executemany('UPDATE progress SET selected = ? WHERE username = ? AND question_id = ?', updates)
+        return len(updates)
+    
+    def reset_user(self, username):
+        conn = self.storage.connect()
+        with conn:
+            return conn.execute('DELETE FROM progress WHERE username = ?', (username,)).rowcount > 0
+    
+    def load_all(self):
+        progress = {}
+        rows = self.storage.connect().execute(
+            'SELECT username, question_id, correct, score, timestamp, selected FROM progress')
+        for username, question_id, correct, score, timestamp, selected in rows:
+            progress.setdefault(username, {})[question_id] = self._entry(correct, score, timestamp, selected)
+        return progress
+    
+    def replace_all(self, progress):
+        conn = self.storage.connect()
+        with conn:
+            conn.execute('DELETE FROM progress')
+            conn.executemany(
+                'INSERT INTO progress (username, question_id, correct, score, timestamp, selected) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(username, str(question_id), int(entry.get('correct', False)),
+                  entry.get('score', 1.0 if entry.get('correct') else 0.0), entry.get('timestamp', ''),
+                  entry.get('selected'))
+                 for username, entries in progress.items()
+                 for question_id, entry in entries.items()]
+            )
+
+# ======================= QUIZ SESSION STORE =======================
+
+class FileQuizSessionStore:
+    """Server-side quiz state, one small JSON file per quiz, expired after a TTL"""
+    
+    def __init__(self, directory, ttl, purge_every=100):
+        self.directory = directory
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._creates = 0
+    
+    def _path(self, quiz_id):
+        return os.path.join(self.directory, f'{quiz_id}.json')
+    
+    def create(self, data):
+        """Store a new quiz state and return its id"""
+        os.makedirs(self.directory, exist_ok=True)
+        quiz_id = secrets.token_urlsafe(16)
+        self.save(quiz_id, data)
+        
+        self._creates += 1
+        if self._creates % self.purge_every == 0:
+            self.purge_expired()
+        return quiz_id
+    
+    def get(self, quiz_id):
+        """Return the quiz state, or None if it is missing or expired"""
+        if not quiz_id or not quiz_id.replace('-', '').replace('_', '').isalnum():
+            return None
+        record = SimpleDataHelper.load_json(self._path(quiz_id), None)
+        if not record:  # load_json gives {} for a missing file
+            return None
+        if record['expires'] < time.time():
+            self.delete(quiz_id)
+            return None
+        return record['data']
+    
+    def save(self, quiz_id, data):
+        """Write the quiz state and push its expiry forward"""
+        record = {'expires': time.time() + self.ttl, 'data': data}
+        SimpleDataHelper.save_json(self._path(quiz_id), record, compact=True)
+    
+    def delete(self, quiz_id):
+        try:
+            os.remove(self._path(quiz_id))
+        except (FileNotFoundError, TypeError):
+            pass
+    
+    def purge_expired(self):
+        """Remove quiz files whose last write is older than the TTL"""
+        cutoff = time.time() - self.ttl
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json') and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+class SqliteQuizSessionStore:
+    """Quiz session interface over the SQLite quiz_sessions table"""
+    
+    def __init__(self, storage, ttl, purge_every=100):
+        self.storage = storage
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._creates = 0
+    
+    def create(self, data):
+        quiz_id = secrets.token_urlsafe(16)
+        self.save(quiz_id, data)
+        
+        self._creates += 1
+        if self._creates % self.purge_every == 0:
+            self.purge_expired()
+        return quiz_id
+    
+    def get(self, quiz_id):
+        row = self.storage.connect().execute(
+            'SELECT data FROM quiz_sessions WHERE id = ? AND expires >= ?', (quiz_id, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def save(self, quiz_id, data):
+        conn = self.storage.connect()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO quiz_sessions (id, data, expires) VALUES (?, ?, ?)',
+                (quiz_id, json.dumps(data, separators=(',', ':')), time.time() + self.ttl)
+            )
+    
+    def delete(self, quiz_id):
+        conn = self.storage.connect()
+        with conn:
+            conn.execute('DELETE FROM quiz_sessions WHERE id = ?', (quiz_id,))
+    
+    def purge_expired(self):
+        conn = self.storage.connect()
+        with conn:
+            conn.execute('DELETE FROM quiz_sessions WHERE expires < ?', (time.time(),))
+
+def create_storage(config):
+    """Build the storage backend selected by STORAGE_BACKEND"""
+    backend = config['STORAGE_BACKEND']
+    if backend == 'sqlite':
+        return SqliteStorage(config['SQLITE_PATH'], config['QUIZ_SESSION_TTL'])
+    if backend == 'json':
+        return JsonStorage(config['QUIZ_SESSION_DIR'], config['QUIZ_SESSION_TTL'], config['FLASHCARD_PROGRESS_DIR'],
+                           config['EXAM_ATTEMPTS_DIR'], config['QUESTION_SNAPSHOT_PATH'])
+    raise ValueError(f'Unknown STORAGE_BACKEND: {backend}')
+
+def import_json_to_sqlite(sqlite_path):
+    """Copy every JSON data file into a SQLite database (one-shot migration)"""
+    source = JsonStorage(flashcard_progress_dir=app.config['FLASHCARD_PROGRESS_DIR'],
+                         exam_attempts_dir=app.config['EXAM_ATTEMPTS_DIR'])
+    source._split_flashcard_progress()
+    target = SqliteStorage(sqlite_path)
+    target.initialize([], {})
+    
+    target.save_questions(source.load_questions())
+    target.save_users(source.load_users())
+    target.save_flashcards(source.load_flashcards())
+    target.progress.replace_all(source.progress.load_all())
+    for username, progress_data in source.load_flashcard_progress().items():
+        target.save_flashcard_progress(username, progress_data)
+    for username in source.exam_attempt_users():
+        for attempt in source.load_exam_attempts(username):
+            target.save_exam_attempt(username, attempt)
+    
+    return target
+
+storage = create_storage(app.config)
+question_bank = QuestionBank(storage, search_index=QuestionSearchIndex(app.config['QUESTION_INDEX_PATH']),
+                             duplicate_index=QuestionDuplicateIndex(app.config['DUPLICATE_THRESHOLD']))
+flashcard_deck = FlashcardDeck(storage)
+flashcard_scheduler = FlashcardScheduler(flashcard_deck, app.config['FLASHCARD_SCHEDULER_USERS'])
+flashcard_stats = FlashcardStats(flashcard_deck)
+progress_store = storage.progress
+quiz_sessions = storage.quiz_sessions
+
+# ======================= MARKDOWN RENDER CACHE =======================
+
+class MarkdownRenderCache:
+    """Bounded LRU of rendered HTML keyed by (question id, content hash)"""
+    
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._keys_by_owner = {}
+        # One configured parser, reset between documents instead of rebuilt per call
+        self._md = markdown.Markdown()
+    
+    def render(self, text, owner=None):
+        """Return HTML for text, rendering it only on a cache miss"""
+        text = text or ''
+        key = (owner, hashlib.sha1(text.encode('utf-8')).hexdigest())
+        
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                metrics.inc('study_app_markdown_cache_total', result='hit')
+                return html
+            
+            metrics.inc('study_app_markdown_cache_total', result='miss')
+            with metrics.timer('study_app_markdown_render_seconds', phase='markdown'):
+                html = self._md.reset().convert(text)
+            self._entries[key] = html
+            self._keys_by_owner.setdefault(owner, set()).add(key)
+            
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._forget(old_key)
+        
+        return html
+    
+    def _forget(self, key):
+        keys = self._keys_by_owner.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_owner[key[0]]
+    
+    def invalidate(self, owner):
+        """Drop every cached rendering for one question"""
+        with self._lock:
+            for key in self._keys_by_owner.pop(owner, ()):
+                self._entries.pop(key, None)
+    
+    def warm(self, questions):
+        """Pre-render question and explanation text, for as many questions as the cache can hold"""
+        for q in itertools.islice(questions, self.max_entries // 2):
+            self.render(q.get('question'), q['id'])
+            self.render(q.get('explanation'), q['id'])
+
+markdown_cache = MarkdownRenderCache()
+
+# ======================= ITEM ANALYSIS =======================
+
+class ItemAnalysis:
+    """Per-question difficulty and discrimination over a users x questions score matrix
+    
+    Scores live in one uint8 NumPy matrix (score * 200, 255 = unanswered),
+    10k users x 5k questions in 50 MB. Only users whose progress summary
+    changed since the last refresh have their row reloaded, and new users
+    and questions grow the matrix. Statistics are column/row reductions
+    over the whole matrix, cached until something changes. Alongside it,
+    a per-question histogram of selected-option bitmasks gives how often
+    each option is chosen; when a question's options are edited, its
+    histogram is moved to the options' new positions by option text.
+    """
+    
+    SCALE = 200
+    MISSING = 255
+    
+    def __init__(self, progress, bank, min_responses=5, group_fraction=0.27):
+        self.progress = progress
+        self.bank = bank
+        self.min_responses = min_responses
+        self.group_fraction = group_fraction
+        self._lock = threading.Lock()
+        self._rows = {}        # username -> matrix row
+        self._columns = {}     # question id -> matrix column
+        self._signatures = {}  # username -> summary the row was loaded from
+        self._selections = {}  # username -> {question id: selected-options bitmask} counted in the histograms
+        self._selection_counts = {}  # question id -> {bitmask: answers}
+        self._options = {}     # question id -> (content hash, options) the histogram's bit positions refer to
+        self._matrix = None
+        self._result = None
+    
+    def _grow(self, rows, columns):
+        """Make room for at least rows x columns, doubling capacity to keep growth amortized"""
+        if self._matrix is None:
+            self._matrix = np.full((max(rows, 16), max(columns, 16)), self.MISSING, dtype=np.uint8)
+            return
+        capacity_rows, capacity_columns = self._matrix.shape
+        if rows <= capacity_rows and columns <= capacity_columns:
+            return
+        grown = np.full((max(rows, capacity_rows * 2 if rows > capacity_rows else capacity_rows),
+                         max(columns, capacity_columns * 2 if columns > capacity_columns else capacity_columns)),
+                        self.MISSING, dtype=np.uint8)
+        grown[:capacity_rows, :capacity_columns] = self._matrix
+        self._matrix = grown
+    
+    def refresh(self):
+        """Reload the rows of users whose progress changed; returns True if anything changed"""
+        changed = False
+        for question_id in self.bank.ids():
+            if question_id not in self._columns:
+                self._columns[question_id] = len(self._columns)
+                changed = True
+        
+        # Before any reloaded (already remapped) selections are counted against the new positions
+        changed = self._track_options() or changed
+        
+        summaries = self.progress.get_summaries()
+        for username in [username for username in self._signatures if username not in summaries]:
+            self._matrix[self._rows[username]] = self.MISSING
+            self._count_selections(self._selections.pop(username, {}), -1)
+            del self._signatures[username]
+            changed = True
+        
+        stale = [username for username, summary in summaries.items() if self._signatures.get(username) != summary]
+        for username in stale:
+            self._rows.setdefault(username, len(self._rows))
+        self._grow(len(self._rows), len(self._columns))
+        
+        for username in stale:
+            entries = {int(question_id): entry for question_id, entry in self.progress.get_user(username).items()}
+            answered = [(self._columns[question_id], entry.get('score', 1.0 if entry.get('correct') else 0.0))
+                        for question_id, entry in entries.items() if question_id in self._columns]
+            selections = {question_id: entry['selected'] for question_id, entry in entries.items()
+                          if entry.get('selected') is not None}
+            self._count_selections(self._selections.get(username, {}), -1)
+            self._count_selections(selections, 1)
+            self._selections[username] = selections
+            
+            row = self._matrix[self._rows[username]]
+            row[:] = self.MISSING
+            if answered:
+                columns, values = zip(*answered)
+                row[list(columns)] = np.rint(np.clip(values, 0.0, 1.0) * self.SCALE).astype(np.uint8)
+            self._signatures[username] = summaries[username]
+            changed = True
+        if stale:
+            self._track_options()
+        return changed
+    
+    def _track_options(self):
+        """Record the options behind each histogram, remapping histograms whose question's options moved"""
+        hashes = self.bank.content_hashes()
+        changed = False
+        for question_id in list(self._selection_counts):
+            tracked = self._options.get(question_id)
+            if tracked is not None and tracked[0] == hashes.get(question_id):
+                continue
+            question = self.bank.get(question_id)
+            options = tuple(question.get('options', [])) if question is not None else ()
+            if tracked is not None:
+                remap = option_remap(tracked[1], options)
+                if remap is not None:
+                    self._remap_selections(question_id, remap)
+                changed = True
+            self._options[question_id] = (hashes.get(question_id), options)
+        return changed
+    
+    def _remap_selections(self, question_id, remap):
+        counts = {}
+        for selected, count in self._selection_counts.pop(question_id).items():
+            counts[remap(selected)] = counts.get(remap(selected), 0) + count
+        self._selection_counts[question_id] = counts
+        for selections in self._selections.values():
+            if question_id in selections:
+                selections[question_id] = remap(selections[question_id])
+    
+    def _count_selections(self, selections, sign):
+        for question_id, selected in selections.items():
+            counts = self._selection_counts.setdefault(question_id, {})
+            counts[selected] = counts.get(selected, 0) + sign
+            if not counts[selected]:
+                del counts[selected]
+    
+    def option_rates(self, question):
+        """Share of recorded selections that include each option, or None if no selections were recorded"""
+        counts = self._selection_counts.get(question['id'])
+        total = sum(counts.values()) if counts else 0
+        if not total:
+            return None
+        correct_answers = correct_answers_for(question)
+        return [{
+            'option': option,
+            'rate': sum(count for selected, count in counts.items() if selected >> position & 1) / total,
+            'correct': option in correct_answers
+        } for position, option in enumerate(question.get('options', []))]
+    
+    def compute(self, matrix):
+        """Vectorized statistics for a users x questions uint8 score matrix
+        
+        Returns per-question response counts, p-values (mean score) and
+        upper-minus-lower-group discrimination, plus per-user answer counts,
+        mean scores and percentile ranks. Undefined values are NaN.
+        """
+        answered = matrix != self.MISSING
+        
+        def score_sums(rows, counts, axis):
+            # Sum the raw cells and take the MISSING markers back out, instead of masking a copy
+            return (rows.sum(axis=axis, dtype=np.int64) - self.MISSING * (rows.shape[axis] - counts)) / self.SCALE
+        
+        question_counts = answered.sum(axis=0)
+        user_counts = answered.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            p_values = score_sums(matrix, question_counts, 0) / question_counts
+            user_means = score_sums(matrix, user_counts, 1) / user_counts
+        
+        # Rank users by mean score; the top and bottom group_fraction form the comparison groups
+        active = np.flatnonzero(user_counts)
+        percentiles = np.full(len(user_counts), np.nan)
+        discrimination = np.full(matrix.shape[1], np.nan)
+        if len(active):
+            active_means = user_means[active]
+            ranked = np.sort(active_means)
+            percentiles[active] = np.searchsorted(ranked, active_means, side='left') / len(active) * 100
+            
+            group = max(1, int(round(len(active) * self.group_fraction)))
+            order = active[np.argsort(active_means, kind='stable')]
+            lower, upper = order[:group], order[-group:]
+            upper_counts = answered[upper].sum(axis=0)
+            lower_counts = answered[lower].sum(axis=0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                p_upper = score_sums(matrix[upper], upper_counts, 0) / upper_counts
+                p_lower = score_sums(matrix[lower], lower_counts, 0) / lower_counts
+            discrimination = p_upper - p_lower
+        
+        return {
+            'question_counts': question_counts,
+            'p_values': p_values,
+            'discrimination': discrimination,
+            'user_counts': user_counts,
+            'user_means': user_means,
+            'percentiles': percentiles
+        }
+    
+    def flags(self, responses, p_value, discrimination):
+        """Review hints for one question"""
+        if responses < self.min_responses:
+            return ['few responses']
+        flags = []
+        if discrimination == discrimination:  # not NaN
+            if discrimination < 0:
+                flags.append('negative discrimination: check the answer key')
+            elif discrimination < 0.2:
+                flags.append('low discrimination: possibly ambiguous')
+        if p_value > 0.9:
+            flags.append('too easy')
+        elif p_value < 0.3:
+            flags.append('too hard')
+        return flags
+    
+    def report(self):
+        """Return {'questions': [...], 'users': [...], 'answers': n, 'seconds': t} for the current bank"""
+        with self._lock:
+            changed = self.refresh()
+            if self._result is not None and not changed:
+                return self._result
+            
+            started = time.perf_counter()
+            stats = self.compute(self._matrix[:len(self._rows), :len(self._columns)])
+            
+            questions = []
+            for question in self.bank.all():
+                column = self._columns.get(question['id'])
+                if column is None:
+                    continue  # Added after this refresh; picked up next time
+                responses = int(stats['question_counts'][column])
+                p_value = float(stats['p_values'][column])
+                discrimination = float(stats['discrimination'][column])
+                questions.append({
+                    'id': question['id'],
+                    'question': question['question'],
+                    'responses': responses,
+                    'p_value': p_value if responses else None,
+                    'discrimination': discrimination if discrimination == discrimination else None,
+                    'flags': self.flags(responses, p_value, discrimination),
+                    'options': self.option_rates(question)
+                })
+            
+            users = [{
+                'username': username,
+                'answered': int(stats['user_counts'][row]),
+                'mean_score': float(stats['user_means'][row]),
+                'percentile': float(stats['percentiles'][row])
+            } for username, row in self._rows.items() if username in self._signatures and stats['user_counts'][row]]
+            
+            self._result = {
+                'questions': questions,
+                'users': sorted(users, key=lambda user: -user['percentile']),
+                'answers': int(stats['question_counts'].sum()),
+                'seconds': time.perf_counter() - started
+            }
+            return self._result
 
-# ======================= JSON FILE OPERATIONS =======================
+item_analysis = ItemAnalysis(progress_store, question_bank) if np is not None else None
+
+# ======================= DATA OPERATIONS =======================
 
 def load_questions():
-    return SimpleDataHelper.load_json('questions.json', [])
+    """Return an editable copy of the question bank (use question_bank for read-only access)"""
+    return [dict(q) for q in question_bank.all()]
+
+def save_questions(questions, changed_ids=None):
+    question_bank.replace(questions, changed_ids)
 
-def save_questions(questions):
-    SimpleDataHelper.save_json('questions.json', questions)
+def add_questions(questions):
+    """Store new questions; each one's 'id' is set to the id it was given"""
+    question_bank.add(questions)
 
 def load_progress():
-    return SimpleDataHelper.load_json('progress.json', {})
+    return progress_store.load_all()
 
 def save_progress(progress):
-    SimpleDataHelper.save_json('progress.json', progress)
+    progress_store.replace_all(progress)
 
 def load_users():
-    return SimpleDataHelper.load_json('users.json', {})
+    return storage.load_users()
 
 def load_flashcards():
-    return SimpleDataHelper.load_json('flashcards.json', [])
+    """Return an editable copy of the deck (use flashcard_deck for read-only access)"""
+    return [dict(card) for card in flashcard_deck.all()]
 
-def save_flashcards(flashcards):
-    SimpleDataHelper.save_json('flashcards.json', flashcards)
+def save_flashcards(flashcards, changed_ids=None):
+    flashcard_deck.replace(flashcards, changed_ids)
+
+def add_flashcards(flashcards):
+    """Store new flashcards; each one's 'id' is set to the id it was given"""
+    flashcard_deck.add(flashcards)
 
 def load_flashcard_progress(username=None):
-    data = SimpleDataHelper.load_json('flashcard_progress.json', {})
-    return data.get(username, {}) if username else data
+    return storage.load_flashcard_progress(username)
 
 def save_flashcard_progress_data(username, progress_data):
-    data = SimpleDataHelper.load_json('flashcard_progress.json', {})
-    data[username] = progress_data
-    SimpleDataHelper.save_json('flashcard_progress.json', data)
+    storage.save_flashcard_progress(username, progress_data)
 
 # ======================= HELPER FUNCTIONS =======================
 
@@ -86,30 +2781,24 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def convert_markdown(text):
-    """Convert markdown text to HTML"""
-    return markdown.markdown(text)
+def convert_markdown(text, question_id=None):
+    """Convert markdown text to HTML (cached, keyed by question id and content hash)"""
+    return markdown_cache.render(text, question_id)
 
 def get_user_progress(username):
     """Get progress for a specific user"""
-    progress = load_progress()
-    return progress.get(username, {})
+    return progress_store.get_user(username)
 
-def save_user_progress(username, question_id, is_correct, score=None):
+def save_user_progress(username, question_id, is_correct, score=None, selected=None):
     """Save progress for a specific user and question with score support"""
-    progress = load_progress()
-    
-    if username not in progress:
-        progress[username] = {}
-    
-    progress[username][str(question_id)] = {
-        'completed': True,
-        'correct': is_correct,
-        'score': score if score is not None else (1.0 if is_correct else 0.0),
-        'timestamp': datetime.now().isoformat()
-    }
-    
-    save_progress(progress)
+    progress_store.record(
+        username,
+        question_id,
+        is_correct,
+        score if score is not None else (1.0 if is_correct else 0.0),
+        datetime.now().isoformat(),
+        selected
+    )
 
 def process_question_answers(form_data):
     """Process answers from form data, handling both single and multiple correct answers"""
@@ -169,193 +2858,519 @@ def check_user_answer(user_answers, correct_answers, question_type):
             'total_correct': total_correct
         }
 
-def initialize_quiz_session():
-    """Initialize a new quiz session with shuffled questions"""
-    questions = load_questions()
-    random.shuffle(questions)
+def correct_answers_for(question):
+    """The question's correct answers as a list (older questions only have correct_answer)"""
+    correct_answers = question.get('correct_answers', [question.get('correct_answer', '')])
+    if not correct_answers and question.get('correct_answer'):
+        correct_answers = [question.get('correct_answer')]
+    return correct_answers
+
+def answer_mask(options, answers):
+    """Bitmask of the options found in answers (bit i set = options[i] chosen)"""
+    chosen = set(answers)
+    mask = 0
+    for position, option in enumerate(options):
+        if option in chosen:
+            mask |= 1 << position
+    return mask
+
+def selected_mask(question, user_answers):
+    """Bitmask of the options a user chose; single-choice questions only count the first answer"""
+    if question.get('question_type', 'single') == 'single':
+        user_answers = user_answers[:1]
+    return answer_mask(question.get('options', []), user_answers)
+
+def answer_key(question):
+    """What a stored answer bitmask is graded against: the question type and the correct options' bitmask"""
+    return question.get('question_type', 'single'), answer_mask(question.get('options', []), correct_answers_for(question))
+
+def option_remap(old_options, new_options):
+    """Return a function moving option bits from positions in old_options to the same text's position in new_options
+    
+    Bits of options that were removed are dropped. Returns None when every
+    option keeps its position, i.e. stored bitmasks stay valid as they are.
+    """
+    positions = {}
+    for position, option in enumerate(new_options):
+        positions.setdefault(option, position)
+    moves = [(old_position, positions[option]) for old_position, option in enumerate(old_options) if option in positions]
+    if len(moves) == len(old_options) and all(old == new for old, new in moves):
+        return None
+    remapped = {}
+    
+    def remap(selected):
+        result = remapped.get(selected)
+        if result is None:
+            result = 0
+            for old_position, new_position in moves:
+                if selected >> old_position & 1:
+                    result |= 1 << new_position
+            remapped[selected] = result
+        return result
+    return remap
+
+def mask_grader(question):
+    """Return a function grading a selected-options bitmask with check_user_answer's scoring
+    
+    The correct answers are folded into one bitmask up front, so each grade
+    is a couple of AND/popcount operations, memoized per distinct bitmask
+    since most answers to a question share a handful of them.
+    """
+    correct_answers = correct_answers_for(question)
+    single = question.get('question_type', 'single') == 'single'
+    if single:
+        correct_answers = correct_answers[:1]
+    correct_mask = answer_mask(question.get('options', []), correct_answers)
+    total_correct = len(set(correct_answers))
+    grades = {}
+    
+    def grade(selected):
+        result = grades.get(selected)
+        if result is None:
+            wrong = selected & ~correct_mask
+            if single:
+                is_correct = bool(selected) and not wrong
+                result = (is_correct, 1.0 if is_correct else 0.0)
+            elif not total_correct:
+                result = (False, 0.0)
+            else:
+                correct_selected = bin(selected & correct_mask).count('1')
+                incorrect_selected = bin(wrong).count('1')
+                score = max(0, correct_selected - (incorrect_selected * 0.5)) / total_correct
+                result = (correct_selected == total_correct and not wrong, min(1.0, score))
+            grades[selected] = result
+        return result
+    return grade
+
+def grade_answer(username, question, user_answers):
+    """Score the user's answers to a question and record the result; returns (correct answers, result)"""
+    correct_answers = correct_answers_for(question)
+    result = check_user_answer(user_answers, correct_answers, question.get('question_type', 'single'))
+    save_user_progress(username, question['id'], result['is_correct'], result['score'],
+                       selected_mask(question, user_answers))
+    return correct_answers, result
+
+QUIZ_MODES = ('all', 'unanswered', 'wrong', 'adaptive')
+
+def adaptive_order(candidates, answers, tags_by_id):
+    """Weighted random order of question ids, weakest first on average
+    
+    A question's weight is its own miss (1 - last score; unanswered counts
+    as 0.1) scaled by the smoothed miss rate of its tags (of all answers for
+    untagged questions). Sampling uses random() ** (1 / weight) keys, so
+    every question can still appear.
+    """
+    scores = answers['scores']
+    missed = {}
+    for question_id, score in scores.items():
+        for tag in tags_by_id.get(question_id) or ('',):
+            total = missed.setdefault(tag, [0.0, 0])
+            total[0] += 1.0 - score
+            total[1] += 1
+    weakness = {tag: (miss + 1.0) / (count + 2.0) for tag, (miss, count) in missed.items()}
+    
+    def weight(question_id):
+        own = 1.0 - scores[question_id] if question_id in scores else 0.1
+        areas = [weakness.get(tag, 0.5) for tag in tags_by_id.get(question_id) or ('',)]
+        return (0.02 + own) * (0.5 + sum(areas) / len(areas))
+    
+    keys = {question_id: random.random() ** (1.0 / weight(question_id)) for question_id in candidates}
+    return sorted(keys, key=keys.__getitem__, reverse=True)
+
+def select_quiz_questions(username, mode='all', tag='', count=None):
+    """Pick the question ids for a new quiz
+    
+    Tag and mode filters are set operations on the bank's id/tag index and
+    the user's answered/wrong id sets, so starting a quiz never walks the
+    whole progress history.
+    """
+    candidates = question_bank.id_set(tag)
+    if mode == 'all':
+        question_ids = list(candidates)
+        random.shuffle(question_ids)
+    else:
+        answers = progress_store.get_answer_index(username)
+        if mode == 'unanswered':
+            question_ids = list(candidates.difference(answers['scores']))
+            random.shuffle(question_ids)
+        elif mode == 'wrong':
+            question_ids = list(candidates.intersection(answers['wrong']))
+            random.shuffle(question_ids)
+        else:
+            question_ids = adaptive_order(candidates, answers, question_bank.tags_by_id())
+    
+    return question_ids[:count] if count else question_ids
+
+def initialize_quiz_session(question_ids=None):
+    """Initialize a new quiz session (by default every question, shuffled)"""
+    if question_ids is None:
+        question_ids = question_bank.ids()
+        random.shuffle(question_ids)
+    
+    # The shuffled order is written server-side once; the signed cookie carries the quiz id
+    # and the position, so moving to the next question doesn't rewrite the stored state
+    session['quiz_id'] = quiz_sessions.create({'order': question_ids, 'username': session.get('username')})
+    session['quiz_index'] = 0
+    g.quiz_state = {'order': question_ids, 'index': 0}
+    
+    return question_ids
+
+def get_quiz_state():
+    """Load the current user's quiz state (once per request), or None if there is no active quiz"""
+    if 'quiz_state' not in g:
+        stored = owned_session_state('quiz_id')
+        g.quiz_state = None if stored is None else {
+            'order': stored['order'],
+            'index': session.get('quiz_index', 0)
+        }
+    return g.quiz_state
+
+def owned_session_state(key):
+    """Stored quiz/exam state whose id is in the session under key, if it belongs to the logged-in user"""
+    state_id = session.get(key)
+    state = quiz_sessions.get(state_id) if state_id else None
+    if state is not None and state.get('username') != session.get('username'):
+        # Left behind by someone else who used this browser: never show or grade it for this user
+        session.pop(key, None)
+        state = None
+    return state
+
+def set_quiz_index(quiz_state, index):
+    """Move the active quiz to another position (kept in the session cookie)"""
+    quiz_state['index'] = session['quiz_index'] = index
+
+def clear_quiz_session():
+    """End the active quiz and drop its server-side state"""
+    quiz_id = session.pop('quiz_id', None)
+    session.pop('quiz_index', None)
+    if quiz_id:
+        quiz_sessions.delete(quiz_id)
+    g.quiz_state = None
+
+def quiz_results(username, quiz_state):
+    """Score summary for the questions of a quiz, from the user's saved progress"""
+    user_progress = get_user_progress(username)
+    question_ids = quiz_state['order']
     
-    # Store shuffled question IDs in session
-    session['quiz_questions'] = [q['id'] for q in questions]
-    session['current_question_index'] = 0
-    session['quiz_active'] = True
+    # Calculate results with score support
+    total_questions = len(question_ids)
+    answered_questions = 0
+    correct_answers = 0
+    total_score = 0.0
+    
+    for question_id in question_ids:
+        if str(question_id) in user_progress:
+            answered_questions += 1
+            if user_progress[str(question_id)]['correct']:
+                correct_answers += 1
+            # Add score if available (for partial credit)
+            score = user_progress[str(question_id)].get('score', 1.0 if user_progress[str(question_id)]['correct'] else 0.0)
+            total_score += score
     
-    return questions
+    return {
+        'total_questions': total_questions,
+        'answered_questions': answered_questions,
+        'correct_answers': correct_answers,
+        'total_score': total_score,
+        'score_percentage': (correct_answers / total_questions * 100) if total_questions > 0 else 0,
+        'weighted_score_percentage': (total_score / total_questions * 100) if total_questions > 0 else 0
+    }
 
 def get_current_question():
     """Get the current question based on session state"""
-    if 'quiz_questions' not in session or 'current_question_index' not in session:
+    quiz_state = get_quiz_state()
+    if quiz_state is None:
         return None
     
-    questions = load_questions()
-    question_ids = session['quiz_questions']
-    current_index = session['current_question_index']
+    question_ids = quiz_state['order']
+    current_index = quiz_state['index']
     
     if current_index >= len(question_ids):
         return None
     
-    current_question_id = question_ids[current_index]
-    current_question = next((q for q in questions if q['id'] == current_question_id), None)
+    current_question = question_bank.get(question_ids[current_index])
     
-    return current_question
-
-def generate_flashcard_id():
-    """Generate unique ID for new flashcard"""
-    flashcards = load_flashcards()
-    if not flashcards:
-        return 1
-    return max(card['id'] for card in flashcards) + 1
+    # Return a copy so the route can attach rendering data
+    return dict(current_question) if current_question is not None else None
 
 def get_flashcard_categories():
     """Get all unique categories from flashcards"""
-    flashcards = load_flashcards()
-    categories = set()
-    for card in flashcards:
-        if card.get('category'):
-            categories.add(card['category'])
-    return sorted(list(categories))
+    return flashcard_deck.categories()
 
 def update_flashcard_progress(username, card_id, difficulty):
     """Update progress for a specific flashcard"""
-    progress = load_flashcard_progress(username)
     today = datetime.now().strftime('%Y-%m-%d')
     
-    # Initialize progress structure
-    if 'studied_today' not in progress:
-        progress['studied_today'] = []
-    if 'card_stats' not in progress:
-        progress['card_stats'] = {}
-    
-    # Update card statistics
-    card_stats = progress['card_stats'].get(str(card_id), {
-        'times_studied': 0,
-        'difficulty_ratings': [],
-        'last_studied': None
-    })
-    
-    card_stats['times_studied'] += 1
-    card_stats['difficulty_ratings'].append(difficulty)
-    card_stats['last_studied'] = today
-    
-    # Keep only last 10 difficulty ratings
-    if len(card_stats['difficulty_ratings']) > 10:
-        card_stats['difficulty_ratings'] = card_stats['difficulty_ratings'][-10:]
-    
-    progress['card_stats'][str(card_id)] = card_stats
-    
-    # Add to today's studied cards if not already there
-    if card_id not in progress['studied_today']:
-        progress['studied_today'].append(card_id)
+    def review(previous_stats):
+        # Runs under the storage write lock, on the stats as currently stored
+        card_stats = dict(previous_stats, difficulty_ratings=list(previous_stats.get('difficulty_ratings', [])))
+        card_stats.setdefault('times_studied', 0)
+        card_stats.setdefault('last_studied', None)
+        
+        card_stats['times_studied'] += 1
+        card_stats['difficulty_ratings'].append(difficulty)
+        card_stats['last_studied'] = today
+        apply_review(card_stats, difficulty, datetime.now())
+        
+        # Keep only the last RATINGS_KEPT difficulty ratings
+        if len(card_stats['difficulty_ratings']) > RATINGS_KEPT:
+            card_stats['difficulty_ratings'] = card_stats['difficulty_ratings'][-RATINGS_KEPT:]
+        return card_stats
     
-    save_flashcard_progress_data(username, progress)
+    # The storage also adds the card to today's studied set
+    previous_stats, card_stats, revision = storage.update_card_stats(username, card_id, review)
+    flashcard_scheduler.record_rating(username, card_id, card_stats)
+    flashcard_stats.record_rating(username, card_id, previous_stats, card_stats, revision - 1, revision)
 
-def get_flashcard_stats(username):
+def get_flashcard_stats(username, progress=None):
     """Get comprehensive flashcard statistics for user"""
-    flashcards = load_flashcards()
-    user_progress = load_flashcard_progress(username)
-    card_stats = user_progress.get('card_stats', {})
+    if progress is None:
+        progress = load_flashcard_progress(username)
+    card_stats = progress.get('card_stats', {})
+    total_cards = len(flashcard_deck)
+    
+    today = datetime.now().strftime('%Y-%m-%d')
     
     stats = {
-        'total_cards': len(flashcards),
+        'total_cards': total_cards,
         'studied_cards': len(card_stats),
-        'unstudied_cards': len(flashcards) - len(card_stats),
-        'due_cards': 0,
-        'mastered_cards': 0,
-        'learning_cards': 0,
-        'difficult_cards': 0,
-        'accuracy_rate': 0,
-        'categories': {}
+        'unstudied_cards': total_cards - len(card_stats),
+        'due_cards': len(flashcard_scheduler.due_cards(username, card_stats, today)),
     }
+    stats.update(flashcard_stats.summary(username, card_stats, progress.get('revision', 0)))
+    return stats
+
+def get_next_flashcard(username, progress=None):
+    """Get next flashcard using spaced repetition algorithm"""
+    if progress is None:
+        progress = load_flashcard_progress(username)
+    return flashcard_scheduler.next_card(username, progress.get('card_stats', {}))
+
+def clear_study_session(username):
+    """Clear today's study session"""
+    storage.clear_studied_today(username)
+
+# ======================= BULK IMPORT / EXPORT =======================
+
+QUESTION_CSV_FIELDS = ('id', 'question', 'question_type', 'options', 'correct_answers', 'explanation', 'tags')
+
+def question_errors(options, correct_answers):
+    """Return the first validation error for a question's options and answers, or None"""
+    if len(options) < 2:
+        return 'Please provide at least 2 answer options.'
+    if not correct_answers:
+        return 'Please select at least one correct answer.'
+    for correct in correct_answers:
+        if correct not in options:
+            return f'Correct answer "{correct}" must match one of the provided options exactly.'
+    return None
+
+def question_from_record(record):
+    """Build a question (without id) from an import record; returns (question, error)
     
-    total_studies = 0
-    hard_ratings = 0
+    Records are JSON objects or CSV rows. In CSV cells, options and correct
+    answers are one per line and tags are comma-separated.
+    """
+    def text_list(value, separator='\n'):
+        if isinstance(value, str):
+            value = value.split(separator)
+        return [str(item).strip() for item in value or [] if str(item).strip()]
     
-    for card in flashcards:
-        card_id = str(card['id'])
-        card_progress = card_stats.get(card_id, {})
-        category = card.get('category', 'General')
-        
-        # Initialize category stats
-        if category not in stats['categories']:
-            stats['categories'][category] = {
-                'total': 0,
-                'studied': 0,
-                'mastered': 0
-            }
-        
-        stats['categories'][category]['total'] += 1
-        
-        if card_id in card_stats:
-            stats['categories'][category]['studied'] += 1
-            
-            times_studied = card_progress.get('times_studied', 0)
-            recent_ratings = card_progress.get('difficulty_ratings', [])[-3:]  # Last 3 ratings
-            
-            total_studies += times_studied
-            hard_ratings += sum(1 for r in recent_ratings if r == 'hard')
-            
-            # Categorize by performance
-            if recent_ratings:
-                avg_difficulty = sum(1 if d == 'hard' else 2 if d == 'medium' else 3 for d in recent_ratings) / len(recent_ratings)
-                if avg_difficulty >= 2.5:  # Mostly easy/medium
-                    stats['mastered_cards'] += 1
-                    stats['categories'][category]['mastered'] += 1
-                elif avg_difficulty >= 1.5:  # Mixed
-                    stats['learning_cards'] += 1
-                else:  # Mostly hard
-                    stats['difficult_cards'] += 1
-            else:
-                stats['learning_cards'] += 1
+    if not isinstance(record, dict):
+        return None, 'Record must be a JSON object.'
+    question_text = (record.get('question') or '').strip()
+    if not question_text:
+        return None, 'Question text is required.'
     
-    # Calculate accuracy rate (inverse of difficulty)
-    if total_studies > 0:
-        stats['accuracy_rate'] = max(0, 100 - (hard_ratings / total_studies * 100))
+    options = text_list(record.get('options'))
+    correct_answers = text_list(record.get('correct_answers') or record.get('correct_answer'))
+    error = question_errors(options, correct_answers)
+    if error:
+        return None, error
     
-    return stats
+    question_type = record.get('question_type') or ('multiple' if len(correct_answers) > 1 else 'single')
+    if question_type not in ('single', 'multiple'):
+        return None, f'Unknown question type "{question_type}".'
+    
+    question = {
+        'question': question_text,
+        'options': options,
+        'question_type': question_type,
+        'correct_answers': correct_answers,
+        'correct_answer': correct_answers[0],
+        'explanation': record.get('explanation') or ''
+    }
+    tags = text_list(record.get('tags'), ',')
+    if tags:
+        question['tags'] = tags
+    return question, None
 
-def get_next_flashcard(username):
-    """Get next flashcard using spaced repetition algorithm"""
-    flashcards = load_flashcards()
-    if not flashcards:
-        return None
+def iter_question_records(stream, file_format):
+    """Yield (line number, record, parse error) from a JSON-lines or CSV text stream, one record at a time"""
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
     
-    progress = load_flashcard_progress(username)
-    card_stats = progress.get('card_stats', {})
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line), None
+        except ValueError as e:
+            yield line_number, None, f'Invalid JSON: {e}'
+
+def iter_valid_questions(stream, file_format, errors):
+    """Yield (line number, question) for each valid record, appending (line number, error) for the rest"""
+    for line_number, record, error in iter_question_records(stream, file_format):
+        question = None
+        if error is None:
+            question, error = question_from_record(record)
+        if error:
+            errors.append((line_number, error))
+        else:
+            yield line_number, question
+
+def import_questions(stream, file_format='jsonl', strict=False):
+    """Validate and add the questions in the stream, committing them in batches
     
-    # Score cards based on difficulty and study frequency
-    scored_cards = []
-    for card in flashcards:
-        card_id = str(card['id'])
-        stats = card_stats.get(card_id, {})
-        
-        # Calculate priority score
-        times_studied = stats.get('times_studied', 0)
-        recent_ratings = stats.get('difficulty_ratings', [])[-3:]  # Last 3 ratings
-        
-        # Higher score = higher priority
-        score = 100  # Base score
-        
-        # Reduce score based on times studied (recently studied = lower priority)
-        score -= times_studied * 10
-        
-        # Increase score for hard cards
-        if recent_ratings:
-            avg_difficulty = sum(1 if d == 'hard' else 2 if d == 'medium' else 3 for d in recent_ratings) / len(recent_ratings)
-            score += (3 - avg_difficulty) * 20  # Hard cards get higher score
-        
-        # Add some randomness
-        score += random.randint(-10, 10)
-        
-        scored_cards.append((score, card))
+    Records are parsed one at a time and written IMPORT_BATCH_SIZE at a
+    time, so memory doesn't grow with the file. The JSON backend takes at
+    most JSON_IMPORT_LIMIT new questions per import; records past it are
+    rejected. Invalid records are skipped and reported as (line number,
+    error). With strict, the stream (which must be seekable) is validated
+    first and nothing is imported if any record is invalid. Each imported
+    question is checked for near-duplicates, reported as (line number,
+    question id, [(similar question, similarity)]).
+    Returns (imported, errors, duplicates).
+    """
+    errors = []
+    if strict:
+        for _ in iter_valid_questions(stream, file_format, errors):
+            pass
+        if errors:
+            return 0, errors, []
+        stream.seek(0)
+    
+    limit = app.config['JSON_IMPORT_LIMIT'] if app.config['STORAGE_BACKEND'] == 'json' else None
+    batch_size = app.config['IMPORT_BATCH_SIZE']
+    imported = 0
+    duplicates = []
+    batch = []
     
-    # Sort by score (highest first) and return top card
-    scored_cards.sort(key=lambda x: x[0], reverse=True)
-    return scored_cards[0][1] if scored_cards else None
+    def commit():
+        # Only the new documents are handed over; the backend numbers them and merges them in
+        add_questions([question for _, question in batch])
+        # After the write, so records are also compared with the rest of their own batch
+        for line_number, question in batch:
+            similar = question_bank.near_duplicates(question)
+            if similar:
+                duplicates.append((line_number, question['id'], similar))
+        batch.clear()
+    
+    for line_number, question in iter_valid_questions(stream, file_format, errors):
+        if limit is not None and imported >= limit:
+            errors.append((line_number, f'over the JSON backend import limit of {limit} questions'))
+            continue
+        batch.append((line_number, question))
+        imported += 1
+        if len(batch) >= batch_size:
+            commit()
+    if batch:
+        commit()
+    return imported, errors, duplicates
 
-def clear_study_session(username):
-    """Clear today's study session"""
-    progress = load_flashcard_progress(username)
-    progress['studied_today'] = []
-    save_flashcard_progress_data(username, progress)
+def export_questions(file_format='jsonl'):
+    """Yield the question bank as JSON lines or CSV, one question per chunk"""
+    questions = question_bank.all()
+    if file_format != 'csv':
+        for question in questions:
+            yield json.dumps(dict(question), ensure_ascii=False) + '\n'
+        return
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(QUESTION_CSV_FIELDS)
+    for question in questions:
+        writer.writerow([
+            question['id'],
+            question.get('question', ''),
+            question.get('question_type', 'single'),
+            '\n'.join(question.get('options') or []),
+            '\n'.join(question.get('correct_answers') or [question.get('correct_answer', '')]),
+            question.get('explanation', ''),
+            ', '.join(question.get('tags') or [])
+        ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+def question_file_format(filename, requested=None):
+    """'csv' or 'jsonl', from an explicit choice or the file extension"""
+    if requested in ('csv', 'jsonl'):
+        return requested
+    return 'csv' if (filename or '').lower().endswith('.csv') else 'jsonl'
+
+# ======================= ANSWER REGRADING =======================
+
+class AnswerRegrader:
+    """Re-scores stored answers in a background worker pool after an answer key changes
+    
+    The edit request only queues a job. A pool thread then builds a bitmask
+    grader per question (see mask_grader) and lets the progress store
+    rewrite every changed result in one pass. The most recent jobs are kept
+    so the manage page can show how they went.
+    """
+    
+    def __init__(self, progress, bank, workers=2, keep=20):
+        self.progress = progress
+        self.bank = bank
+        self.keep = keep
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='regrade')
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+    
+    def _grader_for(self, question_id):
+        question = self.bank.get(question_id)
+        return mask_grader(question) if question is not None else None
+    
+    def run(self, question_ids):
+        """Regrade every stored answer to these questions now; returns the counts and elapsed seconds"""
+        started = time.perf_counter()
+        counts = self.progress.regrade(question_ids, self._grader_for)
+        counts['seconds'] = time.perf_counter() - started
+        return counts
+    
+    def _work(self, job):
+        job['status'] = 'running'
+        try:
+            job.update(self.run(job['questions']), status='done')
+        except Exception as exc:
+            app.logger.exception('Regrading questions %s failed', job['questions'])
+            job.update(status='failed', error=str(exc))
+    
+    def submit(self, question_ids):
+        """Queue a regrade of these questions; returns the job id"""
+        job = {
+            'id': secrets.token_hex(4),
+            'questions': list(question_ids),
+            'status': 'queued',
+            'submitted': datetime.now().isoformat(timespec='seconds')
+        }
+        with self._lock:
+            self._jobs[job['id']] = job
+            while len(self._jobs) > self.keep:
+                self._jobs.popitem(last=False)
+        self._executor.submit(self._work, job)
+        return job['id']
+    
+    def jobs(self):
+        """Recent jobs, newest first"""
+        with self._lock:
+            return [dict(job) for job in reversed(self._jobs.values())]
+
+answer_regrader = AnswerRegrader(progress_store, question_bank, app.config['REGRADE_WORKERS'])
 
 # ======================= INITIALIZE DATA FILES =======================
 
@@ -377,21 +3392,19 @@ QUESTIONS = [
     }
 ]
 
-# Initialize all JSON files if they don't exist
-if not os.path.exists('questions.json'):
-    SimpleDataHelper.save_json('questions.json', QUESTIONS)
-
-if not os.path.exists('progress.json'):
-    SimpleDataHelper.save_json('progress.json', {})
+# Initialize all data files (or database tables) if they don't exist
+storage.initialize(QUESTIONS, {"admin": "password"})  # Default user
 
-if not os.path.exists('flashcards.json'):
-    SimpleDataHelper.save_json('flashcards.json', [])
-
-if not os.path.exists('flashcard_progress.json'):
-    SimpleDataHelper.save_json('flashcard_progress.json', {})
+def warm_caches():
+    """Load and index the question bank and flashcards and pre-render the bank's Markdown
+    
+    Runs once at import; under a pre-forking server (see wsgi.py) that is
+    once in the master, and workers share the result copy-on-write.
+    """
+    markdown_cache.warm(question_bank.all())
+    flashcard_deck.all()
 
-if not os.path.exists('users.json'):
-    SimpleDataHelper.save_json('users.json', {"admin": "password"})  # Default user
+warm_caches()
 
 # ======================= AUTHENTICATION ROUTES =======================
 
@@ -415,11 +3428,13 @@ def login():
 @app.route('/logout')
 def logout():
     username = session.get('username')
+    # Clear quiz, exam and study session data so none of it carries over to the next user
+    clear_quiz_session()
+    clear_exam_session()
+    session.pop('skipped_due_cards', None)
     session.pop('username', None)
-    # Clear quiz session data
-    session.pop('quiz_questions', None)
-    session.pop('current_question_index', None)
-    session.pop('quiz_active', None)
+    if username:
+        flashcard_scheduler.forget(username)
     flash(f'You have been logged out. Goodbye!')
     return redirect(url_for('login'))
 
@@ -428,12 +3443,9 @@ def logout():
 def reset_progress():
     """Reset progress for the current user"""
     username = session.get('username')
-    progress = load_progress()
     
     # Remove user's progress
-    if username in progress:
-        del progress[username]
-        save_progress(progress)
+    if progress_store.reset_user(username):
         flash('Your progress has been reset successfully!')
     else:
         flash('No progress found to reset.')
@@ -445,22 +3457,42 @@ def reset_progress():
 @app.route('/')
 @login_required
 def index():
-    return render_template('index.html')
+    return render_template('index.html', question_tags=question_bank.tag_counts())
 
 @app.route('/question_stats')
 @login_required
 def question_stats():
-    """Return the total number of questions and user progress for progress tracking"""
-    questions = load_questions()
+    """Return the total number of questions and user progress for progress tracking
+    
+    ?slim=1 returns only the counts. Responses carry an ETag derived from the
+    bank version and the user's running totals, so repeat polls get a 304.
+    """
     username = session.get('username')
-    user_progress = get_user_progress(username)
+    slim = request.args.get('slim') == '1'
+    summary = progress_store.get_summary(username)
+    total = len(question_bank)
     
-    return jsonify({
-        'total': len(questions),
-        'ids': [q['id'] for q in questions],
-        'completed': len(user_progress),
-        'progress': user_progress
-    })
+    etag = hashlib.sha1(repr((slim, question_bank.version, total, sorted(summary.items()))).encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    elif slim:
+        response = jsonify({
+            'total': total,
+            'completed': summary['completed'],
+            'correct': summary['correct'],
+            'score': summary['score']
+        })
+    else:
+        response = jsonify({
+            'total': total,
+            'ids': question_bank.ids(),
+            'completed': summary['completed'],
+            'progress': get_user_progress(username)
+        })
+    
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 # ======================= QUIZ ROUTES =======================
 
@@ -473,14 +3505,23 @@ def quiz():
 @app.route('/quiz/start')
 @login_required
 def quiz_start():
-    """Start a new quiz session"""
+    """Start a new quiz session: ?mode=all|unanswered|wrong|adaptive&tag=...&count=N"""
+    mode = request.args.get('mode', 'all')
+    if mode not in QUIZ_MODES:
+        mode = 'all'
+    count = request.args.get('count', type=int)
+    
+    question_ids = select_quiz_questions(session['username'], mode, request.args.get('tag', ''),
+                                         count if count and count > 0 else None)
+    if not question_ids:
+        flash('No questions match that quiz selection.')
+        return redirect(url_for('index'))
+    
     # Clear any existing quiz session
-    session.pop('quiz_questions', None)
-    session.pop('current_question_index', None)
-    session.pop('quiz_active', None)
+    clear_quiz_session()
     
     # Initialize new quiz
-    initialize_quiz_session()
+    initialize_quiz_session(question_ids)
     
     return redirect(url_for('quiz_question'))
 
@@ -488,7 +3529,8 @@ def quiz_start():
 @login_required
 def quiz_question():
     """Display the current question"""
-    if 'quiz_questions' not in session:
+    quiz_state = get_quiz_state()
+    if quiz_state is None:
         flash('Please start the quiz first.')
         return redirect(url_for('quiz_start'))
     
@@ -499,8 +3541,8 @@ def quiz_question():
         return redirect(url_for('quiz_complete'))
     
     # Convert markdown to HTML
-    current_question['question_html'] = convert_markdown(current_question['question'])
-    current_question['explanation_html'] = convert_markdown(current_question['explanation'])
+    current_question['question_html'] = convert_markdown(current_question['question'], current_question['id'])
+    current_question['explanation_html'] = convert_markdown(current_question['explanation'], current_question['id'])
     
     # Get user progress for this question
     username = session.get('username')
@@ -515,8 +3557,8 @@ def quiz_question():
         current_question['user_correct'] = False
     
     # Calculate progress
-    current_index = session['current_question_index']
-    total_questions = len(session['quiz_questions'])
+    current_index = quiz_state['index']
+    total_questions = len(quiz_state['order'])
     
     quiz_info = {
         'current_number': current_index + 1,
@@ -533,42 +3575,15 @@ def quiz_question():
 @login_required
 def quiz_complete():
     """Show quiz completion summary"""
-    if 'quiz_questions' not in session:
+    quiz_state = get_quiz_state()
+    if quiz_state is None:
         flash('No quiz session found.')
         return redirect(url_for('index'))
     
-    username = session.get('username')
-    user_progress = get_user_progress(username)
-    question_ids = session['quiz_questions']
-    
-    # Calculate results with score support
-    total_questions = len(question_ids)
-    answered_questions = 0
-    correct_answers = 0
-    total_score = 0.0
-    
-    for question_id in question_ids:
-        if str(question_id) in user_progress:
-            answered_questions += 1
-            if user_progress[str(question_id)]['correct']:
-                correct_answers += 1
-            # Add score if available (for partial credit)
-            score = user_progress[str(question_id)].get('score', 1.0 if user_progress[str(question_id)]['correct'] else 0.0)
-            total_score += score
-    
-    results = {
-        'total_questions': total_questions,
-        'answered_questions': answered_questions,
-        'correct_answers': correct_answers,
-        'total_score': total_score,
-        'score_percentage': (correct_answers / total_questions * 100) if total_questions > 0 else 0,
-        'weighted_score_percentage': (total_score / total_questions * 100) if total_questions > 0 else 0
-    }
+    results = quiz_results(session.get('username'), quiz_state)
     
     # Clear quiz session
-    session.pop('quiz_questions', None)
-    session.pop('current_question_index', None)
-    session.pop('quiz_active', None)
+    clear_quiz_session()
     
     return render_template('quiz_complete.html', results=results)
 
@@ -578,20 +3593,15 @@ def check_answer():
     question_id = int(request.form.get('question_id'))
     username = session.get('username')
     
-    questions = load_questions()
-    question = next((q for q in questions if q['id'] == question_id), None)
+    question = question_bank.get(question_id)
     
     if not question:
         flash('Question not found.')
         return redirect(url_for('quiz'))
     
-    # Get question type and correct answers (with backward compatibility)
-    question_type = question.get('question_type', 'single')
-    correct_answers = question.get('correct_answers', [question.get('correct_answer', '')])
+    question = dict(question)
     
-    # Handle backward compatibility - if correct_answers doesn't exist but correct_answer does
-    if not correct_answers and question.get('correct_answer'):
-        correct_answers = [question.get('correct_answer')]
+    question_type = question.get('question_type', 'single')
     
     # Get user answers
     if question_type == 'multiple':
@@ -602,15 +3612,12 @@ def check_answer():
         user_answer = request.form.get('answer')
         user_answers = [user_answer] if user_answer else []
     
-    # Check answers and calculate score
-    result = check_user_answer(user_answers, correct_answers, question_type)
+    # Check answers, calculate score and save user progress
+    correct_answers, result = grade_answer(username, question, user_answers)
     
     # Convert markdown to HTML
-    question['question_html'] = convert_markdown(question['question'])
-    question['explanation_html'] = convert_markdown(question['explanation'])
-    
-    # Save user progress (use score for more nuanced tracking)
-    save_user_progress(username, question_id, result['is_correct'], result['score'])
+    question['question_html'] = convert_markdown(question['question'], question_id)
+    question['explanation_html'] = convert_markdown(question['explanation'], question_id)
     
     return render_template('result.html', 
                           question=question, 
@@ -623,22 +3630,309 @@ def check_answer():
 @login_required
 def quiz_next():
     """Move to next question"""
-    if 'current_question_index' in session:
-        session['current_question_index'] += 1
+    quiz_state = get_quiz_state()
+    if quiz_state is not None:
+        set_quiz_index(quiz_state, quiz_state['index'] + 1)
     
     return redirect(url_for('quiz_question'))
 
+# ======================= QUIZ API =======================
+
+QUIZ_PREFETCH_DEFAULT = 3
+QUIZ_PREFETCH_MAX = 10
+
+def quiz_prefetch_count(value):
+    """Clamp a requested prefetch count to 1..QUIZ_PREFETCH_MAX"""
+    try:
+        count = int(value)
+    except (TypeError, ValueError):
+        return QUIZ_PREFETCH_DEFAULT
+    return min(max(count, 1), QUIZ_PREFETCH_MAX)
+
+def quiz_question_payload(question):
+    """Client-side view of a question: rendered text and options, without answers or explanation"""
+    return {
+        'id': question['id'],
+        'question_type': question.get('question_type', 'single'),
+        'question_html': convert_markdown(question['question'], question['id']),
+        'options': list(question.get('options') or [])
+    }
+
+def quiz_state_payload(username, quiz_state, prefetch):
+    """Position in the quiz plus the current and upcoming questions; finishes the quiz at the end"""
+    order = quiz_state['order']
+    index = quiz_state['index']
+    if index >= len(order):
+        results = quiz_results(username, quiz_state)
+        clear_quiz_session()
+        return {'complete': True, 'index': index, 'total': len(order), 'questions': [], 'results': results}
+    
+    upcoming = (question_bank.get(question_id) for question_id in order[index:index + prefetch])
+    return {
+        'complete': False,
+        'index': index,
+        'total': len(order),
+        'questions': [quiz_question_payload(question) for question in upcoming if question is not None]
+    }
+
+@app.route('/api/quiz/start', methods=['POST'])
+@login_required
+def quiz_api_start():
+    """Start a quiz (same mode/tag/count options as /quiz/start) and return its first questions"""
+    options = request.get_json(silent=True) or request.form
+    mode = options.get('mode', 'all') if options.get('mode') in QUIZ_MODES else 'all'
+    count = options.get('count')
+    count = int(count) if str(count or '').isdigit() and int(count) > 0 else None
+    
+    question_ids = select_quiz_questions(session['username'], mode, options.get('tag', ''), count)
+    if not question_ids:
+        return jsonify({'error': 'No questions match that quiz selection.'}), 404
+    
+    clear_quiz_session()
+    initialize_quiz_session(question_ids)
+    return jsonify(quiz_state_payload(session['username'], get_quiz_state(), quiz_prefetch_count(options.get('prefetch'))))
+
+@app.route('/api/quiz')
+@login_required
+def quiz_api_state():
+    """The active quiz's position and next questions (?prefetch=K)"""
+    quiz_state = get_quiz_state()
+    if quiz_state is None:
+        return jsonify({'error': 'No active quiz.'}), 404
+    return jsonify(quiz_state_payload(session['username'], quiz_state, quiz_prefetch_count(request.args.get('prefetch'))))
+
+@app.route('/api/quiz/answer', methods=['POST'])
+@login_required
+def quiz_api_answer():
+    """Grade the current question, advance, and return the result with the next questions
+    
+    Body: {"question_id": 12, "answers": ["..."], "prefetch": 3}, or
+    {"question_id": 12, "skip": true}. One request replaces the
+    check_answer / quiz/next / quiz/question round trips.
+    """
+    username = session['username']
+    data = request.get_json(silent=True) or {}
+    prefetch = quiz_prefetch_count(data.get('prefetch'))
+    quiz_state = get_quiz_state()
+    if quiz_state is None:
+        return jsonify({'error': 'No active quiz.'}), 404
+    
+    order = quiz_state['order']
+    index = quiz_state['index']
+    if index >= len(order) or data.get('question_id') != order[index]:
+        # Stale client (another tab moved on): send the real position instead
+        payload = quiz_state_payload(username, quiz_state, prefetch)
+        payload['error'] = 'That is not the current question.'
+        return jsonify(payload), 409
+    
+    response = {}
+    question = question_bank.get(order[index])
+    if question is not None and not data.get('skip'):
+        answers = data.get('answers') or []
+        if isinstance(answers, str):
+            answers = [answers]
+        if question.get('question_type', 'single') != 'multiple':
+            answers = answers[:1]
+        correct_answers, result = grade_answer(username, question, answers)
+        response['result'] = dict(result, question_id=question['id'], correct_answers=correct_answers,
+                                  explanation_html=convert_markdown(question.get('explanation'), question['id']))
+    
+    set_quiz_index(quiz_state, index + 1)
+    response.update(quiz_state_payload(username, quiz_state, prefetch))
+    return jsonify(response)
+
+@app.route('/quiz/fast')
+@login_required
+def quiz_fast():
+    """Quiz client that answers through /api/quiz/answer and flips to prefetched questions"""
+    return render_template('quiz_fast.html', prefetch=QUIZ_PREFETCH_DEFAULT, quiz_query=request.args.to_dict())
+
+# ======================= EXAM ROUTES =======================
+
+EXAM_GRACE_SECONDS = 5  # Allow for request latency when an answer is saved right at the deadline
+
+def get_exam_state():
+    """Load the current user's exam attempt (once per request), or None if there is none"""
+    if 'exam_state' not in g:
+        g.exam_state = owned_session_state('exam_id')
+    return g.exam_state
+
+def clear_exam_session():
+    """End the active exam and drop its server-side state"""
+    exam_id = session.pop('exam_id', None)
+    if exam_id:
+        quiz_sessions.delete(exam_id)
+    g.exam_state = None
+
+def finish_exam(username, exam_state):
+    """Grade the whole attempt in one pass, then write progress and the attempt record once each
+    
+    Unanswered questions score zero in the attempt but are not recorded
+    in progress, so they still count as unanswered for practice quizzes.
+    """
+    now = time.time()
+    graded = []
+    results = []
+    for question_id in exam_state['order']:
+        question = question_bank.get(question_id)
+        if question is None:
+            continue  # Deleted during the exam
+        answers = exam_state['answers'].get(str(question_id), [])
+        result = {'is_correct': False, 'score': 0.0}
+        if answers:
+            result = check_user_answer(answers, correct_answers_for(question), question.get('question_type', 'single'))
+            results.append((question_id, result['is_correct'], result['score'], selected_mask(question, answers)))
+        graded.append({'id': question_id, 'answers': answers, 'correct': result['is_correct'], 'score': result['score']})
+    
+    total = len(graded)
+    score = sum(item['score'] for item in graded)
+    percentage = score / total * 100 if total else 0.0
+    submitted = datetime.now()
+    attempt = {
+        'id': secrets.token_hex(8),
+        'started': datetime.fromtimestamp(exam_state['started']).isoformat(timespec='seconds'),
+        'submitted': submitted.isoformat(timespec='seconds'),
+        'seconds': int(min(now, exam_state['deadline']) - exam_state['started']),
+        'timed_out': now > exam_state['deadline'],
+        'total': total,
+        'answered': len(results),
+        'correct': sum(1 for item in graded if item['correct']),
+        'score': score,
+        'percentage': percentage,
+        'passed': percentage >= app.config['EXAM_PASS_PERCENT'],
+        'questions': graded
+    }
+    
+    progress_store.record_many(username, results, submitted.isoformat())
+    storage.save_exam_attempt(username, attempt)
+    clear_exam_session()
+    return attempt
+
+@app.route('/exam')
+@login_required
+def exam_home():
+    """Start or resume a timed practice exam and list past attempts"""
+    username = session['username']
+    exam_state = get_exam_state()
+    if exam_state is not None and time.time() > exam_state['deadline'] + EXAM_GRACE_SECONDS:
+        attempt = finish_exam(username, exam_state)
+        flash('Time ran out on your exam, so it was submitted automatically.')
+        return redirect(url_for('exam_result', attempt_id=attempt['id']))
+    
+    return render_template('exam_home.html',
+                           exam_state=exam_state,
+                           seconds_left=int(exam_state['deadline'] - time.time()) if exam_state else None,
+                           attempts=storage.load_exam_attempts(username)[::-1],
+                           question_tags=question_bank.tag_counts(),
+                           exam_questions=min(app.config['EXAM_QUESTIONS'], len(question_bank)),
+                           exam_minutes=app.config['EXAM_MINUTES'],
+                           pass_percent=app.config['EXAM_PASS_PERCENT'])
+
+@app.route('/exam/start', methods=['POST'])
+@login_required
+def exam_start():
+    """Draw the exam's questions and start the clock"""
+    if get_exam_state() is not None:
+        return redirect(url_for('exam_question', number=1))
+    
+    question_ids = select_quiz_questions(session['username'], 'all', request.form.get('tag', ''),
+                                         app.config['EXAM_QUESTIONS'])
+    if not question_ids:
+        flash('No questions match that exam selection.')
+        return redirect(url_for('exam_home'))
+    
+    started = time.time()
+    exam_state = {
+        'username': session['username'],
+        'order': question_ids,
+        'answers': {},
+        'flagged': [],
+        'started': started,
+        'deadline': started + app.config['EXAM_MINUTES'] * 60
+    }
+    session['exam_id'] = quiz_sessions.create(exam_state)
+    return redirect(url_for('exam_question', number=1))
+
+@app.route('/exam/<int:number>', methods=['GET', 'POST'])
+@login_required
+def exam_question(number):
+    """Show one exam question; POST saves its answer (no grading) and moves to another question or submits"""
+    username = session['username']
+    exam_state = get_exam_state()
+    if exam_state is None:
+        flash('You have no exam in progress.')
+        return redirect(url_for('exam_home'))
+    
+    total = len(exam_state['order'])
+    number = min(max(number, 1), total)
+    expired = time.time() > exam_state['deadline'] + EXAM_GRACE_SECONDS
+    
+    if request.method == 'POST' and not expired:
+        question_key = str(exam_state['order'][number - 1])
+        answers = request.form.getlist('answer')
+        if answers:
+            exam_state['answers'][question_key] = answers
+        else:
+            exam_state['answers'].pop(question_key, None)
+        flagged = set(exam_state['flagged'])
+        if request.form.get('flagged'):
+            flagged.add(question_key)
+        else:
+            flagged.discard(question_key)
+        exam_state['flagged'] = sorted(flagged)
+        quiz_sessions.save(session['exam_id'], exam_state)
+    
+    go = request.form.get('go', '') if request.method == 'POST' else ''
+    if expired or go == 'submit':
+        attempt = finish_exam(username, exam_state)
+        if expired:
+            flash('Time ran out, so your exam was submitted automatically.')
+        return redirect(url_for('exam_result', attempt_id=attempt['id']))
+    if go.isdigit():
+        return redirect(url_for('exam_question', number=int(go)))
+    
+    question = dict(question_bank.get(exam_state['order'][number - 1]) or {})
+    if question:
+        question['question_html'] = convert_markdown(question['question'], question['id'])
+    answered = {position for position, question_id in enumerate(exam_state['order'], 1)
+                if str(question_id) in exam_state['answers']}
+    flagged = {position for position, question_id in enumerate(exam_state['order'], 1)
+               if str(question_id) in exam_state['flagged']}
+    
+    return render_template('exam.html',
+                           question=question,
+                           selected=exam_state['answers'].get(str(question.get('id')), []),
+                           number=number,
+                           total=total,
+                           answered=answered,
+                           flagged=flagged,
+                           seconds_left=max(0, int(exam_state['deadline'] - time.time())))
+
+@app.route('/exam/result/<attempt_id>')
+@login_required
+def exam_result(attempt_id):
+    """Score report for one submitted exam"""
+    attempt = next((attempt for attempt in storage.load_exam_attempts(session['username'])
+                    if attempt['id'] == attempt_id), None)
+    if attempt is None:
+        flash('Exam attempt not found.')
+        return redirect(url_for('exam_home'))
+    
+    questions = []
+    for item in attempt['questions']:
+        question = question_bank.get(item['id'])
+        questions.append(dict(item,
+                              question=question['question'] if question else '(question since deleted)',
+                              correct_answers=correct_answers_for(question) if question else []))
+    return render_template('exam_result.html', attempt=attempt, questions=questions,
+                           pass_percent=app.config['EXAM_PASS_PERCENT'])
+
 # ======================= QUESTION MANAGEMENT ROUTES =======================
 
 @app.route('/add_question', methods=['GET', 'POST'])
 @login_required
 def add_question():
     if request.method == 'POST':
-        questions = load_questions()
-        
-        # Generate new ID (max ID + 1)
-        new_id = max([q['id'] for q in questions], default=0) + 1
-        
         # Get form data
         question_text = request.form.get('question')
         question_type = request.form.get('question_type', 'single')
@@ -654,24 +3948,15 @@ def add_question():
         correct_answers = process_question_answers(request.form)
         explanation = request.form.get('explanation')
         
-        # Validate that we have at least 2 options and at least 1 correct answer
-        if len(options) < 2:
-            flash('Please provide at least 2 answer options.')
-            return render_template('add_question.html')
-        
-        if not correct_answers:
-            flash('Please select at least one correct answer.')
+        # Validate: at least 2 options, at least 1 correct answer, answers among the options
+        error = question_errors(options, correct_answers)
+        if error:
+            flash(error)
             return render_template('add_question.html')
         
-        # Validate that all correct answers exist in options
-        for correct in correct_answers:
-            if correct not in options:
-                flash(f'Correct answer "{correct}" must match one of the provided options exactly.')
-                return render_template('add_question.html')
-        
         # Create new question with backward compatibility
         new_question = {
-            "id": new_id,
+            "id": None,  # assigned by storage when the question is saved
             "question": question_text,
             "options": options,
             "question_type": question_type,
@@ -680,32 +3965,226 @@ def add_question():
             "correct_answer": correct_answers[0] if correct_answers else "",
             "explanation": explanation
         }
+        tags = [tag.strip() for tag in request.form.get('tags', '').split(',') if tag.strip()]
+        if tags:
+            new_question['tags'] = tags
+        duplicates = question_bank.near_duplicates(new_question)
         
-        # Add to questions list
-        questions.append(new_question)
-        save_questions(questions)
+        add_questions([new_question])
+        markdown_cache.invalidate(new_question['id'])
         
         flash('Question added successfully!')
+        if duplicates:
+            similar = ', '.join(f"#{question['id']} ({similarity:.0%})" for question, similarity in duplicates[:3])
+            flash(f'This question looks like existing question(s) {similar}. Review them on the duplicates page.')
         return redirect(url_for('add_question'))
     
     return render_template('add_question.html')
 
+MANAGE_PAGE_SIZE = 25
+
+def question_page_args(args):
+    """Filter, sort and paging options for the question list from a request's query string"""
+    def optional_int(name):
+        value = args.get(name, '').strip()
+        return int(value) if value.lstrip('-').isdigit() else None
+    
+    per_page = min(max(optional_int('per_page') or MANAGE_PAGE_SIZE, 1), 100)
+    return {
+        'query': args.get('q', '').strip(),
+        'question_type': args.get('type', ''),
+        'min_id': optional_int('min_id'),
+        'max_id': optional_int('max_id'),
+        'sort': args.get('sort') if args.get('sort') in QuestionBank.SORT_KEYS else 'id',
+        'descending': args.get('order') == 'desc',
+        'per_page': per_page,
+        'offset': max(optional_int('offset') or 0, 0)
+    }
+
+def truncate_text(text, length=80):
+    """Shorten text to about length characters at a word boundary (like Jinja's truncate filter)"""
+    text = text or ''
+    if len(text) <= length + 5:
+        return text
+    return text[:length - 3].rsplit(' ', 1)[0] + '...'
+
 @app.route('/manage_questions')
 @login_required
 def manage_questions():
-    questions = load_questions()
-    return render_template('manage_questions.html', questions=questions)
+    """One page of the question bank; the page fetches the rest from /api/questions as the admin scrolls"""
+    options = question_page_args(request.args)
+    page = max(request.args.get('page', 1, type=int), 1)
+    offset = (page - 1) * options['per_page']
+    
+    questions, total = question_bank.page(
+        options['query'], options['question_type'], options['min_id'], options['max_id'],
+        options['sort'], options['descending'], offset, options['per_page'])
+    
+    filters = {key: value for key, value in request.args.items() if key not in ('page', 'offset') and value}
+    return render_template('manage_questions.html',
+                           questions=questions,
+                           total=total,
+                           page=page,
+                           pages=max(1, -(-total // options['per_page'])),
+                           next_offset=offset + len(questions),
+                           options=options,
+                           filters=filters,
+                           regrade_jobs=answer_regrader.jobs())
+
+@app.route('/api/questions')
+@login_required
+def questions_api():
+    """JSON page of the question list for incremental loading (same filters as /manage_questions)"""
+    options = question_page_args(request.args)
+    questions, total = question_bank.page(
+        options['query'], options['question_type'], options['min_id'], options['max_id'],
+        options['sort'], options['descending'], options['offset'], options['per_page'])
+    
+    next_offset = options['offset'] + len(questions)
+    return jsonify({
+        'questions': [{
+            'id': question['id'],
+            'question': truncate_text(question['question']),
+            'question_type': question.get('question_type', 'single'),
+            'edit_url': url_for('edit_question', question_id=question['id']),
+            'delete_url': url_for('delete_question', question_id=question['id'])
+        } for question in questions],
+        'total': total,
+        'offset': options['offset'],
+        'next_offset': next_offset if next_offset < total else None
+    })
+
+SEARCH_PAGE_SIZE = 20
+
+@app.route('/search')
+@login_required
+def search_questions():
+    """Ranked full-text search over questions, options and explanations"""
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    
+    results, total = question_bank.search(query, (page - 1) * SEARCH_PAGE_SIZE, SEARCH_PAGE_SIZE)
+    matches = []
+    for question, score in results:
+        question = dict(question)
+        question['question_html'] = convert_markdown(question['question'], question['id'])
+        question['explanation_html'] = convert_markdown(question.get('explanation', ''), question['id'])
+        question['answers'] = question.get('correct_answers') or [question.get('correct_answer', '')]
+        matches.append(question)
+    
+    return render_template('search.html',
+                           query=query,
+                           results=matches,
+                           total=total,
+                           page=page,
+                           pages=max(1, -(-total // SEARCH_PAGE_SIZE)))
+
+@app.route('/api/questions/search')
+@login_required
+def search_api():
+    """JSON search results: ?q=terms&offset=0&limit=20, best match first"""
+    query = request.args.get('q', '').strip()
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), 1), 100)
+    
+    results, total = question_bank.search(query, offset, limit)
+    next_offset = offset + len(results)
+    return jsonify({
+        'query': query,
+        'results': [{
+            'id': question['id'],
+            'question': truncate_text(question['question'], 160),
+            'question_type': question.get('question_type', 'single'),
+            'score': round(score, 4)
+        } for question, score in results],
+        'total': total,
+        'offset': offset,
+        'next_offset': next_offset if next_offset < total else None
+    })
+
+@app.route('/import_questions', methods=['POST'])
+@login_required
+def import_questions_upload():
+    """Bulk-add questions from an uploaded JSON-lines or CSV file"""
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        flash('Please choose a file to import.')
+        return redirect(url_for('manage_questions'))
+    
+    # The upload is read line by line from werkzeug's spooled temp file
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    imported, errors, duplicates = import_questions(
+        stream, question_file_format(upload.filename, request.form.get('format')), bool(request.form.get('strict')))
+    
+    if errors:
+        details = '; '.join(f'line {line}: {error}' for line, error in errors[:5])
+        more = f' (and {len(errors) - 5} more)' if len(errors) > 5 else ''
+        flash(f'{len(errors)} record(s) rejected: {details}{more}')
+    flash(f'Imported {imported} question(s).')
+    if duplicates:
+        details = '; '.join(f"line {line} (#{question_id}) looks like #{similar[0][0]['id']} ({similar[0][1]:.0%})"
+                            for line, question_id, similar in duplicates[:5])
+        more = f' (and {len(duplicates) - 5} more)' if len(duplicates) > 5 else ''
+        flash(f'{len(duplicates)} imported question(s) look like existing ones: {details}{more}. '
+              'Review them on the duplicates page.')
+    return redirect(url_for('manage_questions'))
+
+@app.route('/export_questions')
+@login_required
+def export_questions_download():
+    """Stream the question bank as questions.jsonl or questions.csv (?format=csv)"""
+    file_format = question_file_format('', request.args.get('format', 'jsonl'))
+    return app.response_class(
+        export_questions(file_format),
+        mimetype='text/csv' if file_format == 'csv' else 'application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename=questions.{file_format}'}
+    )
+
+@app.route('/duplicates')
+@login_required
+def duplicate_questions():
+    """Near-duplicate clusters across the whole question bank (?threshold=0.6)"""
+    threshold = request.args.get('threshold', app.config['DUPLICATE_THRESHOLD'], type=float)
+    threshold = min(max(threshold, 0.1), 1.0)
+    clusters = question_bank.duplicate_clusters(threshold)
+    for cluster in clusters:
+        cluster['similarity'] = max(similarity for _, _, similarity in cluster['pairs'])
+    return render_template('duplicates.html', clusters=clusters, threshold=threshold)
+
+ITEM_ANALYSIS_SORTS = {
+    'flags': lambda question: (not question['flags'] or question['flags'] == ['few responses'], question['id']),
+    'p_value': lambda question: (question['p_value'] is None, question['p_value'] or 0.0),
+    'discrimination': lambda question: (question['discrimination'] is None, question['discrimination'] or 0.0),
+    'responses': lambda question: -question['responses'],
+    'id': lambda question: question['id']
+}
+
+@app.route('/item_analysis')
+@login_required
+def item_analysis_report():
+    """Instructor view of question difficulty, discrimination and student percentiles"""
+    if item_analysis is None:
+        flash('Item analysis needs NumPy (pip install numpy).')
+        return redirect(url_for('manage_questions'))
+    
+    report = item_analysis.report()
+    sort = request.args.get('sort') if request.args.get('sort') in ITEM_ANALYSIS_SORTS else 'flags'
+    return render_template('item_analysis.html',
+                           report=report,
+                           questions=sorted(report['questions'], key=ITEM_ANALYSIS_SORTS[sort]),
+                           sort=sort)
 
 @app.route('/edit_question/<int:question_id>', methods=['GET', 'POST'])
 @login_required
 def edit_question(question_id):
-    questions = load_questions()
-    question = next((q for q in questions if q['id'] == question_id), None)
+    question = question_bank.get(question_id)
     
     if question is None:
         flash('Question not found!')
         return redirect(url_for('manage_questions'))
     
+    question = dict(question)
+    
     if request.method == 'POST':
         # Get form data
         question_text = request.form.get('question')
@@ -731,6 +4210,15 @@ def edit_question(question_id):
             flash('Please select at least one correct answer.')
             return render_template('edit_question.html', question=question)
         
+        previous_type, previous_mask = answer_key(question)
+        
+        # Stored answers are bitmasks over option positions: move them to where their option text
+        # sits now before the edit goes live, so removing or reordering options can't change them
+        remap = option_remap(question.get('options', []), options)
+        if remap is not None:
+            progress_store.remap_selected(question_id, remap)
+            previous_mask = remap(previous_mask)
+        
         # Update question data with backward compatibility
         question['question'] = question_text
         question['options'] = options
@@ -738,9 +4226,19 @@ def edit_question(question_id):
         question['correct_answers'] = correct_answers
         question['correct_answer'] = correct_answers[0] if correct_answers else ""
         question['explanation'] = explanation
+        tags = [tag.strip() for tag in request.form.get('tags', '').split(',') if tag.strip()]
+        if tags:
+            question['tags'] = tags
+        else:
+            question.pop('tags', None)
         
-        save_questions(questions)
+        # Only the edited question is handed over; the backend merges it into the stored bank
+        save_questions([question], changed_ids=[question_id])
+        markdown_cache.invalidate(question_id)
         flash('Question updated successfully!')
+        if answer_key(question) != (previous_type, previous_mask):
+            answer_regrader.submit([question_id])
+            flash('The answer key changed, so earlier answers to this question are being regraded in the background.')
         return redirect(url_for('manage_questions'))
     
     return render_template('edit_question.html', question=question)
@@ -748,9 +4246,9 @@ def edit_question(question_id):
 @app.route('/delete_question/<int:question_id>', methods=['POST'])
 @login_required
 def delete_question(question_id):
-    questions = load_questions()
-    questions = [q for q in questions if q['id'] != question_id]
-    save_questions(questions)
+    # A changed id missing from the documents is deleted from the stored bank
+    save_questions([], changed_ids=[question_id])
+    markdown_cache.invalidate(question_id)
     flash('Question deleted successfully!')
     return redirect(url_for('manage_questions'))
 
@@ -760,28 +4258,23 @@ def delete_question(question_id):
 @login_required
 def flashcards():
     """Display all flashcards with management options"""
-    flashcards = load_flashcards()
     categories = get_flashcard_categories()
     username = session.get('username')
     
     # Get filter parameters
     category_filter = request.args.get('category', '')
     search_query = request.args.get('search', '')
+    tag_filter = request.args.get('tag', '')
     
-    # Filter flashcards
-    filtered_cards = flashcards
-    if category_filter:
-        filtered_cards = [card for card in filtered_cards if card.get('category') == category_filter]
-    if search_query:
-        filtered_cards = [card for card in filtered_cards 
-                         if search_query.lower() in card.get('front', '').lower() or 
-                            search_query.lower() in card.get('back', '').lower()]
-    
-    # Generate stats for the template
-    stats = get_flashcard_stats(username)
+    # Filter flashcards through the deck's category/tag/text indexes
+    filtered_cards = [dict(card) for card in flashcard_deck.search(search_query, category_filter, tag_filter)]
     
     # Add progress info to each flashcard
     user_progress = load_flashcard_progress(username)
+    
+    # Generate stats for the template
+    stats = get_flashcard_stats(username, user_progress)
+    
     card_stats = user_progress.get('card_stats', {})
     for card in filtered_cards:
         card_id = str(card['id'])
@@ -808,12 +4301,9 @@ def add_flashcard():
             flash('Both front and back content are required!', 'error')
             return render_template('add_flashcard.html')
         
-        # Load existing flashcards
-        flashcards = load_flashcards()
-        
         # Create new flashcard
         new_card = {
-            'id': generate_flashcard_id(),
+            'id': None,  # assigned by storage when the card is saved
             'front': front,
             'back': back,
             'category': category,
@@ -824,8 +4314,7 @@ def add_flashcard():
             'last_studied': None
         }
         
-        flashcards.append(new_card)
-        save_flashcards(flashcards)
+        add_flashcards([new_card])
         
         flash('Flashcard added successfully!', 'success')
         return redirect(url_for('flashcards'))
@@ -836,20 +4325,21 @@ def add_flashcard():
 @login_required
 def edit_flashcard(card_id):
     """Edit an existing flashcard"""
-    flashcards = load_flashcards()
-    card = next((card for card in flashcards if card['id'] == card_id), None)
+    card = flashcard_deck.get(card_id)
     
     if not card:
         flash('Flashcard not found!', 'error')
         return redirect(url_for('flashcards'))
     
+    card = dict(card)
+    
     if request.method == 'POST':
         card['front'] = request.form.get('front')
         card['back'] = request.form.get('back')
         card['category'] = request.form.get('category', 'General')
         card['tags'] = [tag.strip() for tag in request.form.get('tags', '').split(',') if tag.strip()]
         
-        save_flashcards(flashcards)
+        save_flashcards([card], changed_ids=[card_id])
         flash('Flashcard updated successfully!', 'success')
         return redirect(url_for('flashcards'))
     
@@ -859,9 +4349,7 @@ def edit_flashcard(card_id):
 @login_required
 def delete_flashcard(card_id):
     """Delete a flashcard"""
-    flashcards = load_flashcards()
-    flashcards = [card for card in flashcards if card['id'] != card_id]
-    save_flashcards(flashcards)
+    save_flashcards([], changed_ids=[card_id])
     
     flash('Flashcard deleted successfully!', 'success')
     return redirect(url_for('flashcards'))
@@ -869,8 +4357,9 @@ def delete_flashcard(card_id):
 @app.route('/flashcards/study/card', methods=['GET', 'POST'])
 @login_required
 def study_card():
-    """Study flashcards with spaced repetition"""
+    """Study flashcards with spaced repetition (?due_only=true reviews only cards that are due)"""
     username = session['username']
+    due_only = request.args.get('due_only') == 'true'
     
     # Handle POST requests (rating cards, skipping)
     if request.method == 'POST':
@@ -880,42 +4369,57 @@ def study_card():
         if action == 'rate' and card_id:
             difficulty = request.form.get('difficulty')
             update_flashcard_progress(username, int(card_id), difficulty)
+        elif action == 'skip' and card_id and due_only:
+            # Due cards stay due, so remember skips for the rest of this review session
+            session['skipped_due_cards'] = session.get('skipped_due_cards', []) + [int(card_id)]
         
         # Redirect to show next card
-        return redirect(url_for('study_card'))
+        return redirect(url_for('study_card', due_only='true' if due_only else None))
     
     # Handle restart parameter
     if request.args.get('restart'):
         clear_study_session(username)
+        session.pop('skipped_due_cards', None)
     
     # Get next card to study
-    current_card = get_next_flashcard(username)
+    progress_data = load_flashcard_progress(username)
+    cards_studied = len(progress_data.get('studied_today', []))
+    
+    if due_only:
+        today = datetime.now().strftime('%Y-%m-%d')
+        skipped = set(session.get('skipped_due_cards', []))
+        due_ids = [card_id for card_id in flashcard_scheduler.due_cards(username, progress_data.get('card_stats', {}), today)
+                   if card_id not in skipped]
+        current_card = flashcard_deck.get(due_ids[0]) if due_ids else None
+        total_cards = cards_studied + len(due_ids)
+    else:
+        current_card = get_next_flashcard(username, progress_data)
+        total_cards = len(flashcard_deck)
     
     if current_card:
         # Calculate progress
-        total_cards = len(load_flashcards())
-        progress_data = load_flashcard_progress(username)
-        cards_studied = len(progress_data.get('studied_today', []))
         progress = (cards_studied / total_cards * 100) if total_cards > 0 else 0
         
         return render_template('study_flashcards.html',
                              current_card=current_card,
                              progress=progress,
                              cards_studied=cards_studied,
-                             total_cards=total_cards)
+                             total_cards=total_cards,
+                             due_only=due_only)
     else:
         # No more cards to study
         return render_template('study_flashcards.html',
                              current_card=None,
                              progress=100,
                              cards_studied=0,
-                             total_cards=0)
+                             total_cards=0,
+                             due_only=due_only)
 
 @app.route('/flashcards/study')
 @login_required
 def study_flashcards():
     """Start a flashcard study session - redirects to study card"""
-    return redirect(url_for('study_card'))
+    return redirect(url_for('study_card', due_only=request.args.get('due_only')))
 
 @app.route('/flashcards/study/start')
 @login_required
@@ -923,6 +4427,7 @@ def start_study_session():
     """Start a new study session and clear previous session"""
     username = session.get('username')
     clear_study_session(username)
+    session.pop('skipped_due_cards', None)
     return redirect(url_for('study_card'))
 
 # ======================= UTILITY ROUTES =======================
@@ -932,6 +4437,11 @@ def static_files(filename):
     """Serve static files directly"""
     return send_from_directory('static', filename)
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Request, storage, Markdown and template metrics for Prometheus (this worker process)"""
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 @app.route('/markdown_preview', methods=['POST'])
 @login_required
 def markdown_preview():
@@ -940,5 +4450,60 @@ def markdown_preview():
     html = convert_markdown(text)
     return html
 
+@app.cli.command('import-json')
+@click.option('--database', default=None, help='SQLite file to create (defaults to SQLITE_PATH)')
+def import_json_command(database):
+    """Import the JSON data files into a SQLite database"""
+    path = database or app.config['SQLITE_PATH']
+    import_json_to_sqlite(path)
+    click.echo(f'Imported JSON data into {path}. Set STORAGE_BACKEND=sqlite to use it.')
+
+@app.cli.command('import-questions')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['jsonl', 'csv']), default=None,
+              help='File format (defaults to the file extension)')
+@click.option('--strict', is_flag=True, help='Import nothing if any record is invalid')
+def import_questions_command(path, file_format, strict):
+    """Bulk-add questions from a JSON-lines or CSV file"""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        imported, errors, duplicates = import_questions(f, question_file_format(path, file_format), strict)
+    for line, error in errors:
+        click.echo(f'line {line}: {error}', err=True)
+    for line, question_id, similar in duplicates:
+        matches = ', '.join(f"#{question['id']} ({similarity:.0%})" for question, similarity in similar[:3])
+        click.echo(f'line {line}: imported as #{question_id}, looks like {matches}', err=True)
+    click.echo(f'Imported {imported} question(s), rejected {len(errors)}, {len(duplicates)} near-duplicate(s).')
+
+@app.cli.command('export-questions')
+@click.argument('path', type=click.Path(dir_okay=False, allow_dash=True))
+@click.option('--format', 'file_format', type=click.Choice(['jsonl', 'csv']), default=None,
+              help='File format (defaults to the file extension)')
+def export_questions_command(path, file_format):
+    """Write the question bank to a JSON-lines or CSV file ('-' for stdout)"""
+    with click.open_file(path, 'w', encoding='utf-8') as f:
+        for chunk in export_questions(question_file_format(path, file_format)):
+            f.write(chunk)
+
+@app.cli.command('find-duplicates')
+@click.option('--threshold', type=float, default=None, help='Jaccard similarity that counts as a duplicate (default DUPLICATE_THRESHOLD)')
+def find_duplicates_command(threshold):
+    """List near-duplicate question clusters"""
+    clusters = question_bank.duplicate_clusters(threshold)
+    for cluster in clusters:
+        best = max(similarity for _, _, similarity in cluster['pairs'])
+        click.echo(f"{', '.join(str(question['id']) for question in cluster['questions'])} (up to {best:.0%} similar)")
+        for question in cluster['questions']:
+            click.echo(f"    #{question['id']}: {truncate_text(question['question'])}")
+    click.echo(f'{len(clusters)} cluster(s), {sum(len(cluster["questions"]) - 1 for cluster in clusters)} removable question(s).')
+
+@app.cli.command('regrade')
+@click.option('--question-id', 'question_ids', type=int, multiple=True, help='Question to regrade (repeatable; default all)')
+def regrade_command(question_ids):
+    """Re-score stored answers against the current answer keys"""
+    counts = answer_regrader.run(question_ids or question_bank.ids())
+    click.echo(f"Regraded {counts['answers'] - counts['skipped']} answer(s) in {counts['seconds']:.2f}s: "
+               f"{counts['changed']} changed, {counts['skipped']} skipped (recorded without selections).")
+
 if __name__ == "__main__":
+    # Development server; production runs gunicorn -c gunicorn.conf.py (see wsgi.py)
     app.run(host="0.0.0.0", port=5019, debug=False)  # Set debug=False for production
\ No newline at end of file
@@ -0,0 +1,31 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='session')
+def main(tmp_path_factory):
+    # main.py reads and writes its data files in the working directory, so give it an empty one
+    previous = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('data'))
+    sys.path.insert(0, ROOT)
+    try:
+        yield importlib.import_module('main')
+    finally:
+        sys.path.remove(ROOT)
+        os.chdir(previous)
+
+
+@pytest.fixture
+def login(main):
+    """Return a test client logged in as a (new) user with this name"""
+    def login(username):
+        main.storage.save_users(dict(main.load_users(), **{username: 'secret'}))
+        client = main.app.test_client()
+        client.post('/login', data={'username': username, 'password': 'secret'})
+        return client
+    return login
@@ -0,0 +1,84 @@
+"""MinHash/LSH near-duplicate index"""
+
+import pytest
+
+TEXTS = {
+    1: 'Which AWS service delivers messages to many subscribers through topics and fan out?',
+    2: 'Which AWS service delivers messages to many subscribers using topics and fan-out?',
+    3: 'Which AWS service delivers messages to many subscriber endpoints through topics and fan out?',
+    4: 'What is the maximum size of a single object stored in an S3 bucket?',
+    5: 'How long does SQS keep a message by default before deleting it?',
+}
+
+
+def question(question_id, text):
+    return {'id': question_id, 'question': text, 'options': ['SNS', 'SQS', 'Kinesis']}
+
+
+def content_hashes(questions):
+    return {question_id: q['question'] for question_id, q in questions.items()}
+
+
+@pytest.fixture
+def questions():
+    return {question_id: question(question_id, text) for question_id, text in TEXTS.items()}
+
+
+@pytest.fixture
+def index(main, questions):
+    index = main.QuestionDuplicateIndex(threshold=0.6)
+    index.sync(content_hashes(questions), questions.__getitem__)
+    return index
+
+
+def test_similar_questions_are_found(index):
+    matches = index.similar(question(None, TEXTS[1].upper() + '  '))
+    assert matches[0] == (1, 1.0) and {question_id for question_id, _ in matches} == {1, 2, 3}
+    assert all(similarity >= 0.6 for _, similarity in matches)
+    assert {question_id for question_id, _ in index.similar(question(1, TEXTS[1]), exclude_id=1)} == {2, 3}
+    assert index.similar(question(None, 'Completely different wording about IAM policy documents')) == []
+
+
+def test_option_order_does_not_matter(index):
+    shuffled = dict(question(None, TEXTS[4]), options=['Kinesis', 'SNS', 'SQS'])
+    assert index.similar(shuffled)[0] == (4, 1.0)
+
+
+def test_clusters_group_the_bank(index):
+    clusters = index.clusters()
+    assert [cluster['ids'] for cluster in clusters] == [[1, 2, 3]]
+    assert all(similarity >= 0.6 for _, _, similarity in clusters[0]['pairs'])
+    assert index.clusters(threshold=1.01) == []
+
+
+def test_sync_reindexes_only_changed_questions(index, questions):
+    loads = []
+    questions[2] = question(2, TEXTS[5])
+    del questions[3]
+
+    def load(question_id):
+        loads.append(question_id)
+        return questions[question_id]
+    index.sync(content_hashes(questions), load)
+    assert loads == [2]
+    assert index.similar(question(None, TEXTS[1])) == [(1, 1.0)]
+    assert [cluster['ids'] for cluster in index.clusters()] == [[2, 5]]
+
+
+def test_signature_fills_every_bin(main):
+    index = main.QuestionDuplicateIndex()
+    signature = index.signature(index.shingles(TEXTS[4]))
+    assert len(signature) == index.BINS and None not in signature
+    assert index.signature(frozenset()) == [None] * index.BINS
+
+
+def test_duplicates_page_lists_clusters(main, login):
+    text = 'Which queue type guarantees exactly-once processing and strict ordering of messages?'
+    main.add_questions([{'id': None, 'question': question_text, 'options': ['FIFO', 'Standard'], 'question_type': 'single',
+                         'correct_answers': ['FIFO'], 'correct_answer': 'FIFO', 'explanation': ''}
+                        for question_text in (text, text.replace('exactly-once', 'exactly once'))])
+    first, second = sorted(main.question_bank.ids())[-2:]
+    assert [question['id'] for question, _ in main.question_bank.near_duplicates(main.question_bank.get(first))] == [second]
+    assert any({first, second} <= {question['id'] for question in cluster['questions']}
+               for cluster in main.question_bank.duplicate_clusters())
+    assert login('deduper').get('/duplicates').status_code == 200
@@ -0,0 +1,71 @@
+"""Timed practice exams: answers are stored ungraded and graded once on submit"""
+
+import pytest
+
+
+@pytest.fixture
+def exam_client(main, login, monkeypatch):
+    monkeypatch.setitem(main.app.config, 'EXAM_QUESTIONS', 3)
+    if len(main.question_bank) < 3:
+        main.add_questions([{'id': None, 'question': f'Exam filler question {n}?', 'options': ['Yes', 'No'],
+                             'question_type': 'single', 'correct_answers': ['Yes'], 'correct_answer': 'Yes',
+                             'explanation': ''} for n in range(3)])
+
+    def start(username):
+        client = login(username)
+        assert client.post('/exam/start').status_code == 302
+        with client.session_transaction() as session:
+            exam_id = session['exam_id']
+        return client, exam_id, main.quiz_sessions.get(exam_id)
+    return start
+
+
+def test_exam_is_graded_on_submit(main, exam_client):
+    client, exam_id, state = exam_client('examinee')
+    first, second, third = state['order']
+    right = main.correct_answers_for(main.question_bank.get(first))
+
+    client.post('/exam/1', data={'answer': right, 'go': '2'})
+    client.post('/exam/2', data={'answer': ['not an option'], 'flagged': '1', 'go': '3'})
+    stored = main.quiz_sessions.get(exam_id)
+    assert stored['answers'] == {str(first): right, str(second): ['not an option']}
+    assert stored['flagged'] == [str(second)]
+    assert str(first) not in main.progress_store.get_user('examinee')  # nothing graded yet
+
+    response = client.post('/exam/3', data={'go': 'submit'})
+    assert '/exam/result/' in response.headers['Location']
+    attempt = main.storage.load_exam_attempts('examinee')[-1]
+    assert (attempt['total'], attempt['answered'], attempt['correct']) == (3, 2, 1)
+    assert [item['id'] for item in attempt['questions']] == [first, second, third]
+
+    progress = main.progress_store.get_user('examinee')
+    assert progress[str(first)]['correct'] is True and progress[str(second)]['correct'] is False
+    assert str(third) not in progress  # unanswered questions stay unanswered for practice
+    assert main.quiz_sessions.get(exam_id) is None
+    assert client.get(response.headers['Location']).status_code == 200
+
+
+def test_expired_exam_is_submitted_automatically(main, exam_client):
+    client, exam_id, state = exam_client('late_examinee')
+    state['deadline'] -= main.app.config['EXAM_MINUTES'] * 60 + main.EXAM_GRACE_SECONDS + 1
+    main.quiz_sessions.save(exam_id, state)
+    response = client.post('/exam/1', data={'answer': ['too late'], 'go': '2'})
+    assert '/exam/result/' in response.headers['Location']
+    attempt = main.storage.load_exam_attempts('late_examinee')[-1]
+    assert attempt['timed_out'] and attempt['answered'] == 0
+
+
+def test_exam_is_not_shared_between_users(main, exam_client):
+    client, exam_id, _ = exam_client('first_user')
+    client.post('/login', data={'username': 'admin', 'password': 'password'})
+    assert client.get('/exam/1').status_code == 302
+    with client.session_transaction() as session:
+        assert 'exam_id' not in session
+    assert main.quiz_sessions.get(exam_id) is not None
+
+
+def test_logout_clears_only_existing_exam_state(main, login, monkeypatch):
+    deleted = []
+    monkeypatch.setattr(main.quiz_sessions, 'delete', deleted.append)
+    login('no_exam').get('/logout')
+    assert deleted == []
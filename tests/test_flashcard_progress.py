@@ -0,0 +1,44 @@
+"""Per-user flashcard progress: compact storage and concurrent ratings"""
+
+import os
+
+
+def test_pack_round_trip(main):
+    stats = {'times_studied': 3, 'difficulty_ratings': ['hard', 'easy', 'medium'], 'last_studied': '2024-01-01',
+             'ease_factor': 2.36, 'repetitions': 1, 'interval': 1, 'due_date': '2024-01-02'}
+    packed = main.pack_card_stats(stats)
+    assert 'difficulty_ratings' not in packed and packed['r']
+    assert main.unpack_card_stats(packed) == stats
+    ratings = main.unpack_card_stats(main.pack_card_stats(dict(stats, difficulty_ratings=['easy'] * 25)))
+    assert ratings['difficulty_ratings'] == ['easy'] * main.RATINGS_KEPT
+
+
+def test_studied_today_resets_on_a_new_day(main):
+    assert main.unpack_studied_today(main.pack_studied_today({3, 1})) == {1, 3}
+    assert main.unpack_studied_today({'date': '2000-01-01', 'cards': [1, 3]}) == set()
+    assert main.unpack_studied_today([1, 3]) == set()
+
+
+def test_concurrent_ratings_are_not_lost(main):
+    cards = [{'id': None, 'front': f'race {n}', 'back': 'back', 'category': 'General', 'tags': []} for n in range(2)]
+    main.add_flashcards(cards)
+    processes, ratings = 4, 50
+    children = []
+    for worker in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                for rating in range(ratings):
+                    main.update_flashcard_progress('racer', cards[(worker + rating) % 2]['id'], 'medium')
+                status = 0
+            finally:
+                os._exit(status)
+        children.append(pid)
+    assert all(os.waitpid(pid, 0)[1] == 0 for pid in children)
+
+    progress = main.load_flashcard_progress('racer')
+    studied = sum(progress['card_stats'][str(card['id'])]['times_studied'] for card in cards)
+    assert studied == processes * ratings
+    assert progress['studied_today'] == {card['id'] for card in cards}
+    assert progress['revision'] == processes * ratings
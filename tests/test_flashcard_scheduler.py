@@ -0,0 +1,68 @@
+"""Per-user flashcard priority heaps and due-date indexes"""
+
+import pytest
+
+
+class Deck:
+    version = 1
+
+    def __init__(self, *card_ids):
+        self.cards = {card_id: {'id': card_id, 'front': f'card {card_id}'} for card_id in card_ids}
+
+    def all(self):
+        return list(self.cards.values())
+
+    def get(self, card_id):
+        return self.cards.get(card_id)
+
+
+@pytest.fixture
+def scheduler(main):
+    return main.FlashcardScheduler(Deck(1, 2, 3), max_users=2)
+
+
+def studied(times, *ratings, due_date=None):
+    return {'times_studied': times, 'difficulty_ratings': list(ratings), 'due_date': due_date}
+
+
+def test_unstudied_and_hard_cards_come_first(scheduler):
+    card_stats = {'1': studied(7, 'easy'), '2': studied(7, 'hard'), '3': studied(7, 'easy')}
+    assert all(scheduler.next_card('alice', card_stats)['id'] == 2 for _ in range(20))
+    card_stats['3'] = {}
+    scheduler.forget('alice')
+    assert scheduler.next_card('alice', card_stats)['id'] == 3
+
+
+def test_rating_requeues_the_card(scheduler):
+    card_stats = {'1': studied(6), '2': {}, '3': studied(6)}
+    assert scheduler.next_card('alice', card_stats)['id'] == 2
+    card_stats['2'] = studied(9, 'easy')
+    scheduler.record_rating('alice', 2, card_stats['2'])
+    assert scheduler.next_card('alice', card_stats)['id'] in (1, 3)
+
+
+def test_ratings_from_another_worker_are_picked_up(scheduler):
+    card_stats = {'1': studied(6), '2': {}, '3': studied(6)}
+    assert scheduler.next_card('alice', card_stats)['id'] == 2
+    # Rated elsewhere: no record_rating here, only the stats passed in have changed
+    card_stats['2'] = studied(9, 'easy')
+    assert scheduler.next_card('alice', card_stats)['id'] in (1, 3)
+
+
+def test_due_cards_in_date_order(scheduler):
+    card_stats = {'1': studied(1, due_date='2024-03-01'), '2': studied(1, due_date='2024-01-01'),
+                  '3': studied(1, due_date='2030-01-01')}
+    assert scheduler.due_cards('alice', card_stats, '2024-06-01') == [2, 1]
+    card_stats['2'] = studied(2, due_date='2029-01-01')
+    scheduler.record_rating('alice', 2, card_stats['2'])
+    assert scheduler.due_cards('alice', card_stats, '2024-06-01') == [1]
+
+
+def test_only_recent_users_are_kept(scheduler):
+    for username in ('alice', 'bob', 'carol'):
+        scheduler.next_card(username, {})
+        scheduler.due_cards(username, {}, '2024-01-01')
+    assert list(scheduler._queues) == ['bob', 'carol']
+    assert list(scheduler._due) == ['bob', 'carol']
+    scheduler.forget('carol')
+    assert list(scheduler._queues) == ['bob'] and list(scheduler._due) == ['bob']
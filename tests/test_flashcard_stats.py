@@ -0,0 +1,74 @@
+"""Per-user flashcard statistics adjusted on each rating"""
+
+import pytest
+
+
+class Deck:
+    version = 1
+
+    def __init__(self):
+        self.cards = {1: {'id': 1, 'category': 'EC2'}, 2: {'id': 2, 'category': 'EC2'}, 3: {'id': 3, 'category': 'S3'}}
+
+    def get(self, card_id):
+        return self.cards.get(card_id)
+
+    def category_counts(self):
+        counts = {}
+        for card in self.cards.values():
+            counts[card['category']] = counts.get(card['category'], 0) + 1
+        return counts
+
+
+def studied(*ratings):
+    return {'times_studied': len(ratings), 'difficulty_ratings': list(ratings)}
+
+
+@pytest.fixture
+def deck():
+    return Deck()
+
+
+@pytest.fixture
+def stats(main, deck):
+    return main.FlashcardStats(deck)
+
+
+def test_buckets_by_average_rating(main):
+    assert main.FlashcardStats.bucket([]) == 'learning'
+    assert main.FlashcardStats.bucket(['easy', 'medium', 'easy']) == 'mastered'
+    assert main.FlashcardStats.bucket(['hard', 'medium']) == 'learning'
+    assert main.FlashcardStats.bucket(['hard', 'hard', 'medium']) == 'difficult'
+
+
+def test_summary_of_studied_cards(stats):
+    summary = stats.summary('alice', {'1': studied('easy'), '3': studied('hard', 'hard'), '9': studied('easy')}, 4)
+    assert (summary['mastered_cards'], summary['learning_cards'], summary['difficult_cards']) == (1, 0, 1)
+    assert summary['accuracy_rate'] == pytest.approx(100 / 3)
+    assert summary['categories'] == {'EC2': {'total': 2, 'studied': 1, 'mastered': 1},
+                                     'S3': {'total': 1, 'studied': 1, 'mastered': 0}}
+
+
+def test_ratings_adjust_the_totals_in_place(stats):
+    card_stats = {'1': studied('hard')}
+    stats.summary('alice', card_stats, 1)
+
+    stats._build = None  # A rebuild from here on would fail the test
+    new_stats = studied('hard', 'easy', 'easy', 'easy')
+    stats.record_rating('alice', 1, card_stats['1'], new_stats, 1, 2)
+    stats.record_rating('alice', 2, {}, studied('medium'), 2, 3)
+    summary = stats.summary('alice', {'1': new_stats, '2': studied('medium')}, 3)
+    del stats._build
+    assert summary['categories']['EC2'] == {'total': 2, 'studied': 2, 'mastered': 1}
+    assert (summary['mastered_cards'], summary['learning_cards'], summary['difficult_cards']) == (1, 1, 0)
+
+
+def test_totals_are_rebuilt_after_outside_changes(stats, deck):
+    stats.summary('alice', {'1': studied('hard')}, 1)
+    # Revision 2 was written by another worker; this worker's rating is revision 3
+    stats.record_rating('alice', 1, studied('hard', 'easy'), studied('hard', 'easy', 'easy', 'easy'), 2, 3)
+    summary = stats.summary('alice', {'1': studied('hard', 'easy', 'easy', 'easy'), '3': studied('easy')}, 3)
+    assert summary['mastered_cards'] == 2
+
+    deck.version = 2
+    del deck.cards[3]
+    assert stats.summary('alice', {'1': studied('hard', 'easy', 'easy', 'easy'), '3': studied('easy')}, 3)['mastered_cards'] == 1
@@ -0,0 +1,77 @@
+"""Streaming bulk import and export of questions"""
+
+import io
+import json
+
+import pytest
+
+
+def record(text, **fields):
+    return dict({'question': text, 'options': ['Yes', 'No', 'Maybe'], 'correct_answers': ['Yes']}, **fields)
+
+
+def jsonl(*records):
+    return io.StringIO(''.join((line if isinstance(line, str) else json.dumps(line)) + '\n' for line in records))
+
+
+@pytest.fixture
+def config(main):
+    saved = dict(main.app.config)
+    yield main.app.config
+    main.app.config.update(saved)
+
+
+def test_import_reports_invalid_records_by_line(main):
+    before = len(main.question_bank)
+    imported, errors, _ = main.import_questions(jsonl(
+        record('Import line one about queues?'), '{not json', record('Import missing key?', correct_answers=['Nope']),
+        record('Import line four about topics?', tags='sns, messaging')))
+    assert imported == 2
+    assert [line for line, _ in errors] == [2, 3]
+    assert len(main.question_bank) == before + 2
+    added = main.question_bank.get(max(main.question_bank.ids()))
+    assert added['question'] == 'Import line four about topics?' and added['tags'] == ['sns', 'messaging']
+
+
+def test_strict_import_writes_nothing_when_a_record_is_invalid(main):
+    before = main.question_bank.ids()
+    imported, errors, _ = main.import_questions(jsonl(record('Strict import valid?'), record('')), strict=True)
+    assert imported == 0 and [line for line, _ in errors] == [2]
+    assert main.question_bank.ids() == before
+
+
+def test_import_commits_in_batches(main, config, monkeypatch):
+    config['IMPORT_BATCH_SIZE'] = 2
+    writes = []
+    add_questions = main.add_questions
+    monkeypatch.setattr(main, 'add_questions', lambda questions: (writes.append(len(questions)), add_questions(questions)))
+    imported, _, _ = main.import_questions(jsonl(*[record(f'Batch import number {n} of five?') for n in range(5)]))
+    assert imported == 5 and writes == [2, 2, 1]
+
+
+def test_json_backend_import_limit(main, config):
+    if config['STORAGE_BACKEND'] != 'json':
+        pytest.skip('the import limit only applies to the JSON backend')
+    config['JSON_IMPORT_LIMIT'] = 2
+    imported, errors, _ = main.import_questions(jsonl(*[record(f'Limited import {n} question?') for n in range(4)]))
+    assert imported == 2 and [line for line, _ in errors] == [3, 4]
+
+
+def test_import_flags_near_duplicates(main):
+    text = 'Which service delivers messages to many subscribers through topics and fan out?'
+    main.import_questions(jsonl(record(text)))
+    original = max(main.question_bank.ids())
+    imported, _, duplicates = main.import_questions(jsonl(record(text + ' '), record('Something unrelated entirely?')))
+    assert imported == 2
+    assert [(line, [question['id'] for question, _ in similar]) for line, _, similar in duplicates] == [(1, [original])]
+
+
+def test_csv_export_round_trips(main):
+    main.import_questions(jsonl(record('CSV round trip, with "quotes"?', options=['A, b', 'C'], correct_answers=['A, b'],
+                                       explanation='line one\nline two', tags=['csv'])))
+    question = dict(main.question_bank.get(max(main.question_bank.ids())))
+    exported = ''.join(main.export_questions('csv'))
+    rows = [record for _, record, _ in main.iter_question_records(io.StringIO(exported), 'csv')]
+    parsed, error = main.question_from_record(next(row for row in rows if row['id'] == str(question['id'])))
+    assert error is None
+    assert dict(parsed, id=question['id']) == question
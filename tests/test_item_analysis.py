@@ -0,0 +1,112 @@
+"""Vectorized item analysis over the users x questions score matrix"""
+
+import math
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+
+class Bank:
+    def __init__(self, *question_ids):
+        self.questions = {question_id: {'id': question_id, 'question': f'Question {question_id}?',
+                                        'options': ['A', 'B'], 'correct_answers': ['A']}
+                          for question_id in question_ids}
+
+    def ids(self):
+        return list(self.questions)
+
+    def all(self):
+        return list(self.questions.values())
+
+    def get(self, question_id):
+        return self.questions.get(question_id)
+
+    def content_hashes(self):
+        return {question_id: question['question'] for question_id, question in self.questions.items()}
+
+
+class CountingProgress:
+    """ProgressStore wrapper that records whose rows are read"""
+
+    def __init__(self, store):
+        self.store = store
+        self.reads = []
+
+    def get_summaries(self):
+        return self.store.get_summaries()
+
+    def get_user(self, username):
+        self.reads.append(username)
+        return self.store.get_user(username)
+
+
+@pytest.fixture
+def progress(main, tmp_path):
+    return CountingProgress(main.ProgressStore(str(tmp_path / 'progress.json'), str(tmp_path / 'progress.log')))
+
+
+def answer(progress, username, question_id, score, selected=None):
+    progress.store.record(username, question_id, score == 1.0, score, '2024-01-01T10:00:00', selected)
+
+
+def test_compute_statistics(main):
+    missing = main.ItemAnalysis.MISSING
+    matrix = np.array([[200, 200, 200],        # strongest user
+                       [200, 0, missing],
+                       [0, 0, missing],
+                       [0, 200, missing]], dtype=np.uint8)
+    stats = main.ItemAnalysis(None, None, group_fraction=0.25).compute(matrix)
+    assert stats['question_counts'].tolist() == [4, 4, 1]
+    assert stats['p_values'].tolist() == [0.5, 0.5, 1.0]
+    assert stats['user_counts'].tolist() == [3, 2, 2, 2]
+    assert stats['user_means'].tolist() == [1.0, 0.5, 0.0, 0.5]
+    assert stats['percentiles'].tolist() == [75.0, 25.0, 0.0, 25.0]
+    assert stats['discrimination'][0] == 1.0 and stats['discrimination'][1] == 1.0
+    assert math.isnan(stats['discrimination'][2])  # nobody in the lower group answered it
+
+
+def test_flags(main):
+    analysis = main.ItemAnalysis(None, None, min_responses=5)
+    assert analysis.flags(4, 0.5, 0.5) == ['few responses']
+    assert analysis.flags(10, 0.5, -0.1) == ['negative discrimination: check the answer key']
+    assert analysis.flags(10, 0.95, 0.1) == ['low discrimination: possibly ambiguous', 'too easy']
+    assert analysis.flags(10, 0.2, float('nan')) == ['too hard']
+
+
+def test_report_reloads_only_changed_users(main, progress):
+    analysis = main.ItemAnalysis(progress, Bank(1, 2), min_responses=1)
+    answer(progress, 'ann', 1, 1.0, 0b01)
+    answer(progress, 'ann', 2, 1.0, 0b01)
+    answer(progress, 'ben', 1, 0.0, 0b10)
+
+    report = analysis.report()
+    assert report['answers'] == 3 and sorted(progress.reads) == ['ann', 'ben']
+    first = report['questions'][0]
+    assert (first['responses'], first['p_value']) == (2, 0.5)
+    assert first['options'] == [{'option': 'A', 'rate': 0.5, 'correct': True},
+                                {'option': 'B', 'rate': 0.5, 'correct': False}]
+    assert [user['username'] for user in report['users']] == ['ann', 'ben']
+
+    progress.reads.clear()
+    assert analysis.report() is report and progress.reads == []
+
+    answer(progress, 'ben', 2, 0.5, 0b11)
+    report = analysis.report()
+    assert progress.reads == ['ben'] and report['questions'][1]['p_value'] == 0.75
+
+    progress.store.reset_user('ann')
+    report = analysis.report()
+    assert [user['username'] for user in report['users']] == ['ben']
+    assert report['questions'][0]['options'][1]['rate'] == 1.0
+
+
+def test_new_questions_grow_the_matrix(main, progress):
+    bank = Bank(*range(1, 21))
+    analysis = main.ItemAnalysis(progress, bank, min_responses=1)
+    analysis.report()
+    bank.questions.update(Bank(*range(21, 41)).questions)
+    answer(progress, 'cat', 40, 1.0)
+    report = analysis.report()
+    assert len(report['questions']) == 40 and report['questions'][-1]['p_value'] == 1.0
+    assert analysis._matrix.shape[1] >= 40
@@ -0,0 +1,71 @@
+"""Paged, filtered and sorted question list (manage page and its JSON feed)"""
+
+import pytest
+
+
+class Storage:
+    def __init__(self, questions):
+        self.questions = questions
+
+    def load_questions(self):
+        return self.questions
+
+    def save_questions(self, questions, changed_ids=None, added=()):
+        self.questions = list(questions)
+        return self.questions
+
+    def questions_version(self):
+        return 1
+
+
+@pytest.fixture
+def bank(main):
+    questions = [{'id': question_id, 'question': text, 'question_type': question_type, 'options': ['Yes', 'No']}
+                 for question_id, text, question_type in [
+                     (3, 'Cache eviction policies?', 'single'), (1, 'banana split?', 'multiple'),
+                     (8, 'Apple pie?', 'single'), (5, 'Durable caches?', 'multiple'), (13, 'Eviction order?', 'single')]]
+    return main.QuestionBank(Storage(questions))
+
+
+def ids(page):
+    questions, total = page
+    return [question['id'] for question in questions], total
+
+
+def test_sorted_pages(bank):
+    assert ids(bank.page(limit=2)) == ([1, 3], 5)
+    assert ids(bank.page(offset=2, limit=2)) == ([5, 8], 5)
+    assert ids(bank.page(offset=4, limit=2)) == ([13], 5)
+    assert ids(bank.page(offset=9)) == ([], 5)
+    assert ids(bank.page(sort='question')) == ([8, 1, 3, 5, 13], 5)
+    assert ids(bank.page(sort='type', limit=2)) == ([1, 5], 5)
+    assert ids(bank.page(descending=True, limit=3)) == ([13, 8, 5], 5)
+
+
+def test_filters_combine(bank):
+    assert ids(bank.page(question_type='single')) == ([3, 8, 13], 3)
+    assert ids(bank.page(min_id=3, max_id=8)) == ([3, 5, 8], 3)
+    assert ids(bank.page(query='CACHE')) == ([3, 5], 2)
+    assert ids(bank.page(query='evict', question_type='single', min_id=4)) == ([13], 1)
+    assert ids(bank.page(query='evict', sort='question', descending=True)) == ([13, 3], 2)
+    assert ids(bank.page(question_type='essay')) == ([], 0)
+
+
+def test_page_arguments_are_clamped(main):
+    options = main.question_page_args({'per_page': '500', 'offset': '-4', 'sort': 'password', 'min_id': 'x'})
+    assert (options['per_page'], options['offset'], options['sort'], options['min_id']) == (100, 0, 'id', None)
+
+
+def test_questions_feed(main, login):
+    main.add_questions([{'id': None, 'question': f'Pagination feed question number {n}?', 'options': ['Yes', 'No'],
+                         'question_type': 'single', 'correct_answers': ['Yes'], 'correct_answer': 'Yes',
+                         'explanation': ''} for n in range(3)])
+    client = login('pager')
+    first = client.get('/api/questions?q=pagination+feed&per_page=2').get_json()
+    assert first['total'] == 3 and first['next_offset'] == 2
+    assert [question['question'] for question in first['questions']] == \
+        [f'Pagination feed question number {n}?' for n in range(2)]
+    rest = client.get('/api/questions?q=pagination+feed&per_page=2&offset=2').get_json()
+    assert [question['id'] for question in rest['questions']] == [first['questions'][1]['id'] + 1]
+    assert rest['next_offset'] is None
+    assert client.get('/manage_questions?q=pagination+feed').status_code == 200
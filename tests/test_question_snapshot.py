@@ -0,0 +1,65 @@
+"""Compiled, memory-mapped question snapshots (JSON backend)"""
+
+import json
+import os
+import stat
+
+
+def question(question_id, text, question_type='single', tags=()):
+    return {'id': question_id, 'question': text, 'options': ['Yes', 'No'], 'question_type': question_type,
+            'correct_answers': ['Yes'], 'tags': list(tags)}
+
+
+QUESTIONS = [question(7, 'Zebra question?', tags=['b']), question(2, 'apple question?', 'multiple', ['a', 'b']),
+             question(40, 'Mango question?')]
+
+
+def test_compile_and_look_up(main, tmp_path):
+    path = str(tmp_path / 'questions.snapshot')
+    snapshot = main.QuestionSnapshot.compile(path, QUESTIONS, (123, 456))
+    assert len(snapshot) == 3 and list(snapshot) == [7, 2, 40]
+    assert dict(snapshot[2]) == QUESTIONS[1] and dict(snapshot[40]) == QUESTIONS[2]
+    assert 7 in snapshot and 8 not in snapshot and '7' not in snapshot
+    assert snapshot.get(3) is None and snapshot.get('2') is None
+
+    summary = snapshot.summary
+    assert summary['types'] == {'single': [7, 40], 'multiple': [2]}
+    assert summary['tags'] == {'a': [2], 'b': [7, 2]}
+    assert summary['question_order'] == [2, 40, 7]
+    assert 'Zebra' not in json.dumps(summary)  # question text is only in the records
+
+
+def test_open_checks_the_source_signature(main, tmp_path):
+    path = str(tmp_path / 'questions.snapshot')
+    assert main.QuestionSnapshot.open(path, (1, 2)) is None
+    main.QuestionSnapshot.compile(path, QUESTIONS, (1, 2))
+    assert dict(main.QuestionSnapshot.open(path, [1, 2])[7]) == QUESTIONS[0]
+    assert main.QuestionSnapshot.open(path, (1, 3)) is None
+
+    with open(path, 'wb') as f:
+        f.write(b'not a snapshot at all, just some bytes')
+    assert main.QuestionSnapshot.open(path, (1, 2)) is None
+
+
+def test_recompile_keeps_the_file_mode(main, tmp_path):
+    path = str(tmp_path / 'questions.snapshot')
+    main.QuestionSnapshot.compile(path, QUESTIONS, (1, 2))
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+    os.chmod(path, 0o640)
+    main.QuestionSnapshot.compile(path, QUESTIONS[:1], (1, 3))
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
+
+
+def test_snapshot_follows_questions_json(main, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    storage = main.JsonStorage()
+    assert storage.load_question_snapshot() == []
+    main.SimpleDataHelper.save_json('questions.json', QUESTIONS)
+    snapshot = storage.load_question_snapshot()
+    assert set(snapshot) == {2, 7, 40}
+    assert storage.load_question_snapshot().source_signature == snapshot.source_signature
+
+    # Edited outside the app: the next load recompiles
+    main.SimpleDataHelper.save_json('questions.json', QUESTIONS + [question(41, 'Added by hand?')])
+    assert 41 in storage.load_question_snapshot()
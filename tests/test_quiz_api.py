@@ -0,0 +1,50 @@
+"""Single-round-trip JSON quiz API"""
+
+
+def answer_for(main, question_id):
+    return main.correct_answers_for(main.question_bank.get(question_id))
+
+
+def test_quiz_round_trip(main, login):
+    client = login('api_student')
+    start = client.post('/api/quiz/start', json={'count': 3, 'prefetch': 2}).get_json()
+    assert start['total'] == 3 and start['index'] == 0 and not start['complete']
+    assert len(start['questions']) == 2
+    assert not {'correct_answers', 'correct_answer', 'explanation'} & set(start['questions'][0])
+
+    first = start['questions'][0]['id']
+    answered = client.post('/api/quiz/answer', json={'question_id': first, 'answers': answer_for(main, first)}).get_json()
+    assert answered['result']['is_correct'] and answered['result']['question_id'] == first
+    assert answered['index'] == 1 and answered['questions'][0]['id'] == start['questions'][1]['id']
+    assert main.progress_store.get_user('api_student')[str(first)]['correct'] is True
+
+    skipped = client.post('/api/quiz/answer', json={'question_id': answered['questions'][0]['id'], 'skip': True}).get_json()
+    assert 'result' not in skipped and skipped['index'] == 2
+
+    last = skipped['questions'][0]['id']
+    done = client.post('/api/quiz/answer', json={'question_id': last, 'answers': ['not an option']}).get_json()
+    assert done['result']['is_correct'] is False
+    assert done['complete'] and done['results']['answered_questions'] == 2
+    assert client.get('/api/quiz').status_code == 404
+
+
+def test_stale_answer_returns_current_position(main, login):
+    client = login('api_stale')
+    start = client.post('/api/quiz/start', json={'count': 3}).get_json()
+    first, second = start['questions'][0]['id'], start['questions'][1]['id']
+    client.post('/api/quiz/answer', json={'question_id': first, 'skip': True})
+
+    # A second answer to the question that was just skipped (e.g. from another tab)
+    response = client.post('/api/quiz/answer', json={'question_id': first, 'answers': answer_for(main, first)})
+    assert response.status_code == 409
+    payload = response.get_json()
+    assert payload['error'] and 'result' not in payload
+    assert payload['index'] == 1 and payload['questions'][0]['id'] == second
+    assert str(first) not in main.progress_store.get_user('api_stale')
+
+
+def test_prefetch_is_clamped(main):
+    assert main.quiz_prefetch_count('0') == 1
+    assert main.quiz_prefetch_count(500) == main.QUIZ_PREFETCH_MAX
+    assert main.quiz_prefetch_count('lots') == main.QUIZ_PREFETCH_DEFAULT
+
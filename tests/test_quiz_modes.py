@@ -0,0 +1,55 @@
+"""Tag-filtered and adaptive quiz selection from the per-user answer index"""
+
+import random
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def tagged(main):
+    """Four questions: two tagged 'vpc-modes', two tagged 'iam-modes'"""
+    questions = [{'id': None, 'question': f'Quiz mode question {n}?', 'options': ['Yes', 'No'],
+                  'question_type': 'single', 'correct_answers': ['Yes'], 'correct_answer': 'Yes',
+                  'explanation': '', 'tags': [tag]} for n, tag in enumerate(['vpc-modes'] * 2 + ['iam-modes'] * 2)]
+    main.add_questions(questions)
+    return [question['id'] for question in questions]
+
+
+def answer(main, username, question_id, score):
+    main.progress_store.record(username, question_id, score == 1.0, score, '2024-01-01T10:00:00')
+
+
+def test_modes_filter_by_tag_and_answers(main, tagged):
+    vpc, vpc_wrong, iam, iam_right = tagged
+    answer(main, 'moder', vpc_wrong, 0.0)
+    answer(main, 'moder', iam_right, 1.0)
+
+    assert sorted(main.select_quiz_questions('moder', 'all', 'vpc-modes')) == [vpc, vpc_wrong]
+    assert main.select_quiz_questions('moder', 'wrong', 'vpc-modes') == [vpc_wrong]
+    assert main.select_quiz_questions('moder', 'wrong', 'iam-modes') == []
+    assert main.select_quiz_questions('moder', 'unanswered', 'iam-modes') == [iam]
+    assert sorted(main.select_quiz_questions('moder', 'adaptive', 'iam-modes')) == [iam, iam_right]
+    assert len(main.select_quiz_questions('moder', 'all', count=3)) == 3
+
+
+def test_adaptive_order_favours_weak_questions_and_topics(main):
+    answers = {'scores': {1: 0.0, 2: 1.0, 3: 1.0, 4: 1.0}, 'wrong': {1}}
+    tags_by_id = {1: ['weak'], 2: ['weak'], 3: ['strong'], 4: ['strong'], 5: ['weak'], 6: ['strong']}
+    random.seed(1234)
+    firsts = [main.adaptive_order(range(1, 7), answers, tags_by_id)[0] for _ in range(500)]
+    assert sorted(main.adaptive_order(range(1, 7), answers, tags_by_id)) == [1, 2, 3, 4, 5, 6]
+
+    # The missed question leads most often; an unanswered question in the weak topic beats one in the strong topic
+    assert max(set(firsts), key=firsts.count) == 1
+    assert firsts.count(5) > firsts.count(6)
+    assert firsts.count(6) > 0  # every question can still come up
+
+
+def test_quiz_start_with_nothing_to_ask(main, login, tagged):
+    client = login('no_mistakes')
+    response = client.get('/quiz/start?mode=wrong&tag=vpc-modes')
+    assert response.status_code == 302 and response.headers['Location'].endswith('/')
+    response = client.get('/quiz/start?mode=adaptive&tag=vpc-modes&count=1')
+    assert response.headers['Location'].endswith('/quiz/question')
+    with client.session_transaction() as session:
+        assert len(main.quiz_sessions.get(session['quiz_id'])['order']) == 1
@@ -0,0 +1,67 @@
+"""Stored answer bitmasks must follow option text when a question's options are edited
+
+Run with: python -m pytest tests
+"""
+
+import pytest
+
+OPTIONS = ['Alpha', 'Bravo', 'Charlie', 'Delta']
+
+
+def test_option_remap(main):
+    remap = main.option_remap(OPTIONS, ['Bravo', 'Charlie', 'Delta'])
+    assert remap(0b0010) == 0b0001       # Bravo moved from position 1 to 0
+    assert remap(0b0001) == 0            # Alpha was removed
+    assert remap(0b1100) == 0b0110
+    assert main.option_remap(['Delta', 'Alpha'], ['Alpha', 'Delta'])(0b01) == 0b10
+    assert main.option_remap(OPTIONS, OPTIONS + ['Echo']) is None
+
+
+@pytest.mark.parametrize('backend', ['json', 'sqlite'])
+def test_remap_then_regrade_keeps_answer(main, backend, tmp_path):
+    if backend == 'json':
+        store = main.ProgressStore(str(tmp_path / 'progress.json'), str(tmp_path / 'progress.log'))
+    else:
+        storage = main.SqliteStorage(str(tmp_path / 'study.db'))
+        storage.initialize([], {})
+        store = storage.progress
+    store.record('student', 7, True, 1.0, '2024-01-01T00:00:00', 0b0010)    # Bravo
+    store.record('other', 7, False, 0.0, '2024-01-01T00:00:00', 0b0001)     # Alpha
+
+    edited = {'id': 7, 'options': ['Bravo', 'Charlie', 'Delta'], 'question_type': 'single',
+              'correct_answers': ['Bravo'], 'correct_answer': 'Bravo'}
+    assert store.remap_selected(7, main.option_remap(OPTIONS, edited['options'])) == 2
+    counts = store.regrade([7], lambda question_id: main.mask_grader(edited))
+
+    assert counts == {'answers': 2, 'changed': 0, 'skipped': 0}
+    assert store.get_user('student')['7']['correct'] is True
+    assert store.get_user('student')['7']['selected'] == 0b0001
+    assert store.get_user('other')['7']['selected'] == 0
+
+
+def test_deleting_option_keeps_earlier_answers(main, login):
+    question = {'id': None, 'question': 'Which one?', 'options': list(OPTIONS), 'question_type': 'single',
+                'correct_answers': ['Bravo'], 'correct_answer': 'Bravo', 'explanation': ''}
+    main.add_questions([question])
+    question_id = question['id']
+    main.grade_answer('student', question, ['Bravo'])
+    main.grade_answer('other', question, ['Charlie'])
+    if main.item_analysis is not None:
+        main.item_analysis.refresh()
+
+    client = login('editor')
+    response = client.post(f'/edit_question/{question_id}', data={
+        'question': 'Which one?', 'question_type': 'single', 'correct_answer': 'Bravo',
+        'option1': 'Delta', 'option2': 'Charlie', 'option3': 'Bravo', 'explanation': ''
+    })
+    assert response.status_code == 302
+    main.answer_regrader.run([question_id])
+
+    entry = main.progress_store.get_user('student')[str(question_id)]
+    assert entry['correct'] is True and entry['selected'] == 0b100
+    assert main.progress_store.get_user('other')[str(question_id)]['selected'] == 0b010
+
+    if main.item_analysis is not None:
+        main.item_analysis.refresh()
+        rates = {rate['option']: rate['rate'] for rate in main.item_analysis.option_rates(main.question_bank.get(question_id))}
+        assert rates == {'Delta': 0.0, 'Charlie': 0.5, 'Bravo': 0.5}
@@ -0,0 +1,78 @@
+"""BM25 question search: ranking, incremental re-indexing and the saved term counts"""
+
+import pytest
+
+
+def question(question_id, text, options=('Yes', 'No'), explanation=''):
+    return {'id': question_id, 'question': text, 'options': list(options), 'explanation': explanation}
+
+
+@pytest.fixture
+def bank(main):
+    questions = {
+        1: question(1, 'Which service stores objects in buckets?', ['S3', 'EBS'], 'S3 buckets hold objects.'),
+        2: question(2, 'Which service runs virtual machines?', ['EC2', 'Lambda']),
+        3: question(3, 'How are queues polled?', ['SQS long polling', 'SNS'], 'Buckets are not queues.'),
+    }
+    loads = []
+
+    def load(question_id):
+        loads.append(question_id)
+        return questions[question_id]
+
+    def hashes():
+        return {question_id: main.QuestionSearchIndex.content_hash(q) for question_id, q in questions.items()}
+    return questions, load, hashes, loads
+
+
+def test_terms_are_stemmed_and_stopwords_dropped(main):
+    assert main.search_terms('What are the Queries for queues and buckets?') == main.search_terms('query queue bucket')
+    assert len(main.search_terms('What are the Queries for queues and buckets?')) == 3
+
+
+def test_results_are_ranked_by_relevance(main, bank):
+    questions, load, hashes, _ = bank
+    index = main.QuestionSearchIndex()
+    index.sync(hashes(), load)
+
+    results, total = index.search('bucket')
+    assert total == 2 and [question_id for question_id, _ in results] == [1, 3]
+    assert results[0][1] > results[1][1] > 0
+    assert index.search('buckets', offset=1, limit=1) == (results[1:], 2)
+    assert index.search('the and') == ([], 0)
+    assert index.search('kubernetes') == ([], 0)
+
+
+def test_only_changed_questions_are_reindexed(main, bank, tmp_path):
+    questions, load, hashes, loads = bank
+    path = str(tmp_path / 'question_index.json')
+    main.QuestionSearchIndex(path).sync(hashes(), load)
+    assert sorted(loads) == [1, 2, 3]
+
+    # After a restart the saved term counts are reused; only the edited and the new question are read
+    loads.clear()
+    questions[2] = question(2, 'Which service runs containers?', ['ECS', 'Lambda'])
+    questions[4] = question(4, 'Where do containers images live?', ['ECR'])
+    del questions[3]
+    index = main.QuestionSearchIndex(path)
+    index.sync(hashes(), load)
+    assert sorted(loads) == [2, 4]
+    assert {question_id for question_id, _ in index.search('container')[0]} == {2, 4}
+    assert index.search('virtual') == ([], 0) and index.search('queue') == ([], 0)
+
+    loads.clear()
+    index.sync(hashes(), load)
+    assert loads == []
+
+
+def test_search_api_pages_through_results(main, login):
+    main.add_questions([{'id': None, 'question': f'Which zeppelin moors at mast {n}?', 'options': ['Yes', 'No'],
+                         'question_type': 'single', 'correct_answers': ['Yes'], 'correct_answer': 'Yes',
+                         'explanation': ''} for n in range(3)])
+    client = login('searcher')
+    first = client.get('/api/questions/search?q=zeppelin&limit=2').get_json()
+    assert first['total'] == 3 and len(first['results']) == 2 and first['next_offset'] == 2
+    rest = client.get('/api/questions/search?q=zeppelins&offset=2&limit=2').get_json()
+    assert len(rest['results']) == 1 and rest['next_offset'] is None
+    assert {result['id'] for result in first['results'] + rest['results']} == \
+        {question['id'] for question in main.question_bank.all() if 'zeppelin' in question['question']}
@@ -0,0 +1,45 @@
+"""SM-2 scheduling of flashcard reviews"""
+
+from datetime import datetime
+
+
+def review(main, ratings, start=datetime(2024, 1, 1)):
+    card_stats = {}
+    for difficulty in ratings:
+        main.apply_review(card_stats, difficulty, start)
+    return card_stats
+
+
+def test_intervals_follow_sm2(main):
+    assert review(main, ['medium'])['interval'] == 1
+    assert review(main, ['medium', 'medium'])['interval'] == 6
+    stats = review(main, ['medium', 'medium', 'medium'])
+    assert stats['interval'] == 15 and stats['ease_factor'] == 2.5
+    assert stats['due_date'] == '2024-01-16'
+
+
+def test_hard_rating_resets_and_lowers_ease(main):
+    stats = review(main, ['easy', 'easy', 'easy', 'hard'])
+    assert stats['repetitions'] == 0 and stats['interval'] == 1
+    assert stats['ease_factor'] < 2.8
+    assert review(main, ['hard'] * 20)['ease_factor'] == main.MIN_EASE_FACTOR
+
+
+def test_interval_is_capped(main):
+    stats = review(main, ['easy'] * 30)
+    assert stats['interval'] == main.MAX_INTERVAL_DAYS
+    assert datetime.strptime(stats['due_date'], '%Y-%m-%d') > datetime(2100, 1, 1)
+
+
+def test_rating_one_card_easy_30_times(main, login):
+    card = {'id': None, 'front': 'SM-2 front', 'back': 'back', 'category': 'General', 'tags': []}
+    main.add_flashcards([card])
+    client = login('sm2_student')
+    for _ in range(30):
+        response = client.post('/flashcards/study/card', data={'action': 'rate', 'card_id': card['id'],
+                                                               'difficulty': 'easy'})
+        assert response.status_code == 302
+    stats = main.load_flashcard_progress('sm2_student')['card_stats'][str(card['id'])]
+    assert stats['times_studied'] == 30
+    assert stats['interval'] == main.MAX_INTERVAL_DAYS
+    assert client.get('/flashcards/study/card').status_code == 200
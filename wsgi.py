@@ -0,0 +1,24 @@
+"""Production WSGI entry point
+
+    gunicorn -c gunicorn.conf.py            # uses wsgi:application
+    gunicorn 'wsgi:create_app()' -w 4       # or call the factory directly
+
+Importing main does all one-time startup work: creating missing data files
+(or tables), loading and indexing the question bank and flashcards, and
+rendering the bank's Markdown. With gunicorn's preload_app that happens
+once in the master process; forked workers share the loaded data
+copy-on-write and never repeat the initialization.
+"""
+
+import gc
+
+def create_app():
+    """Return the Flask app with its data loaded, indexed and frozen for forking"""
+    import main
+    
+    # Move everything loaded so far out of the garbage collector's reach, so
+    # collections in the workers don't write to (and un-share) those pages
+    gc.freeze()
+    return main.app
+
+application = create_app()